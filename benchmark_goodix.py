@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Goodix Benchmark
+Misst den kompletten Hot-Path (Verbinden, Init, Scan, Template) ohne Hardware
+
+Eine Session wird einmal mit dem echten Sensor aufgezeichnet und danach
+beliebig oft abgespielt:
+    ./benchmark_goodix.py record session.gxs
+    ./benchmark_goodix.py replay session.gxs [runden] [--realtime]
+
+Dauerbetrieb im kontinuierlichen Modus (Frame-Rate, Overruns, Speicher):
+    ./benchmark_goodix.py stream [sekunden] [slots]
+
+1:N-Identifikation mit synthetischer Galerie (Index-Größe, Aufbauzeit,
+Kandidaten-Recall und Latenz gegenüber der vollständigen Suche):
+    ./benchmark_goodix.py index [benutzer] [proben]
+
+Dieselbe Galerie mit 1..worker Worker-Prozessen (Skalierung der Suche
+nach unbekannten Fingern und von All-Pairs; braucht mehrere CPU-Kerne):
+    ./benchmark_goodix.py pool [benutzer] [worker]
+"""
+
+import sys
+import os
+import time
+import resource
+import threading
+from typing import Optional, List, Dict
+import logging
+
+import numpy as np
+
+from drivers.goodix_prototype_driver import GoodixFingerprintDriver
+from drivers.goodix_transport import RecordTransport, ReplayTransport
+from drivers.goodix_policy import percentile
+from goodix_login import GoodixLoginManager
+from biometrics.minutiae import MINUTIA_DTYPE, FeatureSet
+from biometrics.matcher import MinutiaeMatcher, MatchTemplate, prepare
+from biometrics.gallery import StackedGallery
+from biometrics.pool import MatcherPool
+
+SCAN_TIMEOUT = 30
+
+# Synthetische Abdrücke: Sensorgröße und Templates pro Benutzer
+SENSOR_WIDTH, SENSOR_HEIGHT = 88, 108
+IMPRESSIONS = 3
+
+
+def run_session(driver: GoodixFingerprintDriver, timings: Dict[str, List[float]]) -> Optional[bytes]:
+    """Ein kompletter Durchlauf: connect, initialize, Scan, disconnect"""
+    start = time.perf_counter()
+    if not driver.connect():
+        return None
+    timings['connect'].append(time.perf_counter() - start)
+
+    try:
+        step = time.perf_counter()
+        driver.initialize()
+        timings['initialize'].append(time.perf_counter() - step)
+
+        scan_done = threading.Event()
+        frame: Optional[bytes] = None
+
+        def on_scan_complete(image_data):
+            nonlocal frame
+            # Frame-View ist nur bis zum nächsten Read gültig
+            frame = bytes(image_data)
+            scan_done.set()
+
+        driver.on_scan_complete = on_scan_complete
+        step = time.perf_counter()
+        if driver.start_scan():
+            scan_done.wait(SCAN_TIMEOUT)
+        driver.stop_scan()
+        if frame is not None:
+            timings['capture'].append(time.perf_counter() - step)
+        return frame
+    finally:
+        driver.disconnect()
+        timings['total'].append(time.perf_counter() - start)
+
+
+def print_timings(timings: Dict[str, List[float]]):
+    for name, samples in timings.items():
+        if not samples:
+            continue
+        ordered = sorted(samples)
+        print(f"   {name:<12} n={len(ordered):<4} p50={percentile(ordered, 50) * 1000:8.2f}ms "
+              f"p99={percentile(ordered, 99) * 1000:8.2f}ms max={ordered[-1] * 1000:8.2f}ms")
+
+
+def record(path: str):
+    print(f"⏺️ Aufzeichnung nach {path} - Finger auflegen, sobald der Scan startet")
+    driver = GoodixFingerprintDriver(transport=RecordTransport(path))
+    timings = {'connect': [], 'initialize': [], 'capture': [], 'total': []}
+    frame = run_session(driver, timings)
+    if frame is None:
+        print("❌ Kein Frame aufgezeichnet")
+        sys.exit(1)
+    print(f"✅ Session mit {len(frame)} bytes Bilddaten aufgezeichnet")
+    print_timings(timings)
+
+
+def replay(path: str, rounds: int, realtime: bool):
+    transport = ReplayTransport(path, realtime=realtime)
+    timings = {'connect': [], 'initialize': [], 'capture': [], 'total': []}
+    frame = None
+
+    print(f"▶️ {rounds} Durchläufe ({'Echtzeit' if realtime else 'max. Tempo'})")
+    for _ in range(rounds):
+        frame = run_session(GoodixFingerprintDriver(transport=transport), timings) or frame
+    print("⏱️ End-to-End:")
+    print_timings(timings)
+
+    if frame is None:
+        print("⚠️ Kein Frame in der Session - Template-Messung übersprungen")
+        return
+
+    manager = GoodixLoginManager()
+    template_timings = {'template': []}
+    for _ in range(max(rounds, 100)):
+        start = time.perf_counter()
+        manager.generate_fingerprint_template(frame)
+        template_timings['template'].append(time.perf_counter() - start)
+    print(f"🧮 Template-Erzeugung ({len(frame)} bytes/Frame):")
+    print_timings(template_timings)
+    total = sum(template_timings['template'])
+    print(f"   → {len(template_timings['template']) / total:.0f} Templates/s")
+
+
+def stream(seconds: float, slots: int):
+    """Kontinuierlicher Modus: Sensor-Frame-Rate und Speicher über die Zeit"""
+    driver = GoodixFingerprintDriver()
+    if not driver.connect() or not driver.initialize():
+        print("❌ Sensor nicht bereit")
+        sys.exit(1)
+
+    ring = driver.start_continuous(slots)
+    print(f"🎞️ Kontinuierlicher Modus: {slots} Slots, {seconds:.0f}s")
+    consumed = 0
+    seq = -1
+    decode_times: List[float] = []
+    start = time.perf_counter()
+    next_report = start + 1
+    try:
+        while time.perf_counter() - start < seconds:
+            frame = ring.next(seq, timeout=1.0)
+            if frame is None:
+                continue
+            seq = frame.seq
+            consumed += 1
+            step = time.perf_counter()
+            if driver.decode_frame(frame.data) is not None:
+                decode_times.append(time.perf_counter() - step)
+            if time.perf_counter() >= next_report:
+                next_report += 1
+                stats = ring.snapshot()
+                fps = f"{stats['fps']:.1f}" if stats['fps'] else '-'
+                print(f"   t={time.perf_counter() - start:5.1f}s fps={fps} "
+                      f"frames={stats['produced']} overruns={stats['overruns']} "
+                      f"maxrss={resource.getrusage(resource.RUSAGE_SELF).ru_maxrss} KB")
+    finally:
+        driver.stop_continuous()
+        driver.disconnect()
+
+    elapsed = time.perf_counter() - start
+    print(f"✅ {ring.produced} Frames in {elapsed:.1f}s ({ring.produced / elapsed:.1f} fps), "
+          f"{consumed} gelesen, {ring.overruns} Overruns, {ring.errors} Lesefehler")
+    if decode_times:
+        print("🖼️ Frame-Dekodierung:")
+        print_timings({'decode': decode_times})
+
+
+def synthetic_impression(master: np.ndarray, rng: np.random.Generator) -> MatchTemplate:
+    """Ein Abdruck eines Master-Fingers: gedreht, verschoben, verrauscht, beschnitten"""
+    rotation = rng.uniform(-np.radians(10), np.radians(10))
+    shift = rng.uniform(-5, 5, 2)
+    cos, sin = np.cos(rotation), np.sin(rotation)
+    cx, cy = SENSOR_WIDTH / 2, SENSOR_HEIGHT / 2
+    x = cos * (master['x'] - cx) - sin * (master['y'] - cy) + cx + shift[0]
+    y = sin * (master['x'] - cx) + cos * (master['y'] - cy) + cy + shift[1]
+    angle = master['angle'] + rotation + rng.normal(0, np.radians(5), len(master))
+    x = x + rng.normal(0, 1.0, len(master))
+    y = y + rng.normal(0, 1.0, len(master))
+    keep = rng.random(len(master)) > 0.15
+
+    # Falsche Minutien (Narben, Verschmutzung)
+    spurious = rng.integers(0, 4)
+    x = np.concatenate([x[keep], rng.uniform(0, SENSOR_WIDTH, spurious)])
+    y = np.concatenate([y[keep], rng.uniform(0, SENSOR_HEIGHT, spurious)])
+    angle = np.concatenate([angle[keep], rng.uniform(0, 2 * np.pi, spurious)])
+    inside = (x >= 0) & (x < SENSOR_WIDTH) & (y >= 0) & (y < SENSOR_HEIGHT)
+
+    minutiae = np.zeros(int(inside.sum()), dtype=MINUTIA_DTYPE)
+    minutiae['x'], minutiae['y'] = x[inside], y[inside]
+    minutiae['angle'] = np.mod(angle[inside], 2 * np.pi)
+    minutiae['quality'] = rng.uniform(0.3, 1.0, len(minutiae))
+    minutiae = minutiae[np.argsort(-minutiae['quality'])]
+    return prepare(FeatureSet(minutiae, SENSOR_WIDTH, SENSOR_HEIGHT, 1.0, 8.0))
+
+
+def synthetic_finger(rng: np.random.Generator) -> np.ndarray:
+    """Master-Minutien eines Fingers, etwas größer als die Sensorfläche"""
+    count = rng.integers(20, 41)
+    master = np.zeros(count, dtype=MINUTIA_DTYPE)
+    master['x'] = rng.uniform(-8, SENSOR_WIDTH + 8, count)
+    master['y'] = rng.uniform(-8, SENSOR_HEIGHT + 8, count)
+    master['angle'] = rng.uniform(0, 2 * np.pi, count)
+    return master
+
+
+def synthetic_gallery(users: int, rng: np.random.Generator):
+    """Master-Finger, Galerie mit IMPRESSIONS Templates pro Benutzer und deren Aufbauzeit"""
+    fingers = [synthetic_finger(rng) for _ in range(users)]
+    templates = [(f'user{number}', [synthetic_impression(master, rng) for _ in range(IMPRESSIONS)])
+                 for number, master in enumerate(fingers)]
+
+    start = time.perf_counter()
+    gallery = StackedGallery(capacity=users * IMPRESSIONS)
+    for label, impressions in templates:
+        for template in impressions:
+            gallery.add(label, template)
+    return fingers, gallery, time.perf_counter() - start
+
+
+def index(users: int, probes: int):
+    """Identifikation über users x IMPRESSIONS synthetische Templates"""
+    rng = np.random.default_rng(0)
+    fingers, gallery, added = synthetic_gallery(users, rng)
+    start = time.perf_counter() - added
+    index_bytes = gallery.index.nbytes
+    built = time.perf_counter() - start
+    print(f"🗂️ {len(gallery)} Templates, Index: {len(gallery.index)} Einträge, "
+          f"{index_bytes / 1e6:.1f} MB")
+    print(f"   Aufbau {built:.1f}s (davon Einsortieren {(built - added) * 1000:.0f}ms)")
+
+    matcher = MinutiaeMatcher()
+    everything = np.arange(len(gallery))
+    timings = {'indexed': [], 'full': []}
+    shortlisted = indexed_hits = full_hits = 0
+    for number in rng.choice(users, probes, replace=False):
+        label = f'user{number}'
+        probe = synthetic_impression(fingers[number], rng)
+        shortlist = gallery.index.shortlist(probe, len(gallery))
+        shortlisted += label in {gallery.labels[row] for row in shortlist}
+
+        step = time.perf_counter()
+        result = gallery.identify(probe, matcher, full_scan=False)
+        timings['indexed'].append(time.perf_counter() - step)
+        indexed_hits += result.label == label
+
+        step = time.perf_counter()
+        result = gallery.identify(probe, matcher, rows=everything)
+        timings['full'].append(time.perf_counter() - step)
+        full_hits += result.label == label
+
+    print(f"🎯 Kandidaten-Recall {shortlisted / probes:.1%} (Shortlist {len(shortlist)} Zeilen), "
+          f"erkannt: Index {indexed_hits}/{probes}, vollständig {full_hits}/{probes}")
+    print("⏱️ Identifikation:")
+    print_timings(timings)
+
+
+def pool(users: int, workers: int, probes: int = 30, pair_rows: int = 300):
+    """
+    Skalierung von MatcherPool über 1..workers Prozesse gegenüber
+    StackedGallery im Prozess: Identifikation registrierter Finger
+    (Index-Shortlist) und unbekannter Finger (Shortlist + Suche über alle
+    übrigen Benutzer), All-Pairs-Durchsatz. Pool und Galerie müssen für
+    jede Probe dieselbe Entscheidung treffen.
+    """
+    rng = np.random.default_rng(0)
+    fingers, gallery, _ = synthetic_gallery(users, rng)
+    matcher = MinutiaeMatcher()
+    chosen = rng.choice(users, probes, replace=False)
+    genuine = [(f'user{number}', synthetic_impression(fingers[number], rng)) for number in chosen]
+    impostors = [synthetic_impression(synthetic_finger(rng), rng) for _ in range(probes)]
+    rows = np.arange(min(pair_rows, len(gallery)))
+    pairs = len(rows) * len(gallery)
+    cpus = os.cpu_count() or 1
+    print(f"🗂️ {len(gallery)} Templates, {probes} Proben je Art, {cpus} CPUs")
+    if cpus < 2:
+        print("⚠️ Nur ein CPU-Kern: die Worker teilen sich den Kern - hier ist nur der "
+              "Overhead des Pools messbar, keine Skalierung")
+
+    def run(searcher):
+        timings = {'genuine': [], 'impostor': []}
+        results = []
+        for name, samples in (('genuine', [probe for _, probe in genuine]), ('impostor', impostors)):
+            for probe in samples:
+                step = time.perf_counter()
+                results.append(searcher.identify(probe, matcher))
+                timings[name].append(time.perf_counter() - step)
+        return {name: percentile(sorted(samples), 50) for name, samples in timings.items()}, results
+
+    local, expected = run(gallery)
+    step = time.perf_counter()
+    for row in rows:
+        probe = gallery.template(row)
+        gallery.scores(probe, gallery.prefilter(probe, matcher.prefilter))
+    local_pairs = pairs / (time.perf_counter() - step)
+    hits = sum(result.label == label for result, (label, _) in zip(expected, genuine))
+    false_accepts = sum(result.accepted for result in expected[probes:])
+    print(f"🎯 Im Prozess erkannt {hits}/{probes}, falsch angenommen {false_accepts}/{probes}")
+
+    print(f"{'Worker':>8} {'registriert p50':>16} {'unbekannt p50':>14} {'Speedup':>8} "
+          f"{'All-Pairs':>12} {'Speedup':>8}")
+    print(f"{'lokal':>8} {local['genuine'] * 1000:14.2f}ms {local['impostor'] * 1000:12.2f}ms "
+          f"{1.0:7.2f}x {local_pairs / 1e6:8.2f} M/s {1.0:7.2f}x")
+
+    counts = sorted({count for count in (1, 2, 4, 8, 16, 32, 64) if count < workers} | {workers})
+    for count in counts:
+        start = time.perf_counter()
+        with MatcherPool(gallery, count) as matcher_pool:
+            # Erste Anfrage veröffentlicht die Galerie im Shared Memory
+            matcher_pool.identify(impostors[0], matcher)
+            started = time.perf_counter() - start
+            pooled, results = run(matcher_pool)
+            step = time.perf_counter()
+            matcher_pool.all_pairs(rows)
+            pooled_pairs = pairs / (time.perf_counter() - step)
+        same = sum((result.label, result.accepted) == (reference.label, reference.accepted)
+                   for result, reference in zip(results, expected))
+        print(f"{count:>8} {pooled['genuine'] * 1000:14.2f}ms {pooled['impostor'] * 1000:12.2f}ms "
+              f"{local['impostor'] / pooled['impostor']:7.2f}x {pooled_pairs / 1e6:8.2f} M/s "
+              f"{pooled_pairs / local_pairs:7.2f}x   (Start {started * 1000:.0f}ms, "
+              f"gleiche Entscheidung {same}/{len(expected)})")
+
+
+def main():
+    logging.basicConfig(level=logging.WARNING, format='%(levelname)s: %(message)s')
+
+    if sys.argv[1:2] == ['stream']:
+        args = sys.argv[2:]
+        stream(float(args[0]) if args else 10.0, int(args[1]) if len(args) > 1 else 8)
+        return
+    if sys.argv[1:2] == ['index']:
+        args = sys.argv[2:]
+        index(int(args[0]) if args else 4000, int(args[1]) if len(args) > 1 else 100)
+        return
+    if sys.argv[1:2] == ['pool']:
+        args = sys.argv[2:]
+        pool(int(args[0]) if args else 4000, int(args[1]) if len(args) > 1 else max(2, os.cpu_count() or 1))
+        return
+
+    if len(sys.argv) < 3 or sys.argv[1] not in ('record', 'replay'):
+        print("📊 Goodix Benchmark")
+        print("=" * 20)
+        print("Verwendung:")
+        print(f"  {sys.argv[0]} record <session.gxs>                      - Session aufzeichnen")
+        print(f"  {sys.argv[0]} replay <session.gxs> [runden] [--realtime] - Session abspielen")
+        print(f"  {sys.argv[0]} stream [sekunden] [slots]                  - Kontinuierlicher Modus")
+        print(f"  {sys.argv[0]} index [benutzer] [proben]                  - 1:N-Index gegen vollständige Suche")
+        print(f"  {sys.argv[0]} pool [benutzer] [worker]                   - Skalierung der Matcher-Worker")
+        sys.exit(1)
+
+    args = [arg for arg in sys.argv[2:] if not arg.startswith('--')]
+    if sys.argv[1] == 'record':
+        record(args[0])
+    else:
+        rounds = int(args[1]) if len(args) > 1 else 20
+        replay(args[0], rounds, '--realtime' in sys.argv)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,547 @@
+"""
+Fingerprint Gallery
+Alle Templates aller Benutzer als gestapelte Arrays für 1:N-Identifikation
+
+Statt die Probe Template für Template mit dem MinutiaeMatcher zu
+vergleichen, liegen alle Minutien in aufgefüllten Arrays (Zeilen =
+Templates, Spalten = bis zu MAX_MINUTIAE Minutien, Maske für die
+Auffüllung). Eine Identifikation läuft in Blöcken von einigen hundert
+Templates komplett als NumPy-Operationen:
+
+    1. Vorfilter: Histogramm-Schnitt gegen alle Templates auf einmal
+    2. Ausrichtung: kompatible Minutien-Paare (Drehung, lokale Struktur)
+       stimmen über ein Raster aus Drehung und Verschiebung ab; die
+       stärkste Zelle jedes Templates wird über ihre Mitglieder gemittelt
+    3. Paarung: Abstands- und Winkelvergleich für alle Templates des
+       Blocks in einem (Templates x Probe x Kandidat)-Array
+
+Die so gewonnene Rangfolge ist eine Näherung (eine Ausrichtung statt
+mehrerer Hypothesen). Pro Benutzer zählt die Summe der zwei besten
+Template-Scores; die Templates der besten RESCORE Benutzer prüft der
+MinutiaeMatcher exakt. Ein einzelner Zufallstreffer gegen eines von
+tausenden Templates reicht so nicht für eine Annahme.
+
+Ab INDEX_MIN_TEMPLATES Templates wählt zuerst der Dreiecks-Index
+(biometrics/index.py) die SHORTLIST aussichtsreichsten Templates; nur
+deren Benutzer durchlaufen die Schritte oben. Galerie und Index werden
+zusammen als .npz gespeichert und beim Start ohne Neuaufbau geladen.
+"""
+
+from typing import Optional, NamedTuple, Sequence, List, Dict, Iterable, Tuple, Any
+import os
+import json
+import logging
+
+import numpy as np
+
+from biometrics.matcher import (MatchTemplate, MinutiaeMatcher, MAX_MINUTIAE, MIN_MINUTIAE,
+                                NEIGHBOURS, NEIGHBOUR_TOLERANCE, MAX_ROTATION,
+                                CONSENSUS_ANGLE, CONSENSUS_DISTANCE, DISTANCE_TOLERANCE,
+                                ANGLE_TOLERANCE, OVERLAP_MARGIN, MIN_OVERLAP,
+                                HISTOGRAM_DISTANCE_BINS, HISTOGRAM_ANGLE_BINS)
+from biometrics.index import TriangleIndex, SHORTLIST
+
+logger = logging.getLogger(__name__)
+
+# Elemente (Templates x Probe-Minutien x Kandidaten-Minutien) pro Block -
+# begrenzt die Arbeitsarrays auf wenige MB; kleine Probes nehmen dafür mehr
+# Templates pro Block und sparen NumPy-Aufrufe
+BLOCK_ELEMENTS = 1 << 18
+
+# Minutien pro Template im Batch-Scoring (die qualitativ besten); der Aufwand
+# wächst mit Probe x Kandidat, die exakte Nachprüfung nutzt alle
+BATCH_MINUTIAE = 16
+
+# Exakte Nachprüfung der besten Benutzer
+RESCORE = 8
+
+# Schwelle für die Summe der zwei besten Template-Scores eines Benutzers.
+# 1:N vergleicht gegen tausende Templates, der beste Zufallstreffer wächst
+# mit der Galerie (Simulator, 3000 Benutzer x 3 Templates: bester Impostor
+# 0.27, ein einzelnes Template bis 0.17)
+IDENTIFY_THRESHOLD = 0.3
+
+# Zellgröße der Ausrichtungs-Abstimmung in Vielfachen der Konsens-Toleranz:
+# kleinere Zellen zerteilen echte Cluster an den Zellgrenzen
+VOTE_CELL = 1.5
+
+# Mindestanzahl übereinstimmender Paar-Hypothesen, damit ein Template die
+# Paarung überhaupt erreicht
+MIN_SUPPORT = 3
+
+# Ab dieser Galeriegröße wählt der Dreiecks-Index die Kandidaten vor;
+# darunter ist das Batch-Scoring aller Templates billiger
+INDEX_MIN_TEMPLATES = 4 * SHORTLIST
+
+# Format der gespeicherten Galerie (.npz)
+GALLERY_VERSION = 1
+
+# Auffüllwert für Nachbarabstände: keine Struktur passt dazu
+_PAD_DISTANCE = 1e4
+
+# Zeilen-Arrays (erste Achse = Template)
+_ARRAYS = ('_x', '_y', '_cos', '_sin', '_valid', '_neighbours', '_histogram',
+           '_count', '_owner', '_width', '_height')
+
+
+class IdentifyResult(NamedTuple):
+    label: Optional[str]  # Benutzer (None = kein Treffer)
+    score: float
+    matched: int
+    accepted: bool
+    index: int = -1       # Zeile in der Galerie
+    slot: int = -1        # Template-Nummer des Benutzers
+    candidates: int = 0   # Templates nach dem Vorfilter
+
+
+class StackedGallery:
+    """
+    Templates aller Benutzer in aufgefüllten float32-Arrays
+
+    add() hängt eine Zeile an (Kapazität wächst geometrisch) und trägt sie
+    in den Dreiecks-Index ein, remove() entfernt alle Zeilen eines
+    Benutzers. labels/slots ordnen jede Zeile ihrem Benutzer und dessen
+    Template-Nummer zu. save()/load() legen Arrays und Index zusammen ab.
+    """
+
+    def __init__(self, capacity: int = 64):
+        self.labels: List[str] = []
+        self.slots: List[int] = []
+        self.index = TriangleIndex()
+        self._per_label: Dict[str, int] = {}
+        # Benutzer als Integer für die Score-Fusion pro Benutzer
+        self._owners: Dict[str, int] = {}
+        self._size = 0
+        # Zählt Änderungen - Kopien (z.B. im MatcherPool) erkennen so Veraltung
+        self.generation = 0
+        self._allocate(max(1, capacity))
+
+    def _allocate(self, capacity: int):
+        def grow(old: Optional[np.ndarray], shape: tuple, dtype, fill) -> np.ndarray:
+            array = np.full((capacity,) + shape, fill, dtype=dtype)
+            if old is not None:
+                array[:self._size] = old[:self._size]
+            return array
+
+        get = lambda name: getattr(self, name, None)
+        self._x = grow(get('_x'), (MAX_MINUTIAE,), np.float32, 0.0)
+        self._y = grow(get('_y'), (MAX_MINUTIAE,), np.float32, 0.0)
+        self._cos = grow(get('_cos'), (MAX_MINUTIAE,), np.float32, 0.0)
+        self._sin = grow(get('_sin'), (MAX_MINUTIAE,), np.float32, 0.0)
+        self._valid = grow(get('_valid'), (MAX_MINUTIAE,), bool, False)
+        self._neighbours = grow(get('_neighbours'), (MAX_MINUTIAE, NEIGHBOURS), np.float32, _PAD_DISTANCE)
+        self._histogram = grow(get('_histogram'), (HISTOGRAM_DISTANCE_BINS * HISTOGRAM_ANGLE_BINS,),
+                               np.float32, 0.0)
+        self._count = grow(get('_count'), (), np.int32, 0)
+        self._owner = grow(get('_owner'), (), np.int32, -1)
+        self._width = grow(get('_width'), (), np.float32, 0.0)
+        self._height = grow(get('_height'), (), np.float32, 0.0)
+
+    @classmethod
+    def from_templates(cls, entries: Iterable[Tuple[str, Sequence[MatchTemplate]]]) -> 'StackedGallery':
+        """Galerie aus (Benutzer, Templates)-Paaren"""
+        entries = [(label, list(templates)) for label, templates in entries]
+        gallery = cls(capacity=sum(len(templates) for _, templates in entries))
+        for label, templates in entries:
+            for template in templates:
+                gallery.add(label, template)
+        return gallery
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> 'StackedGallery':
+        """
+        Nur-Lese-Galerie direkt über fremden Arrays (z.B. Shared Memory)
+
+        Ohne Labels und Index - geeignet für prefilter() und scores().
+        """
+        gallery = cls(capacity=1)
+        for name in _ARRAYS:
+            setattr(gallery, name, arrays[name.lstrip('_')])
+        gallery._size = len(gallery._count)
+        return gallery
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """Die belegten Zeilen aller Zeilen-Arrays (Views, keine Kopien)"""
+        return {name.lstrip('_'): getattr(self, name)[:self._size] for name in _ARRAYS}
+
+    def __len__(self) -> int:
+        return self._size
+
+    def template(self, index: int) -> MatchTemplate:
+        """MatchTemplate einer Zeile (aus den gestapelten Arrays)"""
+        count = int(self._count[index])
+        return MatchTemplate(self._x[index, :count].astype(np.float64),
+                             self._y[index, :count].astype(np.float64),
+                             np.arctan2(self._sin[index, :count], self._cos[index, :count]).astype(np.float64),
+                             self._neighbours[index, :count].astype(np.float64),
+                             self._histogram[index].astype(np.float64),
+                             int(self._width[index]), int(self._height[index]))
+
+    def add(self, label: str, template: MatchTemplate) -> int:
+        """Hängt ein vorbereitetes Template an; liefert seine Zeile"""
+        if self._size == len(self._count):
+            self._allocate(2 * len(self._count))
+        row = self._size
+        count = min(template.count, MAX_MINUTIAE)
+        self._clear(row)
+        self._x[row, :count] = template.x[:count]
+        self._y[row, :count] = template.y[:count]
+        self._cos[row, :count] = np.cos(template.angle[:count])
+        self._sin[row, :count] = np.sin(template.angle[:count])
+        self._valid[row, :count] = True
+        self._neighbours[row, :count] = template.neighbours[:count]
+        self._histogram[row] = template.histogram
+        self._count[row] = count
+        self._width[row] = template.width
+        self._height[row] = template.height
+
+        self._owner[row] = self._owners.setdefault(label, len(self._owners))
+        self.slots.append(self._per_label.get(label, 0))
+        self._per_label[label] = self.slots[-1] + 1
+        self.labels.append(label)
+        self.index.add(row, template)
+        self._size += 1
+        self.generation += 1
+        return row
+
+    def _clear(self, row: int):
+        self._x[row] = 0.0
+        self._y[row] = 0.0
+        self._cos[row] = 0.0
+        self._sin[row] = 0.0
+        self._valid[row] = False
+        self._neighbours[row] = _PAD_DISTANCE
+
+    def remove(self, label: str) -> int:
+        """Entfernt alle Templates eines Benutzers; liefert deren Anzahl"""
+        keep = np.array([label_ != label for label_ in self.labels], dtype=bool)
+        removed = int(self._size - keep.sum())
+        if not removed:
+            return 0
+        for name in _ARRAYS:
+            array = getattr(self, name)
+            kept = array[:self._size][keep]
+            array[:len(kept)] = kept
+        mapping = np.where(keep, np.cumsum(keep) - 1, -1)
+        self.index.remap(mapping)
+        self.labels = [label_ for label_, k in zip(self.labels, keep) if k]
+        self.slots = [slot for slot, k in zip(self.slots, keep) if k]
+        self._per_label.pop(label, None)
+        self._size -= removed
+        self.generation += 1
+        return removed
+
+    # ------------------------------------------------------------------
+    # Persistenz
+    # ------------------------------------------------------------------
+
+    def save(self, path: str, source: Dict[str, Any]):
+        """
+        Speichert Arrays und Index atomar (Rechte 0600 wie die Enrollment-
+        Datei - die Galerie enthält die Minutien aller Benutzer); source
+        beschreibt die Enrollment-Daten
+        """
+        arrays = self.arrays()
+        arrays.update(self.index.state())
+        meta = {'version': GALLERY_VERSION, 'source': source}
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        try:
+            with open(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'wb') as f:
+                np.savez(f, labels=np.array(self.labels, dtype=str),
+                         slots=np.array(self.slots, dtype=np.int32), meta=json.dumps(meta), **arrays)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"⚠️ Galerie nicht gespeichert: {e}")
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+    @classmethod
+    def load(cls, path: str, source: Dict[str, Any]) -> Optional['StackedGallery']:
+        """Gespeicherte Galerie, wenn Version und Enrollment-Daten noch passen"""
+        try:
+            with np.load(path) as entry:
+                meta = json.loads(str(entry['meta']))
+                if meta.get('version') != GALLERY_VERSION or meta.get('source') != source:
+                    return None
+                labels = [str(label) for label in entry['labels']]
+                gallery = cls(capacity=max(1, len(labels)))
+                for name in _ARRAYS:
+                    getattr(gallery, name)[:len(labels)] = entry[name.lstrip('_')]
+                gallery.index = TriangleIndex.from_state(entry)
+                slots = entry['slots'].tolist()
+        except (OSError, ValueError, KeyError):
+            return None
+
+        gallery._size = len(labels)
+        gallery.labels, gallery.slots = labels, slots
+        for row, (label, slot) in enumerate(zip(labels, slots)):
+            gallery._owner[row] = gallery._owners.setdefault(label, len(gallery._owners))
+            gallery._per_label[label] = max(gallery._per_label.get(label, 0), slot + 1)
+        return gallery
+
+    # ------------------------------------------------------------------
+    # Batch-Scoring
+    # ------------------------------------------------------------------
+
+    def prefilter(self, probe: MatchTemplate, minimum: float,
+                  rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Zeilen, deren Paar-Histogramm die Mindest-Ähnlichkeit erreicht"""
+        if rows is None:
+            rows = np.arange(self._size)
+        histogram = probe.histogram.astype(np.float32)
+        similarity = np.minimum(self._histogram[rows], histogram).sum(axis=1)
+        passed = (similarity >= minimum) & (self._count[rows] >= MIN_MINUTIAE)
+        return rows[passed]
+
+    def scores(self, probe: MatchTemplate, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Genäherter Score und gepaarte Minutien für die angegebenen Zeilen"""
+        score = np.zeros(len(rows), dtype=np.float32)
+        matched = np.zeros(len(rows), dtype=np.int32)
+        if probe.count < MIN_MINUTIAE:
+            return score, matched
+        # Nach Minutien-Anzahl sortiert, damit jeder Block nur bis zu seinem
+        # eigenen Maximum aufgefüllt ist
+        order = np.argsort(self._count[rows], kind='stable')
+        chunk = max(16, BLOCK_ELEMENTS // (min(probe.count, BATCH_MINUTIAE) * BATCH_MINUTIAE))
+        for start in range(0, len(rows), chunk):
+            positions = order[start:start + chunk]
+            score[positions], matched[positions] = self._score_chunk(probe, rows[positions])
+        return score, matched
+
+    def _score_chunk(self, probe: MatchTemplate, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        count = len(rows)
+        px = probe.x[:BATCH_MINUTIAE].astype(np.float32)
+        py = probe.y[:BATCH_MINUTIAE].astype(np.float32)
+        pa = probe.angle[:BATCH_MINUTIAE].astype(np.float32)
+        pn = probe.neighbours[:BATCH_MINUTIAE].astype(np.float32)
+        width = min(int(self._count[rows].max()), BATCH_MINUTIAE)
+        gx, gy = self._x[rows, :width], self._y[rows, :width]
+        gc, gs = self._cos[rows, :width], self._sin[rows, :width]
+        gn = self._neighbours[rows, :width]
+
+        # Kompatible Paare (Template, Probe-Minutie, Kandidaten-Minutie):
+        # cos(Drehung) über Einheitsvektoren statt Winkel-Wrap, Nachbarn als
+        # Summe der Abstandsdifferenzen; aufgefüllte Spalten scheitern an
+        # beiden Tests (Einheitsvektor 0, Nachbarabstand _PAD_DISTANCE)
+        pc, ps = np.cos(pa), np.sin(pa)
+        turn = gc[:, np.newaxis, :] * pc[np.newaxis, :, np.newaxis]
+        turn += gs[:, np.newaxis, :] * ps[np.newaxis, :, np.newaxis]
+        structure = np.abs(gn[:, np.newaxis, :, 0] - pn[np.newaxis, :, np.newaxis, 0])
+        for k in range(1, NEIGHBOURS):
+            structure += np.abs(gn[:, np.newaxis, :, k] - pn[np.newaxis, :, np.newaxis, k])
+        compatible = (turn >= np.cos(MAX_ROTATION)) & (structure <= NEIGHBOURS * NEIGHBOUR_TOLERANCE)
+        b, i, j = np.nonzero(compatible)
+        score = np.zeros(count, dtype=np.float32)
+        matched = np.zeros(count, dtype=np.int32)
+        if not len(b):
+            return score, matched
+
+        # Hypothesen: Drehung (cos/sin über die Einheitsvektoren) und
+        # Verschiebung je Paar
+        cb, sb, cp, sp = gc[b, j], gs[b, j], pc[i], ps[i]
+        cos = cb * cp + sb * sp
+        sin = sb * cp - cb * sp
+        dx = gx[b, j] - (cos * px[i] - sin * py[i])
+        dy = gy[b, j] - (sin * px[i] + cos * py[i])
+
+        # Abstimmung im Raster; |Drehung| ist höchstens MAX_ROTATION, dort
+        # ist sin monoton und fast linear
+        tb = np.floor(sin * (1.0 / np.sin(VOTE_CELL * CONSENSUS_ANGLE))).astype(np.int64)
+        xb = np.floor(dx * (1.0 / (VOTE_CELL * CONSENSUS_DISTANCE))).astype(np.int64)
+        yb = np.floor(dy * (1.0 / (VOTE_CELL * CONSENSUS_DISTANCE))).astype(np.int64)
+        tb -= tb.min()
+        xb -= xb.min()
+        yb -= yb.min()
+        ty, tx = int(yb.max()) + 1, int(xb.max()) + 1
+        cells = (int(tb.max()) + 1) * tx * ty
+        key = b * cells + (tb * tx + xb) * ty + yb
+
+        # Stimmen je Zelle = Lauflängen der sortierten Schlüssel; stärkste
+        # Zelle je Template zuerst
+        ordered = np.sort(key)
+        starts = np.flatnonzero(np.concatenate(([True], ordered[1:] != ordered[:-1])))
+        votes = np.diff(np.append(starts, len(ordered)))
+        cell = ordered[starts]
+        owner = cell // cells
+        order = np.lexsort((-votes, owner))
+        first = order[np.concatenate(([True], owner[order[1:]] != owner[order[:-1]]))]
+        best_cell = np.full(count, -1, dtype=np.int64)
+        best_cell[owner[first]] = cell[first]
+        support = np.zeros(count, dtype=np.int64)
+        support[owner[first]] = votes[first]
+
+        # Verfeinerung: Mittel der Hypothesen in der stärksten Zelle
+        winners = np.flatnonzero(key == best_cell[b])
+        owners = b[winners]
+        members = np.maximum(support, 1)
+        rotation = np.arctan2(np.bincount(owners, weights=sin[winners], minlength=count),
+                              np.bincount(owners, weights=cos[winners], minlength=count))
+        shift_x = np.bincount(owners, weights=dx[winners], minlength=count) / members
+        shift_y = np.bincount(owners, weights=dy[winners], minlength=count) / members
+
+        # Paarung nur für Templates mit genügend Zustimmung
+        active = np.nonzero(support >= MIN_SUPPORT)[0]
+        if not len(active):
+            return score, matched
+        rot = rotation[active].astype(np.float32)
+        sx = shift_x[active].astype(np.float32)
+        sy = shift_y[active].astype(np.float32)
+        cos, sin = np.cos(rot)[:, np.newaxis], np.sin(rot)[:, np.newaxis]
+        x = cos * px - sin * py + sx[:, np.newaxis]
+        y = sin * px + cos * py + sy[:, np.newaxis]
+        cx, cy, cvalid = gx[active], gy[active], self._valid[rows[active], :width]
+
+        distance = np.square(x[:, :, np.newaxis] - cx[:, np.newaxis, :])
+        distance += np.square(y[:, :, np.newaxis] - cy[:, np.newaxis, :])
+        # Richtung der gedrehten Probe-Minutien, wieder über Einheitsvektoren
+        angle_cos = cos * pc - sin * ps
+        angle_sin = sin * pc + cos * ps
+        turn = angle_cos[:, :, np.newaxis] * gc[active][:, np.newaxis, :]
+        turn += angle_sin[:, :, np.newaxis] * gs[active][:, np.newaxis, :]
+        close = (distance <= DISTANCE_TOLERANCE ** 2) & (turn >= np.cos(ANGLE_TOLERANCE))
+        pairs = np.minimum(close.any(axis=2).sum(axis=1), close.any(axis=1).sum(axis=1))
+
+        # Überlappung in beiden Richtungen (wie MinutiaeMatcher._pair)
+        right, bottom = self._width[rows][active, np.newaxis], self._height[rows][active, np.newaxis]
+        margin = OVERLAP_MARGIN
+        probe_inside = ((x >= -margin) & (x <= right + margin)
+                        & (y >= -margin) & (y <= bottom + margin)).sum(axis=1)
+        back_x = cos * (cx - sx[:, np.newaxis]) + sin * (cy - sy[:, np.newaxis])
+        back_y = -sin * (cx - sx[:, np.newaxis]) + cos * (cy - sy[:, np.newaxis])
+        candidate_inside = ((back_x >= -margin) & (back_x <= probe.width + margin)
+                            & (back_y >= -margin) & (back_y <= probe.height + margin)
+                            & cvalid).sum(axis=1)
+        denominator = (np.maximum(np.maximum(probe_inside, pairs), MIN_OVERLAP)
+                       * np.maximum(np.maximum(candidate_inside, pairs), MIN_OVERLAP))
+        score[active] = pairs ** 2 / denominator
+        matched[active] = pairs
+        return score, matched
+
+    # ------------------------------------------------------------------
+    # Identifikation
+    # ------------------------------------------------------------------
+
+    def rows_of(self, label: str) -> np.ndarray:
+        """Zeilen eines Benutzers"""
+        owner = self._owners.get(label)
+        if owner is None:
+            return np.zeros(0, dtype=np.int64)
+        return np.nonzero(self._owner[:self._size] == owner)[0]
+
+    def rank(self, probe: MatchTemplate, matcher: MinutiaeMatcher, top: int = RESCORE,
+             rows: Optional[np.ndarray] = None) -> List[Tuple[str, float]]:
+        """
+        Beste Benutzer nach genähertem, fusioniertem Score
+
+        Score eines Benutzers = Summe seiner zwei besten Template-Scores:
+        ein echter Finger trifft mehrere Templates, ein Zufallstreffer
+        meist nur eines.
+        """
+        candidates = self.prefilter(probe, matcher.prefilter, self.shortlist(probe, rows))
+        return self.fuse(candidates, self.scores(probe, candidates)[0], top)
+
+    def shortlist(self, probe: MatchTemplate, rows: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
+        """
+        Kandidaten-Zeilen aus dem Dreiecks-Index (alle Templates der
+        vorgewählten Benutzer, damit die Score-Fusion vollständig bleibt);
+        None = alle Zeilen, solange die Galerie für den Index zu klein ist
+        """
+        if rows is not None or self._size < INDEX_MIN_TEMPLATES:
+            return rows
+        shortlist = self.index.shortlist(probe, self._size)
+        owners = self._owner[:self._size]
+        return np.flatnonzero(np.isin(owners, owners[shortlist]))
+
+    def fuse(self, candidates: np.ndarray, score: np.ndarray, top: int) -> List[Tuple[str, float]]:
+        """Die top Benutzer nach der Summe ihrer zwei besten Zeilen-Scores"""
+        if not len(candidates):
+            return []
+        owner = self._owner[candidates]
+        order = np.lexsort((-score, owner))
+        owner, score = owner[order], score[order]
+        first = np.ones(len(owner), dtype=bool)
+        first[1:] = owner[1:] != owner[:-1]
+        starts = np.nonzero(first)[0]
+        second = starts + 1
+        has_second = second < len(owner)
+        has_second[has_second] = owner[second[has_second]] == owner[starts[has_second]]
+        fused = score[starts] + np.where(has_second, score[np.minimum(second, len(score) - 1)], 0)
+
+        names = {owner_id: label for label, owner_id in self._owners.items()}
+        ranking = []
+        for position in np.argsort(-fused, kind='stable')[:top]:
+            if fused[position] <= 0:
+                break
+            ranking.append((names[int(owner[starts[position]])], float(fused[position])))
+        return ranking
+
+    def identify(self, probe: MatchTemplate, matcher: Optional[MinutiaeMatcher] = None,
+                 rescore: int = RESCORE, rows: Optional[np.ndarray] = None,
+                 threshold: float = IDENTIFY_THRESHOLD, full_scan: bool = True) -> IdentifyResult:
+        """
+        Bester Benutzer für eine Probe
+
+        Batch-Scoring über die (vorgefilterte) Galerie, danach exakter
+        Vergleich aller Templates der besten Benutzer. Angenommen wird der
+        erste Benutzer, dessen fusionierter Score die Schwelle erreicht und
+        dessen bestes Template auch allein verify() bestehen würde.
+
+        Ohne Annahme über die Index-Shortlist folgt eine Suche über alle
+        übrigen Benutzer (full_scan) - der Index beschleunigt Annahmen,
+        entscheidet aber nicht allein über eine Ablehnung.
+        """
+        matcher = matcher or MinutiaeMatcher()
+        if probe.count < MIN_MINUTIAE:
+            return IdentifyResult(None, 0.0, 0, False)
+        shortlist = self.shortlist(probe, rows)
+        candidates = self.prefilter(probe, matcher.prefilter, shortlist)
+        ranking = self.fuse(candidates, self.scores(probe, candidates)[0], rescore)
+        result = self.confirm(probe, matcher, ranking, shortlist, len(candidates), threshold)
+        if result.accepted or not full_scan or rows is not None or shortlist is None:
+            return result
+
+        # Impostor oder vom Index verfehlter Benutzer
+        rest = self.rest(shortlist)
+        candidates = self.prefilter(probe, matcher.prefilter, rest)
+        ranking = self.fuse(candidates, self.scores(probe, candidates)[0], rescore)
+        # rest enthält nur vollständige Benutzer - confirm braucht keine Zeilenmenge
+        return self.merge(result, self.confirm(probe, matcher, ranking, None, len(candidates), threshold))
+
+    def rest(self, rows: np.ndarray) -> np.ndarray:
+        """Alle Zeilen außer rows (bei einer Shortlist: die übrigen Benutzer)"""
+        mask = np.ones(self._size, dtype=bool)
+        mask[rows] = False
+        return np.flatnonzero(mask)
+
+    @staticmethod
+    def merge(first: IdentifyResult, second: IdentifyResult) -> IdentifyResult:
+        """Ergebnis aus Shortlist- und Restsuche (Kandidaten beider Durchläufe)"""
+        best = second if second.accepted or second.score > first.score else first
+        return best._replace(candidates=first.candidates + second.candidates)
+
+    def confirm(self, probe: MatchTemplate, matcher: MinutiaeMatcher, ranking: List[Tuple[str, float]],
+                rows: Optional[np.ndarray] = None, candidates: int = 0,
+                threshold: float = IDENTIFY_THRESHOLD) -> IdentifyResult:
+        """Exakter Vergleich der Benutzer einer Rangfolge (nur Zeilen aus rows)"""
+        best = IdentifyResult(None, 0.0, 0, False, candidates=candidates)
+        allowed = None if rows is None else set(int(row) for row in rows)
+        for label, _ in ranking:
+            results = []
+            for row in self.rows_of(label):
+                if allowed is None or int(row) in allowed:
+                    results.append((matcher.match(probe, self.template(row)), int(row)))
+            results.sort(key=lambda item: -item[0].score)
+            top, row = results[0]
+            fused = top.score + (results[1][0].score if len(results) > 1 else 0.0)
+            accepted = fused >= threshold and top.accepted
+            if fused > best.score or accepted:
+                best = IdentifyResult(label, fused, top.matched, accepted, row,
+                                      self.slots[row], candidates)
+            if accepted:
+                break
+        if not best.accepted:
+            # Ohne Annahme kein Benutzer - der Score bleibt zur Diagnose
+            best = best._replace(label=None)
+        return best
@@ -0,0 +1,179 @@
+"""
+Fingerprint Index
+Geometrisches Hashing über Minutien-Dreiecke für sublineare 1:N-Suche
+
+Jede Minutie bildet mit je zwei ihrer TRIANGLE_NEIGHBOURS nächsten
+Nachbarn ein Dreieck. Dessen Merkmale sind unabhängig von Drehung und
+Verschiebung des Fingers:
+
+    - die drei Seitenlängen, sortiert, in SIDE_STEP-Pixel-Stufen
+    - pro Ecke (geordnet nach der gegenüberliegenden Seite) die Richtung
+      der Minutie relativ zur Richtung zum Schwerpunkt, in ANGLE_BINS Stufen
+
+Die quantisierten Merkmale ergeben einen int32-Schlüssel; der Index ist
+ein nach Schlüssel sortiertes Array von (Schlüssel, Galerie-Zeile). Eine
+Anfrage sucht die Schlüssel der Probe per searchsorted, zählt die Stimmen
+pro Zeile mit bincount und liefert die SHORTLIST Zeilen mit den meisten
+Stimmen. Seitenlängen liegen oft an einer Stufengrenze - die Probe fragt
+deshalb für jede Seite die zwei nächsten Stufen ab (8 Schlüssel pro
+Dreieck), die Galerie speichert nur einen.
+
+Neue Templates landen zunächst in einem Puffer und werden bei der nächsten
+Anfrage einsortiert; so bleibt eine Registrierung billig.
+"""
+
+from typing import Optional, List, Tuple, Dict
+import itertools
+import logging
+
+import numpy as np
+
+from biometrics.matcher import MatchTemplate
+
+logger = logging.getLogger(__name__)
+
+# Dreiecke pro Minutie: Paare aus den nächsten Nachbarn
+TRIANGLE_NEIGHBOURS = 6
+
+# Nur die qualitativ besten Minutien spannen Dreiecke auf
+INDEX_MINUTIAE = 24
+
+# Quantisierung: Seitenlänge (Pixel) und Minutien-Richtung
+SIDE_STEP = 4.0
+MAX_SIDE = 80.0
+ANGLE_BINS = 12
+
+# Zeilen, die eine Anfrage an den Matcher weitergibt
+SHORTLIST = 64
+
+_SIDE_BINS = int(MAX_SIDE / SIDE_STEP) + 2
+
+
+def triangles(template: MatchTemplate) -> Tuple[np.ndarray, np.ndarray]:
+    """Sortierte Seitenlängen (n, 3) und relative Eckwinkel (n, 3) in rad"""
+    count = min(template.count, INDEX_MINUTIAE)
+    empty = np.zeros((0, 3))
+    if count < 3:
+        return empty, empty
+    x, y, angle = template.x[:count], template.y[:count], template.angle[:count]
+    distance = np.hypot(x[:, np.newaxis] - x[np.newaxis, :], y[:, np.newaxis] - y[np.newaxis, :])
+    np.fill_diagonal(distance, np.inf)
+
+    neighbours = min(TRIANGLE_NEIGHBOURS, count - 1)
+    nearest = np.argsort(distance, axis=1)[:, :neighbours]
+    first, second = np.triu_indices(neighbours, k=1)
+    corners = np.stack([np.repeat(np.arange(count), len(first)),
+                        nearest[:, first].ravel(), nearest[:, second].ravel()], axis=1)
+    corners.sort(axis=1)
+    corners = np.unique(corners, axis=0)
+
+    # Seite gegenüber jeder Ecke
+    i, j, k = corners.T
+    sides = np.stack([distance[j, k], distance[i, k], distance[i, j]], axis=1)
+    keep = sides.max(axis=1) < MAX_SIDE
+    sides, corners = sides[keep], corners[keep]
+    order = np.argsort(sides, axis=1)
+    sides = np.take_along_axis(sides, order, axis=1)
+    corners = np.take_along_axis(corners, order, axis=1)
+
+    cx = x[corners].mean(axis=1, keepdims=True)
+    cy = y[corners].mean(axis=1, keepdims=True)
+    relative = np.mod(angle[corners] - np.arctan2(cy - y[corners], cx - x[corners]), 2 * np.pi)
+    return sides, relative
+
+
+def _pack(side_bins: List[np.ndarray], angle_bins: List[np.ndarray]) -> np.ndarray:
+    key = side_bins[0].astype(np.int32)
+    for value in side_bins[1:]:
+        key = key * _SIDE_BINS + value
+    for value in angle_bins:
+        key = key * ANGLE_BINS + value
+    return key
+
+
+def triangle_keys(template: MatchTemplate, probe: bool = False) -> np.ndarray:
+    """Eindeutige Schlüssel eines Templates; probe=True fragt Nachbarstufen mit ab"""
+    sides, relative = triangles(template)
+    if not len(sides):
+        return np.zeros(0, dtype=np.int32)
+    angle_bins = [np.floor(relative[:, c] * (ANGLE_BINS / (2 * np.pi))).astype(np.int32) % ANGLE_BINS
+                  for c in range(3)]
+    if not probe:
+        side_bins = [np.clip(np.floor(sides[:, c] / SIDE_STEP).astype(np.int32), 0, _SIDE_BINS - 1)
+                     for c in range(3)]
+        return np.unique(_pack(side_bins, angle_bins))
+
+    # Die zwei Stufen, deren Mitte der Seitenlänge am nächsten liegt
+    lower = np.floor(sides / SIDE_STEP - 0.5).astype(np.int32)
+    options = (np.clip(lower, 0, _SIDE_BINS - 1), np.clip(lower + 1, 0, _SIDE_BINS - 1))
+    keys = [_pack([options[pick][:, c] for c, pick in enumerate(combination)], angle_bins)
+            for combination in itertools.product((0, 1), repeat=3)]
+    return np.unique(np.concatenate(keys))
+
+
+class TriangleIndex:
+    """Sortierte (Schlüssel, Zeile)-Arrays plus Puffer für neue Templates"""
+
+    def __init__(self, keys: Optional[np.ndarray] = None, rows: Optional[np.ndarray] = None):
+        self._keys = keys if keys is not None else np.zeros(0, dtype=np.int32)
+        self._rows = rows if rows is not None else np.zeros(0, dtype=np.int32)
+        self._pending: List[Tuple[np.ndarray, np.ndarray]] = []
+
+    def __len__(self) -> int:
+        return len(self._keys) + sum(len(keys) for keys, _ in self._pending)
+
+    @property
+    def nbytes(self) -> int:
+        self._merge()
+        return self._keys.nbytes + self._rows.nbytes
+
+    def add(self, row: int, template: MatchTemplate):
+        keys = triangle_keys(template)
+        self._pending.append((keys, np.full(len(keys), row, dtype=np.int32)))
+
+    def remap(self, mapping: np.ndarray):
+        """Neue Zeilennummern nach dem Entfernen von Zeilen (-1 = entfernt)"""
+        self._merge()
+        rows = mapping[self._rows]
+        keep = rows >= 0
+        self._keys, self._rows = self._keys[keep], rows[keep].astype(np.int32)
+
+    def _merge(self):
+        if not self._pending:
+            return
+        keys = np.concatenate([self._keys] + [keys for keys, _ in self._pending])
+        rows = np.concatenate([self._rows] + [rows for _, rows in self._pending])
+        order = np.argsort(keys, kind='stable')
+        self._keys, self._rows = keys[order], rows[order]
+        self._pending = []
+
+    def votes(self, probe: MatchTemplate, size: int) -> np.ndarray:
+        """Stimmen pro Galerie-Zeile (Länge size)"""
+        self._merge()
+        keys = triangle_keys(probe, probe=True)
+        if not len(keys) or not len(self._keys):
+            return np.zeros(size, dtype=np.int64)
+        start = np.searchsorted(self._keys, keys, side='left')
+        hits = np.searchsorted(self._keys, keys, side='right') - start
+        # Alle Treffer-Bereiche als ein Index-Array
+        offsets = np.repeat(start - np.cumsum(hits) + hits, hits) + np.arange(hits.sum())
+        return np.bincount(self._rows[offsets], minlength=size)
+
+    def shortlist(self, probe: MatchTemplate, size: int, limit: int = SHORTLIST) -> np.ndarray:
+        """Die limit Zeilen mit den meisten Stimmen (ohne Zeilen ohne Stimme)"""
+        votes = self.votes(probe, size)
+        if len(votes) > limit:
+            rows = np.argpartition(-votes, limit)[:limit]
+        else:
+            rows = np.arange(len(votes))
+        return np.sort(rows[votes[rows] > 0])
+
+    def state(self) -> Dict[str, np.ndarray]:
+        """Arrays zum Speichern (zusammen mit der Galerie)"""
+        self._merge()
+        return {'index_keys': self._keys, 'index_rows': self._rows}
+
+    @classmethod
+    def from_state(cls, state) -> 'TriangleIndex':
+        return cls(np.asarray(state['index_keys'], dtype=np.int32),
+                   np.asarray(state['index_rows'], dtype=np.int32))
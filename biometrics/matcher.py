@@ -0,0 +1,253 @@
+"""
+Fingerprint Minutiae Matcher
+Kaskadierter Vergleich zweier Minutien-Templates mit frühem Abbruch
+
+Stufen, jeweils billiger als die nächste:
+
+    1. Vorfilter: Anzahl Minutien und ein rotations-/translationsinvarianter
+       Deskriptor (Histogramm über Abstand und Relativwinkel aller
+       Minutien-Paare). Offensichtliche Nicht-Treffer enden hier nach
+       wenigen Mikrosekunden.
+    2. Ausrichtung: jedes Minutien-Paar (Probe, Kandidat) mit passender
+       lokaler Struktur (Abstände zu den nächsten Nachbarn) liefert eine
+       Hypothese für Drehung und Verschiebung. Hypothesen, die von vielen
+       anderen bestätigt werden, gewinnen.
+    3. Paarung: die Probe wird mit den besten Hypothesen ausgerichtet und
+       Minutien mit passender Position und Richtung gezählt.
+       Score = gepaarte² / (Probe-Minutien im Überlappungsbereich x
+       Kandidaten-Minutien im Überlappungsbereich), Überlappung mindestens
+       MIN_OVERLAP.
+
+Sobald eine Hypothese die Schwelle erreicht, ist die Annahme sicher - die
+restlichen Hypothesen und (bei verify) die restlichen Templates werden
+nicht mehr geprüft.
+"""
+
+from typing import Optional, NamedTuple, Sequence, List
+import logging
+
+import numpy as np
+
+from biometrics.minutiae import FeatureSet
+
+logger = logging.getLogger(__name__)
+
+# Nur die besten Minutien gehen in den Vergleich
+MAX_MINUTIAE = 48
+MIN_MINUTIAE = 4
+
+# Vorfilter: Paar-Histogramm (Abstand x Relativwinkel) und Mindest-Ähnlichkeit
+HISTOGRAM_DISTANCE_BINS = 6
+HISTOGRAM_MAX_DISTANCE = 60.0
+HISTOGRAM_ANGLE_BINS = 8
+PREFILTER_MIN_SIMILARITY = 0.25
+
+# Ausrichtung: nächste Nachbarn für die lokale Struktur und Toleranzen
+NEIGHBOURS = 3
+NEIGHBOUR_TOLERANCE = 8.0
+MAX_ROTATION = np.radians(45)
+MAX_HYPOTHESES = 256
+CONSENSUS_DISTANCE = 6.0
+CONSENSUS_ANGLE = np.radians(15)
+ALIGNMENTS = 3
+
+# Paarung
+DISTANCE_TOLERANCE = 4.0
+ANGLE_TOLERANCE = np.radians(20)
+OVERLAP_MARGIN = 4.0
+# Untergrenze der Überlappung: wenige Zufallspaare in einem kleinen
+# Überlappungsbereich ergeben sonst einen hohen Score
+MIN_OVERLAP = 12
+
+# Entscheidung
+MATCH_THRESHOLD = 0.12
+MIN_MATCHED = 5
+
+STAGE_EMPTY = 'empty'
+STAGE_PREFILTER = 'prefilter'
+STAGE_ALIGNMENT = 'alignment'
+
+
+class MatchTemplate(NamedTuple):
+    """Für den Vergleich vorbereitetes Template (Arrays pro Minutie)"""
+    x: np.ndarray
+    y: np.ndarray
+    angle: np.ndarray
+    neighbours: np.ndarray  # (n, NEIGHBOURS) Abstände zu den nächsten Minutien
+    histogram: np.ndarray   # normiertes Paar-Histogramm für den Vorfilter
+    width: int
+    height: int
+
+    @property
+    def count(self) -> int:
+        return len(self.x)
+
+
+class MatchResult(NamedTuple):
+    score: float
+    matched: int
+    accepted: bool
+    stage: str            # Stufe, in der die Entscheidung fiel
+    index: int = -1       # Template-Index bei verify()
+    rotation: float = 0.0
+    dx: float = 0.0
+    dy: float = 0.0
+
+
+def _wrap(angle: np.ndarray) -> np.ndarray:
+    """Winkel nach (-pi, pi]"""
+    return np.angle(np.exp(1j * angle))
+
+
+def prepare(features: FeatureSet, max_minutiae: int = MAX_MINUTIAE) -> MatchTemplate:
+    """Bereitet ein FeatureSet einmalig für beliebig viele Vergleiche vor"""
+    minutiae = features.minutiae[:max_minutiae]
+    x = minutiae['x'].astype(np.float64)
+    y = minutiae['y'].astype(np.float64)
+    angle = minutiae['angle'].astype(np.float64)
+    count = len(x)
+
+    distance = np.hypot(x[:, np.newaxis] - x[np.newaxis, :], y[:, np.newaxis] - y[np.newaxis, :])
+    neighbours = np.full((count, NEIGHBOURS), HISTOGRAM_MAX_DISTANCE)
+    if count > 1:
+        np.fill_diagonal(distance, np.inf)
+        nearest = np.sort(distance, axis=1)[:, :NEIGHBOURS]
+        neighbours[:, :nearest.shape[1]] = np.minimum(nearest, HISTOGRAM_MAX_DISTANCE)
+
+    histogram = np.zeros(HISTOGRAM_DISTANCE_BINS * HISTOGRAM_ANGLE_BINS)
+    rows, cols = np.triu_indices(count, k=1)
+    if len(rows):
+        pair_distance = distance[rows, cols]
+        near = pair_distance < HISTOGRAM_MAX_DISTANCE
+        relative = np.mod(angle[rows] - angle[cols], 2 * np.pi)[near]
+        distance_bin = (pair_distance[near] * (HISTOGRAM_DISTANCE_BINS / HISTOGRAM_MAX_DISTANCE)).astype(np.int64)
+        angle_bin = np.minimum((relative * (HISTOGRAM_ANGLE_BINS / (2 * np.pi))).astype(np.int64),
+                               HISTOGRAM_ANGLE_BINS - 1)
+        histogram = np.bincount(distance_bin * HISTOGRAM_ANGLE_BINS + angle_bin,
+                                minlength=histogram.size).astype(np.float64)
+        if histogram.sum():
+            histogram /= histogram.sum()
+    return MatchTemplate(x, y, angle, neighbours, histogram, features.width, features.height)
+
+
+def prefilter_similarity(probe: MatchTemplate, candidate: MatchTemplate) -> float:
+    """Histogramm-Schnitt der Paar-Deskriptoren (0..1)"""
+    return float(np.minimum(probe.histogram, candidate.histogram).sum())
+
+
+class MinutiaeMatcher:
+    """Vergleicht Templates; verify() prüft eine Galerie mit frühem Abbruch"""
+
+    def __init__(self, threshold: float = MATCH_THRESHOLD, min_matched: int = MIN_MATCHED,
+                 prefilter: float = PREFILTER_MIN_SIMILARITY):
+        self.threshold = threshold
+        self.min_matched = min_matched
+        self.prefilter = prefilter
+
+    def _accept(self, score: float, matched: int) -> bool:
+        return score >= self.threshold and matched >= self.min_matched
+
+    def match(self, probe: MatchTemplate, candidate: MatchTemplate) -> MatchResult:
+        """Vergleicht zwei vorbereitete Templates"""
+        if probe.count < MIN_MINUTIAE or candidate.count < MIN_MINUTIAE:
+            return MatchResult(0.0, 0, False, STAGE_EMPTY)
+        if prefilter_similarity(probe, candidate) < self.prefilter:
+            return MatchResult(0.0, 0, False, STAGE_PREFILTER)
+
+        best = MatchResult(0.0, 0, False, STAGE_ALIGNMENT)
+        for rotation, dx, dy in self._alignments(probe, candidate):
+            score, matched = self._pair(probe, candidate, rotation, dx, dy)
+            if score > best.score:
+                best = MatchResult(score, matched, self._accept(score, matched), STAGE_ALIGNMENT,
+                                   rotation=rotation, dx=dx, dy=dy)
+                if best.accepted:
+                    # Annahme sicher - weitere Hypothesen ändern nichts
+                    break
+        return best
+
+    def verify(self, probe: MatchTemplate, gallery: Sequence[MatchTemplate]) -> MatchResult:
+        """
+        Prüft die Probe gegen die Templates eines Benutzers
+
+        Templates mit dem ähnlichsten Deskriptor zuerst; die erste sichere
+        Annahme beendet die Suche. Sonst das beste Ergebnis.
+        """
+        if not gallery:
+            return MatchResult(0.0, 0, False, STAGE_EMPTY)
+        similarity = [prefilter_similarity(probe, candidate) for candidate in gallery]
+        best = MatchResult(0.0, 0, False, STAGE_PREFILTER)
+        for index in sorted(range(len(gallery)), key=lambda i: -similarity[i]):
+            result = self.match(probe, gallery[index])._replace(index=index)
+            if result.accepted:
+                return result
+            if result.score > best.score or best.stage != STAGE_ALIGNMENT and result.stage == STAGE_ALIGNMENT:
+                best = result
+        return best
+
+    @staticmethod
+    def _alignments(probe: MatchTemplate, candidate: MatchTemplate) -> List[tuple]:
+        """Drehung/Verschiebung mit der größten Zustimmung unter den Paar-Hypothesen"""
+        rotation = _wrap(candidate.angle[np.newaxis, :] - probe.angle[:, np.newaxis])
+        structure = np.abs(probe.neighbours[:, np.newaxis, :]
+                           - candidate.neighbours[np.newaxis, :, :]).mean(axis=2)
+        compatible = (np.abs(rotation) <= MAX_ROTATION) & (structure <= NEIGHBOUR_TOLERANCE)
+        i, j = np.nonzero(compatible)
+        if not len(i):
+            return []
+        if len(i) > MAX_HYPOTHESES:
+            keep = np.argsort(structure[i, j], kind='stable')[:MAX_HYPOTHESES]
+            i, j = i[keep], j[keep]
+
+        theta = rotation[i, j]
+        cos, sin = np.cos(theta), np.sin(theta)
+        dx = candidate.x[j] - (cos * probe.x[i] - sin * probe.y[i])
+        dy = candidate.y[j] - (sin * probe.x[i] + cos * probe.y[i])
+
+        # Zustimmung: Hypothesen mit ähnlicher Drehung und Verschiebung
+        agree = ((np.abs(_wrap(theta[:, np.newaxis] - theta[np.newaxis, :])) <= CONSENSUS_ANGLE)
+                 & (np.hypot(dx[:, np.newaxis] - dx[np.newaxis, :],
+                             dy[:, np.newaxis] - dy[np.newaxis, :]) <= CONSENSUS_DISTANCE))
+        support = agree.sum(axis=1)
+
+        alignments = []
+        taken = np.zeros(len(i), dtype=bool)
+        for seed in np.argsort(-support, kind='stable'):
+            if len(alignments) >= ALIGNMENTS:
+                break
+            if taken[seed]:
+                continue
+            members = agree[seed]
+            taken |= members
+            # Verfeinerung: Mittel der zustimmenden Hypothesen
+            mean_theta = float(np.angle(np.exp(1j * theta[members]).mean()))
+            alignments.append((mean_theta, float(dx[members].mean()), float(dy[members].mean())))
+        return alignments
+
+    @staticmethod
+    def _pair(probe: MatchTemplate, candidate: MatchTemplate,
+              rotation: float, dx: float, dy: float) -> tuple:
+        """Score und Anzahl gepaarter Minutien unter einer Ausrichtung"""
+        cos, sin = np.cos(rotation), np.sin(rotation)
+        x = cos * probe.x - sin * probe.y + dx
+        y = sin * probe.x + cos * probe.y + dy
+        angle = probe.angle + rotation
+
+        distance = np.hypot(x[:, np.newaxis] - candidate.x[np.newaxis, :],
+                            y[:, np.newaxis] - candidate.y[np.newaxis, :])
+        turn = np.abs(_wrap(angle[:, np.newaxis] - candidate.angle[np.newaxis, :]))
+        close = (distance <= DISTANCE_TOLERANCE) & (turn <= ANGLE_TOLERANCE)
+        matched = int(min(close.any(axis=1).sum(), close.any(axis=0).sum()))
+        if not matched:
+            return 0.0, 0
+
+        # Überlappung: Probe im Kandidaten-Frame, Kandidat (invers) im Probe-Frame
+        margin = OVERLAP_MARGIN
+        probe_inside = ((x >= -margin) & (x <= candidate.width + margin)
+                        & (y >= -margin) & (y <= candidate.height + margin)).sum()
+        back_x = cos * (candidate.x - dx) + sin * (candidate.y - dy)
+        back_y = -sin * (candidate.x - dx) + cos * (candidate.y - dy)
+        candidate_inside = ((back_x >= -margin) & (back_x <= probe.width + margin)
+                            & (back_y >= -margin) & (back_y <= probe.height + margin)).sum()
+        score = matched ** 2 / (max(probe_inside, matched, MIN_OVERLAP)
+                                * max(candidate_inside, matched, MIN_OVERLAP))
+        return float(score), matched
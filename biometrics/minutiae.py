@@ -0,0 +1,326 @@
+"""
+Fingerprint Minutiae Extraction
+Rillenenden und Gabelungen aus dekodierten (kalibrierten) Frames
+
+Pipeline - jede Stufe als Array-Operation über das ganze Bild:
+
+    1. Segmentierung und Orientierungsfeld aus der Quality-Engine
+       (Vordergrund-Blöcke, Rillenrichtung pro Block)
+    2. Rillenperiode: Maximum des radialen Leistungsspektrums im Vordergrund
+    3. Verstärkung: Gabor-Filterbank (ORIENTATIONS Richtungen) per FFT,
+       pro Pixel die Antwort der passenden Richtung (Orientierung bilinear
+       zwischen den Blockmitten interpoliert - keine Sprünge an Blockgrenzen)
+    4. Binarisierung (Rillen = dunkel) und Verdünnung nach Zhang-Suen,
+       beide Teilschritte vektorisiert über alle Pixel
+    5. Crossing Number auf dem Skelett: 1 = Rillenende, 3 = Gabelung;
+       Kandidaten am Rand der Fingerfläche und zu dicht liegende Paare
+       (Brücken, Sporne, Lücken) werden verworfen
+
+Ergebnis ist ein strukturiertes Array (x, y, angle, type, quality). Ein
+108x88-Frame kostet wenige Millisekunden.
+"""
+
+from typing import Optional, NamedTuple, Dict, Tuple, List, Callable, Any
+import logging
+
+import numpy as np
+
+from drivers.goodix_image import FrameFormat, FrameDecoder, infer_format
+from biometrics.quality import assess, QualityReport, BLOCK_SIZE
+
+logger = logging.getLogger(__name__)
+
+MINUTIA_ENDING = 1
+MINUTIA_BIFURCATION = 3
+
+# x, y in Pixeln, angle in rad (0..2pi), type (MINUTIA_*), quality 0..1
+MINUTIA_DTYPE = np.dtype([('x', '<f4'), ('y', '<f4'), ('angle', '<f4'),
+                          ('type', 'u1'), ('quality', '<f4')])
+
+ORIENTATIONS = 16
+
+# Plausibler Bereich der Rillenperiode (Pixel) und Rückfallwert
+MIN_RIDGE_PERIOD = 5.0
+MAX_RIDGE_PERIOD = 14.0
+DEFAULT_RIDGE_PERIOD = 8.0
+
+# Minutien näher als dieser Anteil der Rillenperiode gelten als Artefakt
+MIN_DISTANCE_PERIODS = 0.5
+
+# Mindestabstand zum Rand der Fingerfläche in Rillenperioden
+BORDER_PERIODS = 0.5
+
+# Halbe Fensterbreite für die Richtungsbestimmung am Skelett
+DIRECTION_RADIUS = 3
+
+
+class FeatureSet(NamedTuple):
+    minutiae: np.ndarray  # MINUTIA_DTYPE, nach Qualität absteigend
+    width: int
+    height: int
+    quality: float        # Score der Quality-Engine
+    period: float         # geschätzte Rillenperiode in Pixeln
+
+
+def _upsample(blocks: np.ndarray, shape: Tuple[int, int], block_size: int) -> np.ndarray:
+    """Block-Karte auf Pixelauflösung; Randpixel erben den letzten Block"""
+    full = np.repeat(np.repeat(blocks, block_size, axis=0), block_size, axis=1)
+    pad_y, pad_x = shape[0] - full.shape[0], shape[1] - full.shape[1]
+    if pad_y or pad_x:
+        full = np.pad(full, ((0, max(0, pad_y)), (0, max(0, pad_x))), mode='edge')
+    return full[:shape[0], :shape[1]]
+
+
+def _interpolate_orientation(blocks: np.ndarray, shape: Tuple[int, int],
+                             block_size: int) -> np.ndarray:
+    """Orientierung pro Pixel: bilinear zwischen Blockmitten, im doppelten Winkel"""
+    rows, cols = blocks.shape
+    cos2, sin2 = np.cos(2 * blocks), np.sin(2 * blocks)
+    fy = np.clip((np.arange(shape[0]) - (block_size - 1) / 2) / block_size, 0, rows - 1)
+    fx = np.clip((np.arange(shape[1]) - (block_size - 1) / 2) / block_size, 0, cols - 1)
+    y0, x0 = np.floor(fy).astype(np.int64), np.floor(fx).astype(np.int64)
+    y1, x1 = np.minimum(y0 + 1, rows - 1), np.minimum(x0 + 1, cols - 1)
+    wy, wx = (fy - y0)[:, np.newaxis], (fx - x0)[np.newaxis, :]
+
+    def bilinear(values: np.ndarray) -> np.ndarray:
+        top = values[y0][:, x0] * (1 - wx) + values[y0][:, x1] * wx
+        bottom = values[y1][:, x0] * (1 - wx) + values[y1][:, x1] * wx
+        return top * (1 - wy) + bottom * wy
+
+    return np.mod(0.5 * np.arctan2(bilinear(sin2), bilinear(cos2)), np.pi)
+
+
+def _erode(mask: np.ndarray, radius: int) -> np.ndarray:
+    """Binäre Erosion mit quadratischem Fenster (Randpixel gelten als Hintergrund)"""
+    padded = np.pad(mask, radius, mode='constant', constant_values=False)
+    rows, cols = mask.shape
+    result = np.ones_like(mask)
+    for dy in range(2 * radius + 1):
+        for dx in range(2 * radius + 1):
+            result &= padded[dy:dy + rows, dx:dx + cols]
+    return result
+
+
+def _neighbours(image: np.ndarray) -> List[np.ndarray]:
+    """P2..P9 (N, NO, O, SO, S, SW, W, NW) jedes Pixels als Arrays"""
+    p = np.pad(image, 1, mode='constant')
+    rows, cols = image.shape
+    return [p[0:rows, 1:cols + 1], p[0:rows, 2:cols + 2], p[1:rows + 1, 2:cols + 2],
+            p[2:rows + 2, 2:cols + 2], p[2:rows + 2, 1:cols + 1], p[2:rows + 2, 0:cols],
+            p[1:rows + 1, 0:cols], p[0:rows, 0:cols]]
+
+
+def thin(binary: np.ndarray, max_iterations: int = 32) -> np.ndarray:
+    """Zhang-Suen-Verdünnung auf ein Pixel breite Linien"""
+    image = binary.astype(np.uint8)
+    for _ in range(max_iterations):
+        changed = False
+        for step in (0, 1):
+            p2, p3, p4, p5, p6, p7, p8, p9 = _neighbours(image)
+            count = p2 + p3 + p4 + p5 + p6 + p7 + p8 + p9
+            sequence = (p2, p3, p4, p5, p6, p7, p8, p9, p2)
+            transitions = sum(((a == 0) & (b == 1)).astype(np.uint8)
+                              for a, b in zip(sequence, sequence[1:]))
+            if step == 0:
+                side = ((p2 * p4 * p6) == 0) & ((p4 * p6 * p8) == 0)
+            else:
+                side = ((p2 * p4 * p8) == 0) & ((p2 * p6 * p8) == 0)
+            remove = (image == 1) & (count >= 2) & (count <= 6) & (transitions == 1) & side
+            if remove.any():
+                image[remove] = 0
+                changed = True
+        if not changed:
+            break
+    return image.astype(bool)
+
+
+def crossing_number(skeleton: np.ndarray) -> np.ndarray:
+    """Crossing Number jedes Skelett-Pixels (0 außerhalb des Skeletts)"""
+    image = skeleton.astype(np.int8)
+    ring = _neighbours(image)
+    total = sum(np.abs(a - b) for a, b in zip(ring, ring[1:] + ring[:1]))
+    return np.where(skeleton, total // 2, 0)
+
+
+class MinutiaeExtractor:
+    """Extrahiert Minutien; Gabor-Kernel werden pro Bildgröße und Periode gecacht"""
+
+    def __init__(self, orientations: int = ORIENTATIONS, block_size: int = BLOCK_SIZE):
+        self.orientations = orientations
+        self.block_size = block_size
+        self._filters: Dict[Tuple[int, int, float], np.ndarray] = {}
+        self._decoder: Optional[FrameDecoder] = None
+
+    def extract(self, image: np.ndarray, max_value: Optional[int] = None,
+                report: Optional[QualityReport] = None) -> FeatureSet:
+        """Minutien eines Frames (report: bereits berechneter Quality-Report)"""
+        height, width = image.shape
+        if report is None:
+            report = assess(image, max_value, self.block_size)
+        if not report.foreground.any():
+            return FeatureSet(np.empty(0, MINUTIA_DTYPE), width, height, report.score,
+                              DEFAULT_RIDGE_PERIOD)
+
+        foreground = _upsample(report.foreground, image.shape, self.block_size)
+        orientation = _interpolate_orientation(report.orientation, image.shape, self.block_size)
+
+        # Normierung im Vordergrund: mittelwertfrei, Einheitsstreuung
+        pixels = image.astype(np.float32)
+        values = pixels[foreground]
+        pixels -= values.mean()
+        pixels /= max(float(values.std()), 1e-6)
+        pixels[~foreground] = 0.0
+
+        period = self._ridge_period(pixels)
+        enhanced = self._enhance(pixels, orientation, period)
+
+        ridges = (enhanced < 0) & foreground
+        skeleton = thin(ridges)
+        minutiae = self._detect(skeleton, foreground, orientation, report, period)
+        return FeatureSet(minutiae, width, height, report.score, period)
+
+    def extract_frame(self, data, fmt: Optional[FrameFormat] = None,
+                      correct: Optional[Callable[[np.ndarray], np.ndarray]] = None) -> Optional[FeatureSet]:
+        """Minutien eines Roh-Frames (None bei unbekanntem Format)"""
+        fmt = fmt or infer_format(len(data))
+        if fmt is None or len(data) < fmt.payload_size:
+            return None
+        if self._decoder is None or self._decoder.format != fmt:
+            self._decoder = FrameDecoder(fmt)
+        image = self._decoder.decode(data)
+        if correct is not None:
+            image = correct(image)
+        return self.extract(image, fmt.max_value)
+
+    @staticmethod
+    def _ridge_period(pixels: np.ndarray) -> float:
+        """Periode aus dem Maximum des radialen Leistungsspektrums"""
+        spectrum = np.abs(np.fft.rfft2(pixels)) ** 2
+        fy = np.fft.fftfreq(pixels.shape[0])[:, np.newaxis]
+        fx = np.fft.rfftfreq(pixels.shape[1])[np.newaxis, :]
+        radius = np.hypot(fy, fx)
+        band = (radius >= 1 / MAX_RIDGE_PERIOD) & (radius <= 1 / MIN_RIDGE_PERIOD)
+        if not band.any():
+            return DEFAULT_RIDGE_PERIOD
+        # Leistung pro halbem Pixel Periode aufsummieren
+        periods = np.round(2 / radius[band]).astype(np.int64)
+        power = np.bincount(periods, weights=spectrum[band])
+        if not power.any():
+            return DEFAULT_RIDGE_PERIOD
+        return float(np.argmax(power)) / 2
+
+    def _filter_bank(self, shape: Tuple[int, int], period: float) -> np.ndarray:
+        """FFT der Gabor-Kernel aller Richtungen für eine gepaddete Bildgröße"""
+        key = (shape[0], shape[1], period)
+        bank = self._filters.get(key)
+        if bank is not None:
+            return bank
+
+        sigma_across = 0.5 * period
+        sigma_along = 0.7 * period
+        radius = int(np.ceil(2 * sigma_along))
+        yy, xx = np.mgrid[-radius:radius + 1, -radius:radius + 1].astype(np.float32)
+        kernels = np.zeros((self.orientations,) + shape, dtype=np.float32)
+        for index in range(self.orientations):
+            theta = np.pi * index / self.orientations
+            along = xx * np.cos(theta) + yy * np.sin(theta)
+            across = -xx * np.sin(theta) + yy * np.cos(theta)
+            envelope = np.exp(-0.5 * (across ** 2 / sigma_across ** 2 + along ** 2 / sigma_along ** 2))
+            kernel = envelope * np.cos(2 * np.pi * across / period)
+            kernel -= envelope * (kernel.sum() / envelope.sum())  # gleichanteilfrei
+            kernel /= np.abs(kernel).sum()
+            # Zentrum auf (0, 0), damit die Faltung nicht verschiebt
+            kernels[index, :2 * radius + 1, :2 * radius + 1] = kernel
+            kernels[index] = np.roll(kernels[index], (-radius, -radius), axis=(0, 1))
+
+        bank = np.fft.rfft2(kernels)
+        if len(self._filters) >= 8:
+            self._filters.clear()
+        self._filters[key] = bank
+        return bank
+
+    def _enhance(self, pixels: np.ndarray, orientation: np.ndarray, period: float) -> np.ndarray:
+        """Gabor-Filterung: pro Pixel die Antwort des Kernels entlang der Rillen"""
+        period = round(period * 2) / 2
+        margin = int(np.ceil(1.4 * period)) + 1
+        shape = (pixels.shape[0] + 2 * margin, pixels.shape[1] + 2 * margin)
+        padded = np.pad(pixels, margin, mode='constant')
+        bank = self._filter_bank(shape, period)
+        responses = np.fft.irfft2(np.fft.rfft2(padded)[np.newaxis] * bank, s=shape)
+        responses = responses[:, margin:margin + pixels.shape[0], margin:margin + pixels.shape[1]]
+
+        index = np.rint(orientation * (self.orientations / np.pi)).astype(np.int64) % self.orientations
+        return np.take_along_axis(responses, index[np.newaxis], axis=0)[0]
+
+    def _detect(self, skeleton: np.ndarray, foreground: np.ndarray, orientation: np.ndarray,
+                report: QualityReport, period: float) -> np.ndarray:
+        """Minutien aus dem Skelett: Crossing Number, Randabstand, Mindestabstand, Richtung"""
+        numbers = crossing_number(skeleton)
+        inner = _erode(foreground, max(2, int(round(BORDER_PERIODS * period))))
+        candidates = ((numbers == MINUTIA_ENDING) | (numbers == MINUTIA_BIFURCATION)) & inner
+        ys, xs = np.nonzero(candidates)
+        if not len(xs):
+            return np.empty(0, MINUTIA_DTYPE)
+
+        # Zu dicht liegende Minutien sind Artefakte (Brücken, Sporne, Lücken)
+        distance = np.hypot(xs[:, np.newaxis] - xs[np.newaxis, :], ys[:, np.newaxis] - ys[np.newaxis, :])
+        np.fill_diagonal(distance, np.inf)
+        keep = distance.min(axis=1) >= MIN_DISTANCE_PERIODS * period
+        ys, xs = ys[keep], xs[keep]
+        if not len(xs):
+            return np.empty(0, MINUTIA_DTYPE)
+
+        # Richtung: Rillenorientierung, Vorzeichen weg vom Skelett-Schwerpunkt im Fenster
+        r = DIRECTION_RADIUS
+        padded = np.pad(skeleton, r, mode='constant')
+        offsets = np.arange(-r, r + 1)
+        window = padded[(ys + r)[:, np.newaxis, np.newaxis] + offsets[np.newaxis, :, np.newaxis],
+                        (xs + r)[:, np.newaxis, np.newaxis] + offsets[np.newaxis, np.newaxis, :]]
+        mass_x = (window * offsets[np.newaxis, np.newaxis, :]).sum(axis=(1, 2))
+        mass_y = (window * offsets[np.newaxis, :, np.newaxis]).sum(axis=(1, 2))
+        theta = orientation[ys, xs]
+        flip = (np.cos(theta) * mass_x + np.sin(theta) * mass_y) > 0
+        angle = np.mod(theta + np.where(flip, np.pi, 0.0), 2 * np.pi)
+
+        blocks = report.block_quality
+        block_y = np.minimum(ys // self.block_size, blocks.shape[0] - 1)
+        block_x = np.minimum(xs // self.block_size, blocks.shape[1] - 1)
+
+        minutiae = np.empty(len(xs), MINUTIA_DTYPE)
+        minutiae['x'] = xs
+        minutiae['y'] = ys
+        minutiae['angle'] = angle
+        minutiae['type'] = numbers[ys, xs]
+        minutiae['quality'] = blocks[block_y, block_x]
+        return minutiae[np.argsort(-minutiae['quality'], kind='stable')]
+
+
+def features_to_dict(features: FeatureSet) -> Dict[str, Any]:
+    """FeatureSet als JSON-taugliches Dict (Template-Inhalt)"""
+    return {
+        'minutiae': minutiae_to_list(features.minutiae),
+        'width': features.width,
+        'height': features.height,
+        'quality': round(features.quality, 3),
+        'period': features.period,
+    }
+
+
+def features_from_dict(entry: Dict[str, Any]) -> FeatureSet:
+    return FeatureSet(minutiae_from_list(entry.get('minutiae', [])), entry.get('width', 0),
+                      entry.get('height', 0), entry.get('quality', 0.0),
+                      entry.get('period', DEFAULT_RIDGE_PERIOD))
+
+
+def minutiae_to_list(minutiae: np.ndarray) -> List[List[float]]:
+    """Minutien als JSON-taugliche Liste [x, y, angle, type, quality]"""
+    return [[float(m['x']), float(m['y']), round(float(m['angle']), 4), int(m['type']),
+             round(float(m['quality']), 3)] for m in minutiae]
+
+
+def minutiae_from_list(rows) -> np.ndarray:
+    """Umkehrung von minutiae_to_list"""
+    minutiae = np.empty(len(rows), MINUTIA_DTYPE)
+    for field, values in zip(MINUTIA_DTYPE.names, zip(*rows) if rows else ((),) * 5):
+        minutiae[field] = values
+    return minutiae
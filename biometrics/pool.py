@@ -0,0 +1,282 @@
+"""
+Fingerprint Matcher Pool
+Verteilt Batch-Scoring großer Galerien auf dauerhafte Worker-Prozesse
+
+Die Zeilen-Arrays der Galerie liegen einmal in einem Shared-Memory-Block;
+jeder Worker blendet ihn beim Start bzw. nach einer Änderung der Galerie
+als NumPy-Views ein (StackedGallery.from_arrays) - pro Anfrage wandern nur
+die Probe und die Zeilennummern über die Pipe, keine Templates.
+
+    identify()   dieselben Schritte wie StackedGallery.identify(): die
+                 Shortlist des Dreiecks-Index bleibt im Elternprozess (für
+                 wenige hundert Zeilen kostet die Pipe mehr als das Scoring),
+                 die Suche über die übrigen Benutzer ohne Annahme wird
+                 verteilt - gleich große Shards, jeder Worker liefert seine
+                 MERGE_TOP besten (Zeile, Score)-Paare, der Elternprozess
+                 fusioniert pro Benutzer und prüft die besten Benutzer exakt
+                 (StackedGallery.confirm). Mit und ohne Pool fällt dieselbe
+                 Entscheidung, nur Ablehnungen werden schneller.
+    all_pairs()  Offline-Auswertung: jeder Worker vergleicht seinen Teil der
+                 Proben-Zeilen mit der ganzen Galerie
+
+Ob verteilt wird, entscheidet die Kandidatenzahl (POOL_MIN_ROWS); ein Pool
+lohnt sich daher erst für Galerien ab POOL_MIN_ROWS Zeilen und mit
+mindestens zwei CPU-Kernen.
+"""
+
+from typing import Optional, List, Tuple, Any
+import os
+import weakref
+import threading
+import logging
+import multiprocessing
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from biometrics.matcher import MatchTemplate, MinutiaeMatcher, MIN_MINUTIAE
+from biometrics.gallery import StackedGallery, IdentifyResult, RESCORE, IDENTIFY_THRESHOLD
+
+logger = logging.getLogger(__name__)
+
+# Kandidaten-Zeilen, ab denen sich das Verteilen auf Worker lohnt
+POOL_MIN_ROWS = 2048
+
+# Beste Zeilen pro Shard, die in die Score-Fusion eingehen
+MERGE_TOP = 256
+
+# Ausrichtung der Arrays im Shared-Memory-Block (Bytes)
+_ALIGNMENT = 64
+
+
+def _publish(gallery: StackedGallery) -> Tuple[shared_memory.SharedMemory, List[tuple]]:
+    """Kopiert die Zeilen-Arrays in einen neuen Shared-Memory-Block"""
+    arrays = gallery.arrays()
+    layout = []
+    offset = 0
+    for name, array in arrays.items():
+        offset = -(-offset // _ALIGNMENT) * _ALIGNMENT
+        layout.append((name, offset, array.shape, array.dtype.str))
+        offset += array.nbytes
+    block = shared_memory.SharedMemory(create=True, size=max(1, offset))
+    for (name, start, shape, dtype) in layout:
+        np.ndarray(shape, dtype=dtype, buffer=block.buf, offset=start)[...] = arrays[name]
+    return block, layout
+
+
+def _attach(name: str, layout: List[tuple]) -> Tuple[shared_memory.SharedMemory, StackedGallery]:
+    block = shared_memory.SharedMemory(name=name)
+    arrays = {array: np.ndarray(shape, dtype=dtype, buffer=block.buf, offset=start)
+              for (array, start, shape, dtype) in layout}
+    return block, StackedGallery.from_arrays(arrays)
+
+
+def _top(rows: np.ndarray, score: np.ndarray, limit: int) -> Tuple[np.ndarray, np.ndarray]:
+    if len(rows) > limit:
+        keep = np.argpartition(-score, limit)[:limit]
+        rows, score = rows[keep], score[keep]
+    return rows, score
+
+
+def _serve(connection):
+    """Worker-Schleife: (Befehl, Argumente) empfangen, Ergebnis zurücksenden"""
+    block: Optional[shared_memory.SharedMemory] = None
+    gallery: Optional[StackedGallery] = None
+    try:
+        while True:
+            try:
+                command, args = connection.recv()
+            except EOFError:
+                break
+            if command == 'close':
+                break
+            try:
+                if command == 'attach':
+                    gallery = None
+                    if block is not None:
+                        block.close()
+                    block, gallery = _attach(*args)
+                    result = len(gallery)
+                elif command == 'rank':
+                    probe, rows, minimum, limit = args
+                    candidates = gallery.prefilter(probe, minimum, rows)
+                    score, _ = gallery.scores(probe, candidates)
+                    result = _top(candidates, score, limit) + (len(candidates),)
+                elif command == 'pairs':
+                    probe_rows, minimum = args
+                    result = np.zeros((len(probe_rows), len(gallery)), dtype=np.float32)
+                    for position, row in enumerate(probe_rows):
+                        probe = gallery.template(row)
+                        if probe.count < MIN_MINUTIAE:
+                            continue
+                        candidates = gallery.prefilter(probe, minimum)
+                        result[position, candidates] = gallery.scores(probe, candidates)[0]
+                else:
+                    raise ValueError(f'unbekannter Befehl {command!r}')
+                connection.send(('ok', result))
+            except Exception as e:
+                connection.send(('error', f'{type(e).__name__}: {e}'))
+    finally:
+        gallery = None
+        if block is not None:
+            block.close()
+
+
+def _shutdown(processes: List[Any], connections: List[Any], blocks: List[shared_memory.SharedMemory]):
+    for connection in connections:
+        try:
+            connection.send(('close', None))
+        except (OSError, ValueError):
+            pass
+    for process in processes:
+        process.join(timeout=2.0)
+        if process.is_alive():
+            process.terminate()
+    for block in blocks:
+        block.close()
+        block.unlink()
+    blocks.clear()
+
+
+class MatcherPool:
+    """
+    Dauerhafte Worker-Prozesse über einer StackedGallery in Shared Memory
+
+    Der Pool hält eine Momentaufnahme der Galerie; jede Anfrage prüft
+    StackedGallery.generation und veröffentlicht bei Änderungen (Enroll,
+    Remove) einen neuen Block. Worker starten per 'spawn' - der Daemon hat
+    Threads, ein fork() würde deren Locks mitkopieren. close() (oder das
+    Ende des Pools) beendet die Worker und gibt den Block frei.
+    """
+
+    def __init__(self, gallery: StackedGallery, workers: Optional[int] = None):
+        self.gallery = gallery
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self._lock = threading.Lock()
+        self._published: Optional[Tuple[StackedGallery, int]] = None
+        self._blocks: List[shared_memory.SharedMemory] = []
+
+        context = multiprocessing.get_context('spawn')
+        self._connections = []
+        self._processes = []
+        for number in range(self.workers):
+            parent, child = context.Pipe()
+            process = context.Process(target=_serve, args=(child,), daemon=True,
+                                      name=f'goodix-matcher-{number}')
+            process.start()
+            child.close()
+            self._connections.append(parent)
+            self._processes.append(process)
+        self._finalizer = weakref.finalize(self, _shutdown, self._processes,
+                                           self._connections, self._blocks)
+        logger.info(f"🧵 Matcher-Pool mit {self.workers} Workern gestartet")
+
+    def __enter__(self) -> 'MatcherPool':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._finalizer()
+
+    def use(self, gallery: StackedGallery):
+        """Wechselt die Galerie (wird bei der nächsten Anfrage veröffentlicht)"""
+        self.gallery = gallery
+
+    def _request(self, messages: List[Tuple[str, Any]]) -> List[Any]:
+        """Eine Nachricht pro Worker (von vorn), Antworten in derselben Reihenfolge"""
+        connections = self._connections[:len(messages)]
+        for connection, message in zip(connections, messages):
+            connection.send(message)
+        results = []
+        errors = []
+        for connection in connections:
+            try:
+                status, result = connection.recv()
+            except EOFError:
+                status, result = 'error', 'Worker beendet'
+            if status != 'ok':
+                errors.append(result)
+            results.append(result)
+        if errors:
+            raise RuntimeError(f"Matcher-Worker: {errors[0]}")
+        return results
+
+    def _sync(self):
+        """Veröffentlicht die Galerie neu, wenn sie sich geändert hat"""
+        current = (self.gallery, self.gallery.generation)
+        if self._published is not None and self._published[0] is current[0] \
+                and self._published[1] == current[1]:
+            return
+        block, layout = _publish(self.gallery)
+        try:
+            self._request([('attach', (block.name, layout))] * self.workers)
+        except RuntimeError:
+            block.close()
+            block.unlink()
+            raise
+        # Alle Worker sind umgestiegen - der alte Block kann weg
+        for old in self._blocks:
+            old.close()
+            old.unlink()
+        self._blocks[:] = [block]
+        self._published = current
+
+    def rank(self, probe: MatchTemplate, matcher: MinutiaeMatcher, top: int = RESCORE,
+             rows: Optional[np.ndarray] = None) -> Tuple[List[Tuple[str, float]], int]:
+        """Wie StackedGallery.rank(), verteilt; liefert auch die Kandidatenzahl"""
+        if rows is None:
+            rows = np.arange(len(self.gallery))
+        if len(rows) < POOL_MIN_ROWS:
+            candidates = self.gallery.prefilter(probe, matcher.prefilter, rows)
+            ranking = self.gallery.fuse(candidates, self.gallery.scores(probe, candidates)[0], top)
+            return ranking, len(candidates)
+
+        with self._lock:
+            self._sync()
+            shards = [shard for shard in np.array_split(rows, self.workers) if len(shard)]
+            results = self._request([('rank', (probe, shard, matcher.prefilter, MERGE_TOP))
+                                     for shard in shards])
+        candidates = np.concatenate([shard_rows for shard_rows, _, _ in results])
+        score = np.concatenate([shard_score for _, shard_score, _ in results])
+        return self.gallery.fuse(candidates, score, top), sum(count for _, _, count in results)
+
+    def identify(self, probe: MatchTemplate, matcher: Optional[MinutiaeMatcher] = None,
+                 rescore: int = RESCORE, rows: Optional[np.ndarray] = None,
+                 threshold: float = IDENTIFY_THRESHOLD, full_scan: bool = True) -> IdentifyResult:
+        """Wie StackedGallery.identify(); die Suche über die übrigen Benutzer läuft verteilt"""
+        matcher = matcher or MinutiaeMatcher()
+        if probe.count < MIN_MINUTIAE:
+            return IdentifyResult(None, 0.0, 0, False)
+        shortlist = self.gallery.shortlist(probe, rows)
+        ranking, candidates = self.rank(probe, matcher, rescore, shortlist)
+        result = self.gallery.confirm(probe, matcher, ranking, shortlist, candidates, threshold)
+        if result.accepted or not full_scan or rows is not None or shortlist is None:
+            return result
+
+        # Impostor oder vom Index verfehlter Benutzer
+        ranking, candidates = self.rank(probe, matcher, rescore, self.gallery.rest(shortlist))
+        return self.gallery.merge(result, self.gallery.confirm(probe, matcher, ranking, None,
+                                                               candidates, threshold))
+
+    def all_pairs(self, probe_rows: Optional[np.ndarray] = None,
+                  minimum: Optional[float] = None) -> np.ndarray:
+        """
+        Genäherte Scores (len(probe_rows), len(gallery)) für Offline-Auswertungen
+
+        Proben sind Galerie-Zeilen; vom Vorfilter verworfene Paare bleiben 0.
+        Bei großen Galerien in Blöcken von probe_rows aufrufen - die Matrix
+        wächst quadratisch.
+        """
+        if probe_rows is None:
+            probe_rows = np.arange(len(self.gallery))
+        if minimum is None:
+            minimum = MinutiaeMatcher().prefilter
+        with self._lock:
+            self._sync()
+            shards = [shard for shard in np.array_split(probe_rows, self.workers) if len(shard)]
+            results = self._request([('pairs', (shard, minimum)) for shard in shards])
+        if not results:
+            return np.zeros((0, len(self.gallery)), dtype=np.float32)
+        return np.concatenate(results)
@@ -0,0 +1,132 @@
+"""
+Fingerprint Quality Engine
+Bewertet dekodierte Frames blockweise statt nach Byte-Länge
+
+Pro Block (BLOCK_SIZE x BLOCK_SIZE Pixel) werden bestimmt:
+    Kontrast     Standardabweichung der Grauwerte - leerer Sensor ≈ Rauschen
+    Kohärenz     wie einheitlich die Gradienten ausgerichtet sind (Struktur-
+                 tensor über 3x3 Blöcke): 1 = saubere parallele Rillen,
+                 0 = Rauschen, Verschmierung oder Narben
+    Vordergrund  Blöcke mit Kontrast über FOREGROUND_STD (Fingerfläche)
+
+Score = mittlere Blockqualität (Kohärenz x Kontrast) im Vordergrund,
+begrenzt durch die abgedeckte Sensorfläche. Alles läuft als NumPy-Operation
+über alle Blöcke gleichzeitig - ein 108x88-Frame kostet deutlich unter
+einer Millisekunde.
+"""
+
+from typing import Optional, NamedTuple, Callable
+import logging
+
+import numpy as np
+
+from drivers.goodix_image import FrameFormat, FrameDecoder, infer_format
+from drivers.goodix_capture import frame_contrast
+
+logger = logging.getLogger(__name__)
+
+BLOCK_SIZE = 8
+
+# Block-Streuung (Grauwerte normiert auf 0..1), ab der ein Block zum Finger
+# gehört bzw. die vollem Kontrast entspricht
+FOREGROUND_STD = 0.04
+FULL_CONTRAST_STD = 0.12
+
+# Abgedeckter Anteil der Sensorfläche, ab dem die Abdeckung den Score nicht
+# mehr begrenzt
+FULL_COVERAGE = 0.6
+
+
+class QualityReport(NamedTuple):
+    score: float               # 0..1
+    coverage: float            # Anteil der Vordergrund-Blöcke
+    contrast: float            # mittlere Blockstreuung im Vordergrund (normiert)
+    coherence: float           # mittlere Kohärenz im Vordergrund
+    block_quality: np.ndarray  # (Zeilen, Spalten) 0..1, Hintergrund = 0
+    foreground: np.ndarray     # (Zeilen, Spalten) bool
+    orientation: np.ndarray    # (Zeilen, Spalten) Rillenrichtung in rad, 0..pi
+
+
+def _blocks(values: np.ndarray, block_size: int) -> np.ndarray:
+    """(H, W) → (Zeilen, B, Spalten, B); Randpixel außerhalb ganzer Blöcke entfallen"""
+    rows, cols = values.shape[0] // block_size, values.shape[1] // block_size
+    return values[:rows * block_size, :cols * block_size].reshape(rows, block_size, cols, block_size)
+
+
+def _neighbourhood_sum(values: np.ndarray) -> np.ndarray:
+    """Summe über jeden Block und seine 8 Nachbarn (Rand wiederholt)"""
+    padded = np.pad(values, 1, mode='edge')
+    rows, cols = values.shape
+    total = np.zeros_like(values)
+    for dy in range(3):
+        for dx in range(3):
+            total += padded[dy:dy + rows, dx:dx + cols]
+    return total
+
+
+def assess(image: np.ndarray, max_value: Optional[int] = None,
+           block_size: int = BLOCK_SIZE) -> QualityReport:
+    """Qualität eines dekodierten (möglichst kalibrierten) Frames"""
+    if max_value is None:
+        max_value = 255 if image.dtype == np.uint8 else 65535
+    normalized = image.astype(np.float32)
+    normalized *= 1.0 / max_value
+
+    blocks = _blocks(normalized, block_size)
+    mean = blocks.mean(axis=(1, 3))
+    variance = np.square(blocks).mean(axis=(1, 3)) - np.square(mean)
+    std = np.sqrt(np.maximum(variance, 0.0))
+
+    # Strukturtensor pro Block, geglättet über die Nachbarblöcke
+    gy, gx = np.gradient(normalized)
+    gxx = _neighbourhood_sum(_blocks(gx * gx, block_size).sum(axis=(1, 3)))
+    gyy = _neighbourhood_sum(_blocks(gy * gy, block_size).sum(axis=(1, 3)))
+    gxy = _neighbourhood_sum(_blocks(gx * gy, block_size).sum(axis=(1, 3)))
+    diff = gxx - gyy
+    coherence = np.sqrt(np.square(diff) + 4 * np.square(gxy)) / (gxx + gyy + 1e-12)
+    # Gradienten stehen senkrecht auf den Rillen
+    orientation = np.mod(0.5 * np.arctan2(2 * gxy, diff) + np.pi / 2, np.pi)
+
+    foreground = std >= FOREGROUND_STD
+    block_quality = np.where(foreground, coherence * np.minimum(1.0, std / FULL_CONTRAST_STD), 0.0)
+
+    coverage = float(foreground.mean()) if foreground.size else 0.0
+    if not foreground.any():
+        return QualityReport(0.0, coverage, 0.0, 0.0, block_quality, foreground, orientation)
+    score = float(block_quality[foreground].mean()) * min(1.0, coverage / FULL_COVERAGE)
+    return QualityReport(score, coverage, float(std[foreground].mean()),
+                         float(coherence[foreground].mean()), block_quality, foreground, orientation)
+
+
+class FrameScorer:
+    """
+    Scorer für QualityGate: Roh-Frame → Bild → Qualitäts-Score
+
+    Das Format kommt vom Treiber oder wird aus der Frame-Länge erkannt;
+    'correct' zieht z.B. den Kalibrier-Hintergrund ab. Frames unbekannten
+    Formats fallen auf den Byte-Kontrast zurück. last hält den letzten
+    vollständigen Report (Block-Karte).
+    """
+
+    def __init__(self, fmt: Optional[FrameFormat] = None,
+                 correct: Optional[Callable[[np.ndarray], np.ndarray]] = None):
+        self.format = fmt
+        self.correct = correct
+        self.last: Optional[QualityReport] = None
+        self._decoder: Optional[FrameDecoder] = None
+
+    def report(self, data) -> Optional[QualityReport]:
+        fmt = self.format or infer_format(len(data))
+        if fmt is None or len(data) < fmt.payload_size:
+            return None
+        if self._decoder is None or self._decoder.format != fmt:
+            self._decoder = FrameDecoder(fmt)
+        image = self._decoder.decode(data)
+        if self.correct is not None:
+            image = self.correct(image)
+        self.last = assess(image, fmt.max_value)
+        return self.last
+
+    def __call__(self, data) -> float:
+        report = self.report(data)
+        return report.score if report is not None else frame_contrast(data)
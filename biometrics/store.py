@@ -0,0 +1,167 @@
+"""
+Fingerprint Enrollment Store
+Gemeinsames Laden der Enrollment-Datei und Cache vorbereiteter Templates
+
+Alle Front-Ends eines Prozesses (Login-Manager, Daemon, Skripte) teilen
+sich pro Datei einen EnrollmentStore (EnrollmentStore.shared). Die Datei
+wird nur gelesen, wenn sich ihre Signatur (Inode, mtime, Größe) geändert
+hat - ein stat() pro Anfrage statt json.load().
+
+templates() liefert matcher-fertige MatchTemplates aus einem LRU-Cache,
+Schlüssel (Benutzer, Template-Nummer). Wiederholte Authentifizierungen
+dekodieren nichts: kein JSON, kein Base64, kein prepare(). Ungültig wird
+der Cache
+    - komplett, wenn refresh() eine fremde Änderung der Datei bemerkt
+    - pro Benutzer über save(changed_user) bzw. invalidate(username)
+"""
+
+from typing import Optional, List, Dict, Tuple, Any
+from collections import OrderedDict
+import os
+import json
+import threading
+import logging
+
+from biometrics.matcher import MatchTemplate, prepare
+from biometrics.template import load_template
+
+logger = logging.getLogger(__name__)
+
+# Vorbereitete Templates im Speicher (≈ 3 KB pro Template)
+TEMPLATE_CACHE_SIZE = 4096
+
+
+def _signature(path: str) -> Optional[Tuple[int, int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+class TemplateCache:
+    """LRU-Cache (Benutzer, Template-Nummer) → MatchTemplate (None = ohne Minutien)"""
+
+    def __init__(self, capacity: int = TEMPLATE_CACHE_SIZE):
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[Tuple[str, int], Optional[MatchTemplate]]' = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Tuple[str, int], entry: Any) -> Optional[MatchTemplate]:
+        """Template zum Schlüssel; entry wird nur bei einem Fehltreffer dekodiert"""
+        try:
+            template = self._entries[key]
+        except KeyError:
+            pass
+        else:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return template
+
+        self.misses += 1
+        features = load_template(entry)
+        template = prepare(features) if features is not None else None
+        self._entries[key] = template
+        if len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+        return template
+
+    def invalidate(self, username: Optional[str] = None):
+        """Einträge eines Benutzers bzw. alle (username=None) verwerfen"""
+        if username is None:
+            self._entries.clear()
+            return
+        for key in [key for key in self._entries if key[0] == username]:
+            del self._entries[key]
+
+
+class EnrollmentStore:
+    """
+    Enrollment-Datei {Benutzer: {'templates': [...], ...}} samt Template-Cache
+
+    users ist das geladene Dict; Front-Ends ändern es direkt und rufen
+    danach save(username) auf.
+    """
+
+    _shared: Dict[str, 'EnrollmentStore'] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, path: str, cache_size: int = TEMPLATE_CACHE_SIZE):
+        self.path = str(path)
+        self.users: Dict[str, Any] = {}
+        self.cache = TemplateCache(cache_size)
+        self._signature: Optional[Tuple[int, int, int]] = None
+        self._lock = threading.RLock()
+        self.load()
+
+    @classmethod
+    def shared(cls, path) -> 'EnrollmentStore':
+        """Prozessweit eine Instanz pro Datei; prüft beim Abholen auf Änderungen"""
+        key = os.path.abspath(str(path))
+        with cls._shared_lock:
+            store = cls._shared.get(key)
+            if store is None:
+                store = cls._shared[key] = cls(key)
+                return store
+        store.refresh()
+        return store
+
+    def load(self) -> Dict[str, Any]:
+        """Liest die Datei neu (fehlend oder defekt = keine Benutzer)"""
+        with self._lock:
+            signature = _signature(self.path)
+            users: Dict[str, Any] = {}
+            if signature is not None:
+                try:
+                    with open(self.path, 'r') as f:
+                        users = json.load(f)
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Konnte Enrollment-Daten nicht laden: {e}")
+            self.users = users if isinstance(users, dict) else {}
+            self._signature = signature
+            self.cache.invalidate()
+            return self.users
+
+    def refresh(self) -> bool:
+        """Lädt neu, wenn die Datei von außen geändert wurde; True = neu geladen"""
+        with self._lock:
+            if _signature(self.path) == self._signature:
+                return False
+            self.load()
+            return True
+
+    def save(self, changed_user: Optional[str] = None):
+        """
+        Schreibt users (Rechte 0600); changed_user verwirft nur dessen
+        Cache-Einträge, sonst den ganzen Cache. OSError geht an den Aufrufer.
+        """
+        with self._lock:
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'w') as f:
+                json.dump(self.users, f, indent=2)
+            os.replace(tmp_path, self.path)
+            self._signature = _signature(self.path)
+            self.cache.invalidate(changed_user)
+
+    def invalidate(self, username: Optional[str] = None):
+        with self._lock:
+            self.cache.invalidate(username)
+
+    def templates(self, username: str) -> List[MatchTemplate]:
+        """Matcher-fertige Templates eines Benutzers (ohne Templates ohne Minutien)"""
+        with self._lock:
+            entries = self.users.get(username, {}).get('templates', [])
+            templates = []
+            for slot, entry in enumerate(entries):
+                try:
+                    template = self.cache.get((username, slot), entry)
+                except ValueError as e:
+                    logger.warning(f"Defektes Template von '{username}' übersprungen: {e}")
+                    continue
+                if template is not None:
+                    templates.append(template)
+            return templates
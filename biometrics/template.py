@@ -0,0 +1,115 @@
+"""
+Fingerprint Template Format
+Kompaktes, versioniertes Binärformat für Minutien-Templates
+
+Statt eines JSON-Dokuments mit Minutien-Listen (das in der Enrollment-Datei
+noch einmal als JSON-String steckt) besteht ein Template aus einem festen
+Header und den Minutien als gepacktem MINUTIA_DTYPE-Array:
+
+    Header (Little Endian, TEMPLATE_HEADER.size = 32 Bytes):
+        magic 'GXTP', Version, Flags, Breite, Höhe, Minutien-Anzahl,
+        Qualität, Rillenperiode, Zeitstempel, Länge der Scan-Daten
+    Minutien: Anzahl x 17 Bytes (x, y, angle als float32, type als uint8,
+        quality als float32), nach Qualität absteigend
+
+decode_template() legt das Minutien-Array per numpy.frombuffer direkt über
+die Bytes (keine Kopie, nur lesbar). In JSON-Dateien steht ein Template als
+Base64-Text (template_to_text); load_template() liest zusätzlich noch das
+alte JSON-Format, damit bestehende Enrollments weiter funktionieren.
+"""
+
+from typing import Optional, NamedTuple, Union, Dict, Any
+import json
+import base64
+import struct
+import binascii
+
+import numpy as np
+
+from biometrics.minutiae import MINUTIA_DTYPE, FeatureSet, features_from_dict
+
+TEMPLATE_MAGIC = b'GXTP'
+TEMPLATE_VERSION = 1
+
+TEMPLATE_HEADER = struct.Struct('<4sBBHHHffdI')
+
+# Flags: Minutien wurden extrahiert (sonst nur Metadaten eines unbekannten Frames)
+FLAG_FEATURES = 0x01
+
+
+class TemplateHeader(NamedTuple):
+    version: int
+    flags: int
+    width: int
+    height: int
+    count: int          # Anzahl Minutien
+    quality: float
+    period: float
+    timestamp: float
+    scan_length: int    # Bytes der Scan-Daten, aus denen das Template stammt
+
+
+def encode_template(features: Optional[FeatureSet], timestamp: float = 0.0,
+                    scan_length: int = 0, quality: float = 0.0) -> bytes:
+    """Header + Minutien; features=None ergibt ein Template ohne Minutien"""
+    if features is None:
+        return TEMPLATE_HEADER.pack(TEMPLATE_MAGIC, TEMPLATE_VERSION, 0, 0, 0, 0,
+                                    quality, 0.0, timestamp, scan_length)
+    minutiae = np.ascontiguousarray(features.minutiae, dtype=MINUTIA_DTYPE)
+    header = TEMPLATE_HEADER.pack(TEMPLATE_MAGIC, TEMPLATE_VERSION, FLAG_FEATURES,
+                                  features.width, features.height, len(minutiae),
+                                  features.quality, features.period, timestamp, scan_length)
+    return header + minutiae.tobytes()
+
+
+def template_header(data: Union[bytes, memoryview]) -> TemplateHeader:
+    """Prüft und liest den Header (ValueError bei fremden oder kaputten Daten)"""
+    if len(data) < TEMPLATE_HEADER.size:
+        raise ValueError("Template zu kurz")
+    magic, version, flags, width, height, count, quality, period, timestamp, scan_length = \
+        TEMPLATE_HEADER.unpack_from(data, 0)
+    if magic != TEMPLATE_MAGIC:
+        raise ValueError("kein Goodix-Template")
+    if version != TEMPLATE_VERSION:
+        raise ValueError(f"nicht unterstützte Template-Version {version}")
+    if len(data) < TEMPLATE_HEADER.size + count * MINUTIA_DTYPE.itemsize:
+        raise ValueError(f"Template abgeschnitten ({len(data)} Bytes für {count} Minutien)")
+    return TemplateHeader(version, flags, width, height, count, quality, period, timestamp, scan_length)
+
+
+def decode_template(data: Union[bytes, memoryview]) -> Optional[FeatureSet]:
+    """FeatureSet über den Template-Bytes (None = Template ohne Minutien)"""
+    header = template_header(data)
+    if not header.flags & FLAG_FEATURES:
+        return None
+    minutiae = np.frombuffer(data, dtype=MINUTIA_DTYPE, count=header.count,
+                             offset=TEMPLATE_HEADER.size)
+    return FeatureSet(minutiae, header.width, header.height, header.quality, header.period)
+
+
+def template_to_text(data: bytes) -> str:
+    """Template als ASCII-Text für JSON-Dateien und das Socket-Protokoll"""
+    return base64.b64encode(data).decode('ascii')
+
+
+def template_from_text(text: str) -> bytes:
+    try:
+        return base64.b64decode(text, validate=True)
+    except (binascii.Error, ValueError) as e:
+        raise ValueError(f"ungültiger Template-Text: {e}")
+
+
+def load_template(entry: Union[str, bytes, Dict[str, Any]]) -> Optional[FeatureSet]:
+    """
+    FeatureSet aus einem gespeicherten Template: Bytes, Base64-Text, das
+    alte JSON-Format ('{"hash": ..., "minutiae": [...]}') oder ein bereits
+    geladenes Dict (Templates der Skript-Front-Ends)
+    """
+    if isinstance(entry, dict):
+        return features_from_dict(entry) if 'minutiae' in entry else None
+    if isinstance(entry, str):
+        if entry.startswith('{'):
+            legacy = json.loads(entry)
+            return features_from_dict(legacy) if 'minutiae' in legacy else None
+        entry = template_from_text(entry)
+    return decode_template(entry)
@@ -5,6 +5,7 @@
 set -e
 
 GOODIX_LOGIN="/home/mikail/Fingerabdrucksensor/goodix_login.py"
+GOODIX_CLIENT="$(dirname "$GOODIX_LOGIN")/goodix_client.py"
 USER=${USER:-$(whoami)}
 
 # Farben für Output
@@ -52,6 +53,15 @@ check_goodix_sensor() {
     fi
 }
 
+# Authentifizierung: über goodixd (Sensor bereits initialisiert), sonst direkt
+goodix_auth() {
+    if python3 "$GOODIX_CLIENT" ping >/dev/null 2>&1; then
+        python3 "$GOODIX_CLIENT" verify "$USER"
+    else
+        python3 "$GOODIX_LOGIN" auth "$USER"
+    fi
+}
+
 enroll_fingerprint() {
     echo -e "${BLUE}📋 Fingerabdruck-Registrierung${NC}"
     echo "==============================="
@@ -81,7 +91,7 @@ test_login() {
     
     echo -e "${YELLOW}👆 Teste Fingerabdruck-Login für Benutzer: $USER${NC}"
     
-    if python3 "$GOODIX_LOGIN" auth "$USER"; then
+    if goodix_auth; then
         echo -e "${GREEN}✅ Login erfolgreich!${NC}"
         
         # Optional: Desktop-Notification
@@ -110,7 +120,7 @@ unlock_screen() {
         zenity --info --text="👆 Finger auf Goodix-Sensor legen..." --timeout=2 &
     fi
     
-    if python3 "$GOODIX_LOGIN" auth "$USER"; then
+    if goodix_auth; then
         echo -e "${GREEN}✅ Bildschirm entsperrt!${NC}"
         
         # Bildschirm entsperren (abhängig vom Desktop-Environment)
@@ -9,7 +9,7 @@ import os
 import subprocess
 import pwd
 import grp
-from drivers.goodix_prototype_driver import GoodixFingerprintDriver
+from drivers.goodix_prototype_driver import GoodixFingerprintDriver, GoodixCommand
 import logging
 
 # Logging für Diagnose
@@ -198,6 +198,83 @@ class GoodixDiagnostics:
         
         print()
     
+    def test_transfer_latency(self, rounds: int = 20):
+        """Misst Round-Trip-Zeiten der sicheren Kommandos"""
+        print("⏱️ Transfer-Latenz:")
+        
+        try:
+            driver = GoodixFingerprintDriver()
+            
+            if not driver.connect():
+                print("   ❌ Verbindung fehlgeschlagen - Messung übersprungen")
+                print()
+                return
+            
+            try:
+                backend = driver._engine.backend.name if driver._engine else 'unbekannt'
+                print(f"   Backend: {backend}, {rounds} Runden")
+                
+                safe_commands = [GoodixCommand.STATUS, GoodixCommand.DEVICE_INFO,
+                                 GoodixCommand.FIRMWARE_VERSION, GoodixCommand.ECHO]
+                for _ in range(rounds):
+                    for command in safe_commands:
+                        driver._send_command(command)
+                
+                stats = driver.get_policy_stats()
+                if not stats:
+                    print("   ⚠️ Keine Antworten erhalten")
+                for name, entry in stats.items():
+                    if entry['count']:
+                        print(f"      {name:<18} n={entry['count']:<4} "
+                              f"p50={entry['p50_ms']:.2f}ms p99={entry['p99_ms']:.2f}ms "
+                              f"max={entry['max_ms']:.2f}ms timeouts={entry['timeouts']}")
+                    else:
+                        print(f"      {name:<18} keine Antwort, timeouts={entry['timeouts']}")
+                    print(f"      {'':<18} → Timeout {entry['timeout_ms']}ms, "
+                          f"{entry['attempts']} Versuch(e)")
+            finally:
+                driver.disconnect()
+        
+        except Exception as e:
+            print(f"   ❌ Latenz-Test-Fehler: {e}")
+        
+        print()
+    
+    def test_connect_latency(self, warm_rounds: int = 5):
+        """Vergleicht kalten (ohne Caches) und warmen Verbindungsaufbau"""
+        print("🚀 Verbindungsaufbau:")
+        
+        try:
+            driver = GoodixFingerprintDriver()
+            
+            # Kalt: Endpoint-Map und Identität werden neu ermittelt
+            driver.endpoint_cache.invalidate()
+            driver.identity_cache.invalidate()
+            if not driver.connect():
+                print("   ❌ Verbindung fehlgeschlagen - Messung übersprungen")
+                print()
+                return
+            cold = driver.connect_time
+            driver.disconnect()
+            
+            warm = []
+            for _ in range(warm_rounds):
+                if driver.connect():
+                    warm.append(driver.connect_time)
+                driver.disconnect()
+            
+            print(f"   Kalt: {cold * 1000:.1f}ms")
+            if warm:
+                print(f"   Warm: {sum(warm) / len(warm) * 1000:.1f}ms "
+                      f"(min {min(warm) * 1000:.1f}ms, {len(warm)} Runden)")
+            else:
+                print("   ⚠️ Warme Verbindung fehlgeschlagen")
+        
+        except Exception as e:
+            print(f"   ❌ Verbindungs-Test-Fehler: {e}")
+        
+        print()
+    
     def generate_recommendations(self):
         """Generiert Empfehlungen basierend auf der Diagnose"""
         print("💡 Empfehlungen:")
@@ -233,6 +310,8 @@ def main():
     diag.check_udev_rules()
     diag.test_python_usb_access()
     diag.test_goodix_driver()
+    diag.test_transfer_latency()
+    diag.test_connect_latency()
     diag.generate_recommendations()
     
     print("\n🏁 Diagnose abgeschlossen!")
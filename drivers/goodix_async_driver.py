@@ -0,0 +1,389 @@
+"""
+Goodix Async Driver
+asyncio-API über GoodixFingerprintDriver
+
+Kommandos, Finger-Events und Bild-Reads laufen mit dem asynchronen
+libusb1-Backend direkt auf dem Event-Loop: Transfer-Completions werden per
+call_soon_threadsafe in Futures übersetzt, kein Thread pro Scan. Wird ein
+Task abgebrochen, werden seine ausstehenden USB-Transfers sofort gecancelt
+und verspätete Antworten vom IN-Endpoint verworfen, bevor das nächste
+Kommando ihn bekommt.
+Einmalige Schritte (connect, initialize, disconnect) und das synchrone
+pyusb-Backend laufen im Executor.
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Optional, AsyncIterator, Callable, Dict, Any
+import logging
+
+from drivers.goodix_prototype_driver import (GoodixFingerprintDriver, GoodixCommand, GoodixStatus,
+                                             STREAM_MAX_ERRORS)
+from drivers.goodix_capture import QualityGate, CaptureResult, Scorer, DEFAULT_MIN_QUALITY
+from drivers.goodix_transfer import PendingTransfer, TransferError
+from drivers.goodix_policy import CommandPlan, DeadlineExceeded
+from drivers.goodix_frame import GoodixFrameReader
+from drivers.goodix_finger_detect import AdaptivePollInterval, FingerDetector, EVENT_WAIT_MS
+
+# Wartezeit pro Paket beim Verwerfen verspäteter Antworten (wie GoodixTransferEngine._drain)
+DRAIN_TIMEOUT_MS = 20
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncGoodixDriver:
+    """
+    asyncio-Variante des Goodix-Treibers
+
+    Verwendung:
+        async with AsyncGoodixDriver() as driver:
+            await driver.initialize()
+            image = await driver.capture(deadline=loop.time() + 15)
+            result = await driver.capture_quality(deadline=loop.time() + 15)
+    """
+
+    def __init__(self, driver: Optional[GoodixFingerprintDriver] = None, **driver_kwargs):
+        self.driver = driver or GoodixFingerprintDriver(**driver_kwargs)
+        # Serialisiert Kommandos auf dem Loop (Antworten nicht vertauschen)
+        self._command_lock = asyncio.Lock()
+
+    @property
+    def is_connected(self) -> bool:
+        return self.driver.is_connected
+
+    @property
+    def is_initialized(self) -> bool:
+        return self.driver.is_initialized
+
+    @property
+    def _engine(self):
+        return self.driver._engine
+
+    async def _run_blocking(self, func: Callable, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, func, *args)
+
+    async def __aenter__(self) -> 'AsyncGoodixDriver':
+        if not await self.connect():
+            raise TransferError("Verbindung zum Goodix-Device fehlgeschlagen")
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.disconnect()
+
+    async def connect(self) -> bool:
+        return await self._run_blocking(self.driver.connect)
+
+    async def initialize(self) -> bool:
+        return await self._run_blocking(self.driver.initialize)
+
+    async def get_device_info(self, refresh: bool = False) -> Dict[str, Any]:
+        if not refresh and self.driver._identity is not None:
+            # Identität aus dem Cache - kein USB-Transfer, kein Executor
+            return self.driver.get_device_info()
+        return await self._run_blocking(self.driver.get_device_info, refresh)
+
+    async def disconnect(self):
+        if self._engine:
+            self._engine.cancel_all()
+        await self._run_blocking(self.driver.disconnect)
+
+    # ------------------------------------------------------------------
+    # Transfers
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    async def _wait(pending: PendingTransfer) -> PendingTransfer:
+        """Wartet auf den Abschluss; bei Task-Abbruch wird der Transfer gecancelt"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def on_done(_):
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+
+        pending.add_done_callback(on_done)
+        try:
+            await future
+        except asyncio.CancelledError:
+            pending.cancel()
+            raise
+        return pending
+
+    @asynccontextmanager
+    async def _exclusive(self):
+        """
+        Kommando-Lock; wird der Austausch abgebrochen, leert _drain() den
+        IN-Endpoint, bevor das nächste Kommando den Lock bekommt - sonst
+        läse es die Antwort des abgebrochenen
+        """
+        async with self._command_lock:
+            try:
+                yield
+            except asyncio.CancelledError:
+                await self._drain()
+                raise
+
+    async def _drain(self):
+        """Verwirft verspätete Antworten (bis zu einem kompletten Frame)"""
+        engine = self._engine
+        packet_size = engine.max_packet_size
+        max_packets = len(self.driver._frame_reader._view) // packet_size + 8
+        for _ in range(max_packets):
+            pending = engine.backend.submit_read(engine.endpoint_in, packet_size, DRAIN_TIMEOUT_MS)
+            await self._wait(pending)
+            if not pending.has_data:
+                return
+
+    async def _exchange(self, packet: bytes, plan: CommandPlan, key: str,
+                        submit_read: Callable[[], PendingTransfer]) -> Optional[PendingTransfer]:
+        engine = self._engine
+        backend = engine.backend
+        start = time.perf_counter()
+
+        for attempt in range(plan.write_attempts):
+            read = submit_read()
+            write = backend.submit_write(engine.endpoint_out, packet, plan.timeout_ms)
+            try:
+                await self._wait(write)
+            except asyncio.CancelledError:
+                read.cancel()
+                raise
+
+            if not write.ok:
+                read.cancel()
+                await self._wait(read)
+                if write.status in ('timeout', 'cancelled'):
+                    engine.stats.record_timeout(key)
+                    logger.debug(f"⏱️ Send timeout, Versuch {attempt + 2}/{plan.write_attempts}")
+                    continue
+                raise TransferError(f"Senden fehlgeschlagen: {write.error}")
+
+            for read_attempt in range(plan.read_attempts):
+                await self._wait(read)
+                if read.has_data:
+                    engine.stats.record(key, time.perf_counter() - start)
+                    return read
+                if read.status == 'error':
+                    raise TransferError(f"Empfang fehlgeschlagen: {read.error}")
+                engine.stats.record_timeout(key)
+                if read_attempt < plan.read_attempts - 1:
+                    read = submit_read()
+            return read
+
+        return None
+
+    async def send_command(self, command: GoodixCommand, data: bytes = b'',
+                           timeout: Optional[int] = None) -> Optional[bytes]:
+        """Sendet ein Kommando; Rückgabe wie GoodixFingerprintDriver._send_command"""
+        if not self.driver.is_connected:
+            logger.error("❌ Device nicht verbunden")
+            return None
+
+        cmd_byte = command.value if isinstance(command, GoodixCommand) else command
+        packet = bytes([cmd_byte]) + data
+        key = self.driver._command_key(cmd_byte)
+        engine = self._engine
+
+        if not engine.backend.asynchronous:
+            return await self._run_blocking(self.driver._send_command, command, data, timeout)
+
+        try:
+            plan = engine.plan(key, timeout)
+            async with self._exclusive():
+                read = await self._exchange(
+                    packet, plan, key,
+                    lambda: engine.backend.submit_read(engine.endpoint_in,
+                                                       engine.max_packet_size, plan.timeout_ms))
+        except (TransferError, DeadlineExceeded) as e:
+            logger.error(f"❌ Kommando-Fehler: {e}")
+            return None
+
+        if read is None:
+            return None
+        return read.data if read.has_data else b''
+
+    async def read_image(self, timeout: Optional[int] = None) -> Optional[memoryview]:
+        """Liest einen kompletten Frame (gültig bis zum nächsten Read); None bei Fehlern"""
+        if not self.driver.is_connected:
+            logger.error("❌ Device nicht verbunden")
+            return None
+
+        reader: GoodixFrameReader = self.driver._frame_reader
+        engine = self._engine
+        if not engine.backend.asynchronous:
+            return await self._run_blocking(self.driver.read_image, timeout)
+
+        view = reader._view
+        packet_size = engine.max_packet_size
+        first_length = packet_size if reader.header_parser else len(view)
+        packet = bytes([GoodixCommand.READ_IMAGE.value])
+
+        # Wie send_command: Transfer-Fehler und abgelaufene Deadline → None
+        try:
+            plan = engine.plan('READ_IMAGE', timeout)
+            timeout = plan.timeout_ms
+
+            async with self._exclusive():
+                read = await self._exchange(
+                    packet, plan, 'READ_IMAGE',
+                    lambda: engine.backend.submit_read_into(engine.endpoint_in,
+                                                            view[:first_length], timeout))
+                if read is None:
+                    return None
+
+                offset = last = read.actual_length if read.has_data else 0
+                expected = reader.header_parser(view[:offset]) if reader.header_parser and offset else None
+                if expected is not None:
+                    expected = min(expected, len(view))
+
+                while reader._needs_more(offset, last, expected, packet_size, len(view)):
+                    end = expected if expected is not None else len(view)
+                    pending = await self._wait(
+                        engine.backend.submit_read_into(engine.endpoint_in, view[offset:end], timeout))
+                    if pending.status == 'error':
+                        raise TransferError(f"Empfang fehlgeschlagen: {pending.error}")
+                    last = pending.actual_length if pending.has_data else 0
+                    offset += last
+        except (TransferError, DeadlineExceeded) as e:
+            logger.error(f"❌ Bild-Lesefehler: {e}")
+            return None
+
+        return view[:offset].toreadonly()
+
+    # ------------------------------------------------------------------
+    # Scans
+    # ------------------------------------------------------------------
+
+    async def finger_events(self, mode: Optional[str] = None) -> AsyncIterator[int]:
+        """
+        Async-Iterator über gemeldete Scan-Status-Bytes
+
+        Im Event-Modus wird auf einem offenen Interrupt-Transfer gewartet,
+        sonst SCAN_STATUS adaptiv gepollt (asyncio.sleep statt Thread) und
+        nur ein geänderter Status gemeldet - ein aufliegender Finger ergibt
+        ein FINGER_DETECTED, nicht eines pro Abfrage.
+        """
+        detector = FingerDetector(self._engine, self.driver._send_command,
+                                  self.driver.endpoint_intr_addr, mode or self.driver.finger_detect)
+        engine = self._engine
+
+        if detector.mode == 'event' and engine.backend.asynchronous:
+            while True:
+                if detector.interrupt_endpoint is not None:
+                    pending = engine.backend.submit_interrupt_read(
+                        detector.interrupt_endpoint, engine.max_packet_size, EVENT_WAIT_MS)
+                    await self._wait(pending)
+                else:
+                    async with self._exclusive():
+                        pending = await self._wait(engine.backend.submit_read(
+                            engine.endpoint_in, engine.max_packet_size, EVENT_WAIT_MS))
+                if pending.status == 'error':
+                    raise TransferError(f"Event-Transfer fehlgeschlagen: {pending.error}")
+                if pending.has_data:
+                    yield pending.data[0]
+
+        interval = AdaptivePollInterval()
+        last = None
+        while True:
+            response = await self.send_command(GoodixCommand.SCAN_STATUS)
+            status = response[0] if response else None
+            if status is not None and status != last:
+                last = status
+                yield status
+            await asyncio.sleep(interval.next(status))
+
+    async def capture(self, deadline: Optional[float] = None) -> Optional[memoryview]:
+        """
+        Führt einen kompletten Scan durch und liefert die Bilddaten
+
+        deadline: absolute Zeit auf der Loop-Uhr (loop.time()); danach wird
+        abgebrochen und None geliefert. Laufende Transfers werden dabei sofort
+        gecancelt.
+        """
+        if not self.driver.is_initialized:
+            logger.error("❌ Sensor nicht initialisiert")
+            return None
+
+        if deadline is None:
+            return await self._capture()
+
+        loop = asyncio.get_running_loop()
+        try:
+            return await asyncio.wait_for(self._capture(), max(0.0, deadline - loop.time()))
+        except asyncio.TimeoutError:
+            logger.info("⏱️ Capture-Deadline erreicht")
+            return None
+
+    async def capture_quality(self, deadline: float, min_quality: float = DEFAULT_MIN_QUALITY,
+                              scorer: Optional[Scorer] = None) -> Optional[CaptureResult]:
+        """
+        Qualitätsgesteuerter Capture wie GoodixFingerprintDriver.capture()
+
+        Schaltet den Sensor scharf, liest Frames per READ_IMAGE und bewertet
+        jeden beim Eintreffen (QualityGate, Standard: bildbasierter Scorer
+        des Treibers). Liefert den ersten mit Qualität >= min_quality oder
+        zur deadline (loop.time()) den besten bis dahin (accepted=False).
+        None ohne einen einzigen Frame.
+        """
+        if not self.driver.is_initialized:
+            logger.error("❌ Sensor nicht initialisiert")
+            return None
+
+        loop = asyncio.get_running_loop()
+        scan_response = await self.send_command(GoodixCommand.START_SCAN)
+        if not scan_response or scan_response[0] != GoodixStatus.OK.value:
+            logger.error("❌ Scan-Start fehlgeschlagen")
+            return None
+
+        gate = QualityGate(min_quality, scorer or self.driver.quality_scorer())
+        errors = 0
+        while errors < STREAM_MAX_ERRORS:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                image = await asyncio.wait_for(self.read_image(), remaining)
+            except asyncio.TimeoutError:
+                break
+            if image is None or len(image) <= 1:
+                errors += 1
+                continue
+            errors = 0
+            # offer() kopiert den Frame, falls er der bisher beste ist
+            if gate.offer(image, gate.frames):
+                result = gate.result()
+                logger.info(f"✅ Frame akzeptiert: Qualität {result.quality:.2f} nach "
+                            f"{result.frames} Frames ({result.elapsed * 1000:.0f} ms)")
+                return result
+
+        result = gate.result()
+        if result is not None:
+            logger.info(f"⏱️ Capture-Deadline erreicht - bester Frame Qualität {result.quality:.2f}")
+        return result
+
+    async def _capture(self) -> Optional[memoryview]:
+        scan_response = await self.send_command(GoodixCommand.START_SCAN)
+        if not scan_response or scan_response[0] != GoodixStatus.OK.value:
+            logger.error("❌ Scan-Start fehlgeschlagen")
+            return None
+
+        logger.info("✅ Scan gestartet - Finger auflegen!")
+        finger_present = False
+        async for status in self.finger_events():
+            if status == GoodixStatus.FINGER_DETECTED.value:
+                # Nur beim Auflegen melden (Event-Modus meldet ggf. wiederholt)
+                if not finger_present:
+                    finger_present = True
+                    logger.info("👆 Finger erkannt!")
+            elif status == GoodixStatus.NO_FINGER.value:
+                finger_present = False
+            elif status == GoodixStatus.OK.value:
+                logger.info("✅ Scan abgeschlossen!")
+                image = await self.read_image()
+                if image is not None and len(image) > 1:
+                    logger.info(f"🖼️ Bilddaten empfangen: {len(image)} bytes")
+                    return image
+                logger.warning("⚠️ Keine Bilddaten empfangen")
+                return None
+        return None
@@ -0,0 +1,294 @@
+"""
+Goodix Calibration Store
+Hintergrund-Frame pro Sensor: Aufnahme, Persistenz, Korrektur und Drift
+
+Kapazitive Sensoren liefern ohne Finger kein flaches Bild, sondern ein
+Fixed-Pattern aus Spalten- und Pixel-Offsets. Erst nach Abzug dieses
+Hintergrunds bleiben die Rillen übrig. Ablauf:
+
+    - initialize() liest einmalig einige Frames ohne Finger und mittelt sie
+    - der Hintergrund wird pro Seriennummer unter ~/.cache/goodix/calibration
+      abgelegt; ein Warmstart lädt ihn statt neu zu kalibrieren
+    - decode_frame() zieht ihn vektorisiert ab (vorab berechnete Offsets,
+      keine Allokation pro Frame)
+    - der kontinuierliche Modus reicht jeden n-ten Frame an den
+      Drift-Monitor: fingerfreie Frames laufen in einen gleitenden
+      Mittelwert; weicht dieser zu weit ab (Temperatur, Alterung), wird der
+      Hintergrund im Hintergrund ersetzt und gespeichert - ohne zusätzliche
+      USB-Transfers
+
+Ein Eintrag wird verworfen, wenn sich Frame-Format oder Firmware ändern.
+"""
+
+import os
+import re
+import json
+import time
+import threading
+from typing import Optional, Dict, Any
+import logging
+
+import numpy as np
+
+from drivers.goodix_image import FrameFormat, FrameDecoder
+from drivers.goodix_identity import device_key
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CALIBRATION_DIR = os.path.expanduser("~/.cache/goodix/calibration")
+
+# Gemittelte Frames für einen neuen Hintergrund
+CALIBRATION_FRAMES = 4
+
+# Streuung (8-Bit-Skala), ab der ein Frame einen Finger zeigt:
+# roh vor der ersten Kalibrierung, danach nach Hintergrundabzug
+RAW_FINGER_STD = 24.0
+RESIDUAL_FINGER_STD = 12.0
+
+# Drift-Monitor: Gewicht neuer Frames im gleitenden Mittel, Mindestanzahl
+# fingerfreier Frames und RMS-Abweichung (8-Bit-Skala) für eine Neukalibrierung
+DRIFT_ALPHA = 0.1
+DRIFT_MIN_FRAMES = 16
+DRIFT_RMS = 4.0
+
+# Im kontinuierlichen Modus nur jeder n-te Frame
+OBSERVE_EVERY = 8
+
+
+def calibration_key(device=None, transport=None) -> Optional[str]:
+    """Seriennummer des Sensors (None = keine Kalibrierung möglich)"""
+    if device is None:
+        # Transport ohne Hardware: nur wenn er einen stabilen Sensor modelliert
+        return getattr(transport, 'calibration_key', None)
+    try:
+        serial = device.serial_number
+    except Exception:
+        # Ohne Berechtigung für String-Descriptoren
+        serial = None
+    if serial:
+        return f"{device.idVendor:04x}{device.idProduct:04x}-{serial}"
+    return device_key(device)
+
+
+def calibration_fingerprint(fmt: FrameFormat, identity: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Merkmale, deren Änderung eine Kalibrierung ungültig macht"""
+    return {'format': list(fmt), 'firmware': (identity or {}).get('firmware_raw')}
+
+
+class CalibrationStore:
+    """Ein .npz pro Sensor, atomar geschrieben"""
+
+    def __init__(self, directory: str = DEFAULT_CALIBRATION_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, re.sub(r'[^A-Za-z0-9_-]', '_', key) + '.npz')
+
+    def get(self, key: str, fingerprint: Dict[str, Any]) -> Optional[np.ndarray]:
+        """Hintergrund (float32), wenn der Fingerprint noch passt"""
+        path = self.path(key)
+        with self._lock:
+            try:
+                with np.load(path) as entry:
+                    meta = json.loads(str(entry['meta']))
+                    background = entry['background']
+            except (OSError, ValueError, KeyError):
+                return None
+            if meta.get('fingerprint') != fingerprint:
+                logger.info("🔄 Frame-Format oder Firmware geändert - Kalibrierung verworfen")
+                self._remove(path)
+                return None
+            return background.astype(np.float32, copy=False)
+
+    def put(self, key: str, fingerprint: Dict[str, Any], background: np.ndarray):
+        meta = {'fingerprint': fingerprint, 'created': time.time()}
+        path = self.path(key)
+        with self._lock:
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+                np.savez(tmp_path, background=background.astype(np.float32, copy=False),
+                         meta=json.dumps(meta))
+                os.replace(tmp_path, path)
+            except OSError as e:
+                logger.warning(f"⚠️ Kalibrierung nicht gespeichert: {e}")
+
+    def invalidate(self, key: str):
+        with self._lock:
+            self._remove(self.path(key))
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class FlatFieldCorrector:
+    """
+    Zieht den Hintergrund ab und hebt das Bild auf dessen mittleren Pegel
+
+    corrected = clip(raw - background + mean(background), 0, max_value)
+    Der Offset wird einmal als Integer-Array berechnet; pro Frame bleiben
+    Addition, Clip und Rückwandlung in vorab allokierte Puffer.
+    """
+
+    def __init__(self, background: np.ndarray, max_value: int):
+        self.background = background
+        self.max_value = max_value
+        self.level = float(background.mean())
+        self._offset = np.rint(self.level - background).astype(np.int32)
+        self._work = np.empty(background.shape, dtype=np.int32)
+        self._out: Optional[np.ndarray] = None
+
+    def apply(self, image: np.ndarray) -> np.ndarray:
+        """Korrigiertes Bild im Dtype der Eingabe (View, gültig bis zum nächsten Frame)"""
+        if image.shape != self._offset.shape:
+            raise ValueError(f"Frame {image.shape} passt nicht zur Kalibrierung {self._offset.shape}")
+        if self._out is None or self._out.dtype != image.dtype:
+            self._out = np.empty(image.shape, dtype=image.dtype)
+        np.add(image, self._offset, out=self._work)
+        np.clip(self._work, 0, self.max_value, out=self._work)
+        self._out[...] = self._work
+        return self._out
+
+
+class DeviceCalibration:
+    """Kalibrierung eines Sensors: Korrektur, Drift-Monitor und Persistenz"""
+
+    def __init__(self, key: str, fmt: FrameFormat, fingerprint: Dict[str, Any],
+                 store: CalibrationStore, background: Optional[np.ndarray] = None):
+        self.key = key
+        self.format = fmt
+        self.fingerprint = fingerprint
+        self.store = store
+        # Skalierung der 8-Bit-Schwellen auf den Wertebereich des Formats
+        self.scale = fmt.max_value / 255
+        self.corrector: Optional[FlatFieldCorrector] = None
+        self.refreshes = 0
+
+        self._decoder = FrameDecoder(fmt)
+        shape = (fmt.height, fmt.width)
+        self._residual = np.empty(shape, dtype=np.float32)
+        self._mean = np.empty(shape, dtype=np.float32)
+        self._mean_frames = 0
+        self._refreshing = False
+        self._lock = threading.Lock()
+        if background is not None:
+            self._install(background)
+
+    @property
+    def ready(self) -> bool:
+        return self.corrector is not None
+
+    @classmethod
+    def load(cls, key: str, fmt: FrameFormat, fingerprint: Dict[str, Any],
+             store: CalibrationStore) -> 'DeviceCalibration':
+        """Kalibrierung aus dem Store (ready=False, falls keine passende vorliegt)"""
+        background = store.get(key, fingerprint)
+        if background is not None and background.shape != (fmt.height, fmt.width):
+            background = None
+        return cls(key, fmt, fingerprint, store, background)
+
+    def _install(self, background: np.ndarray):
+        self.corrector = FlatFieldCorrector(background, self.format.max_value)
+        self._mean[...] = background
+        self._mean_frames = 0
+
+    def _finger_free(self, image: np.ndarray) -> bool:
+        """Ohne Finger bleibt nach Hintergrundabzug nur Rauschen"""
+        if self.corrector is None:
+            return float(image.std()) < RAW_FINGER_STD * self.scale
+        np.subtract(image, self.corrector.background, out=self._residual)
+        return float(self._residual.std()) < RESIDUAL_FINGER_STD * self.scale
+
+    def calibrate(self, frames) -> bool:
+        """Neuer Hintergrund aus Roh-Frames ohne Finger (verworfen, sobald einer einen zeigt)"""
+        images = []
+        for data in frames:
+            image = self._decoder.decode(data).astype(np.float32)
+            if float(image.std()) >= RAW_FINGER_STD * self.scale:
+                logger.warning("⚠️ Finger auf dem Sensor - Kalibrierung verschoben")
+                return False
+            images.append(image)
+        if not images:
+            return False
+        background = np.mean(images, axis=0, dtype=np.float32)
+        with self._lock:
+            self._install(background)
+        self.store.put(self.key, self.fingerprint, background)
+        logger.info(f"🎚️ Sensor kalibriert ({len(images)} Frames, Pegel {self.corrector.level:.1f})")
+        return True
+
+    def correct(self, image: np.ndarray) -> np.ndarray:
+        """Hintergrundabzug (unverändert, solange keine Kalibrierung vorliegt)"""
+        corrector = self.corrector
+        return corrector.apply(image) if corrector is not None else image
+
+    def observe(self, data) -> Optional[float]:
+        """
+        Drift-Monitor: führt einen Roh-Frame ohne Finger ins gleitende Mittel
+
+        Liefert die aktuelle Drift (RMS, 8-Bit-Skala) bzw. None für Frames
+        mit Finger. Überschreitet sie DRIFT_RMS - oder fehlt noch jede
+        Kalibrierung -, wird das Mittel im Hintergrund zum neuen Hintergrund.
+        """
+        if len(data) < self.format.payload_size:
+            return None
+        with self._lock:
+            image = self._decoder.decode(data)
+            if not self._finger_free(image):
+                return None
+
+            if self._mean_frames == 0 and self.corrector is None:
+                self._mean[...] = image
+            else:
+                # mean += alpha * (image - mean)
+                np.subtract(image, self._mean, out=self._residual)
+                self._residual *= DRIFT_ALPHA
+                self._mean += self._residual
+            self._mean_frames += 1
+
+            if self.corrector is None:
+                drift = float('inf')
+            else:
+                np.subtract(self._mean, self.corrector.background, out=self._residual)
+                flat = self._residual.ravel()
+                drift = float(np.sqrt(np.dot(flat, flat) / flat.size)) / self.scale
+
+            if (drift > DRIFT_RMS and self._mean_frames >= DRIFT_MIN_FRAMES
+                    and not self._refreshing):
+                self._refreshing = True
+                background = self._mean.copy()
+                threading.Thread(target=self._refresh, args=(background, drift),
+                                 name='goodix-calibration', daemon=True).start()
+            return drift
+
+    def _refresh(self, background: np.ndarray, drift: float):
+        """Tauscht den Hintergrund aus und speichert ihn (läuft im eigenen Thread)"""
+        try:
+            with self._lock:
+                self._install(background)
+                self.refreshes += 1
+            logger.info(f"🎚️ Kalibrierung aufgefrischt (Drift {drift:.1f})")
+            self.store.put(self.key, self.fingerprint, background)
+        finally:
+            self._refreshing = False
+
+    def invalidate(self):
+        """Verwirft die Kalibrierung (auch auf der Platte)"""
+        with self._lock:
+            self.corrector = None
+            self._mean_frames = 0
+        self.store.invalidate(self.key)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'key': self.key,
+            'ready': self.ready,
+            'level': self.corrector.level if self.corrector else None,
+            'refreshes': self.refreshes,
+            'path': self.store.path(self.key),
+        }
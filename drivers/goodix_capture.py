@@ -0,0 +1,139 @@
+"""
+Goodix Quality-Gated Capture
+Bewertet jeden eintreffenden Frame und beendet den Capture beim ersten guten
+
+Statt fester Warte- und Haltezeiten wird der Sensor scharfgeschaltet und
+im kontinuierlichen Modus gelesen. Jeder Frame wird sofort bewertet; der
+erste, der die Qualitätsschwelle erreicht, beendet den Capture. Läuft die
+Deadline ab, wird der beste bis dahin gesehene Frame geliefert
+(accepted=False) - der Aufrufer entscheidet, ob er ihn verwendet.
+
+Der Treiber bewertet mit der bildbasierten Quality-Engine
+(biometrics/quality.py). frame_contrast ist der Rückfall für Frames ohne
+bekanntes Format: ein leerer Sensor zeigt nur Hintergrund und Rauschen,
+aufliegende Rillen heben die Streuung deutlich.
+"""
+
+import time
+from typing import Optional, Callable, NamedTuple
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Qualität ab der ein Frame akzeptiert wird bzw. unter der kein Finger aufliegt
+DEFAULT_MIN_QUALITY = 0.45
+LIFT_QUALITY = 0.15
+
+DEFAULT_CAPTURE_TIMEOUT = 15.0
+
+# Standardabweichung (8-Bit-Werte), die einem Score von 1.0 entspricht
+FULL_CONTRAST_STD = 64.0
+
+Scorer = Callable[[memoryview], float]
+
+
+def frame_contrast(data) -> float:
+    """Kontrast-Score 0..1 eines Roh-Frames (Standardabweichung der Bytes)"""
+    if len(data) < 2:
+        return 0.0
+    samples = np.frombuffer(data, dtype=np.uint8)
+    return min(1.0, float(samples.std()) / FULL_CONTRAST_STD)
+
+
+class CaptureResult(NamedTuple):
+    data: bytes
+    quality: float
+    seq: int
+    frames: int      # bewertete Frames
+    elapsed: float   # Sekunden bis zum Ergebnis
+    accepted: bool   # Schwelle erreicht (sonst bester Frame bis zur Deadline)
+
+
+class QualityGate:
+    """
+    Bewertet angebotene Frames und merkt sich den besten
+
+    Unabhängig von der Frame-Quelle: der Treiber füttert Frames aus dem
+    Ring, einfache Frontends direkt aus READ_IMAGE-Antworten.
+    """
+
+    def __init__(self, min_quality: float = DEFAULT_MIN_QUALITY,
+                 scorer: Optional[Scorer] = None):
+        self.min_quality = min_quality
+        self.scorer = scorer or frame_contrast
+        self.frames = 0
+        self.best_quality = -1.0
+        self.best_seq = -1
+        self._best = bytearray()
+        self._started = time.perf_counter()
+
+    def offer(self, data, seq: int = -1, quality: Optional[float] = None) -> bool:
+        """Bewertet einen Frame; True, wenn er die Schwelle erreicht"""
+        if quality is None:
+            quality = self.scorer(data)
+        self.frames += 1
+        if quality > self.best_quality:
+            self.best_quality = quality
+            self.best_seq = seq
+            self._best[:] = data
+        return quality >= self.min_quality
+
+    def result(self) -> Optional[CaptureResult]:
+        """Bester Frame bisher (None, falls keiner bewertet wurde)"""
+        if not self.frames:
+            return None
+        return CaptureResult(bytes(self._best), self.best_quality, self.best_seq, self.frames,
+                             time.perf_counter() - self._started,
+                             self.best_quality >= self.min_quality)
+
+
+def capture_from_ring(ring, gate: QualityGate, timeout: float) -> Optional[CaptureResult]:
+    """
+    Bewertet neue Frames aus einem FrameRing, bis einer akzeptiert wird
+
+    Frames, die vor dem Aufruf im Ring lagen, zählen nicht. Jeder Frame
+    wird zuerst aus dem Slot kopiert und erst dann geprüft - wurde er beim
+    Kopieren überschrieben, wird die Kopie verworfen. Bewertet und behalten
+    wird nur die geprüfte Kopie, nie der Slot selbst.
+    """
+    deadline = time.perf_counter() + timeout
+    scratch = memoryview(bytearray(ring.slot_size))
+    seq = ring.latest_seq
+    while True:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            break
+        frame = ring.next(seq, timeout=remaining)
+        if frame is None:
+            break
+        seq = frame.seq
+        length = ring.copy_into(frame, scratch)
+        if length is None:
+            continue
+        if gate.offer(scratch[:length], frame.seq):
+            return gate.result()
+
+    result = gate.result()
+    if result is not None:
+        logger.info(f"⏱️ Capture-Deadline erreicht - bester Frame Qualität {result.quality:.2f}")
+    return result
+
+
+def wait_for_lift(ring, timeout: float, scorer: Optional[Scorer] = None,
+                  lift_quality: float = LIFT_QUALITY) -> bool:
+    """Wartet, bis ein Frame keinen aufliegenden Finger mehr zeigt"""
+    scorer = scorer or frame_contrast
+    deadline = time.perf_counter() + timeout
+    seq = ring.latest_seq
+    while True:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            return False
+        frame = ring.next(seq, timeout=remaining)
+        if frame is None:
+            return False
+        seq = frame.seq
+        if scorer(frame.data) < lift_quality and ring.valid(frame):
+            return True
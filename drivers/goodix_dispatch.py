@@ -0,0 +1,188 @@
+"""
+Goodix Callback Dispatch
+Entkoppelt Anwender-Callbacks (on_scan_complete, ...) vom USB-Thread
+
+Events landen in einer begrenzten Queue, die ein Pool von Worker-Threads
+abarbeitet. Der Scan-Thread reiht nur ein und bedient sofort wieder den
+Sensor - ein langsamer Konsument (Template-Erzeugung, JSON-Schreiben)
+verzögert den nächsten Capture nicht. Ist die Queue voll, entscheidet die
+Backpressure-Policy:
+
+    drop_oldest  ältestes Event verwerfen (Standard, USB wartet nie)
+    block        bis block_timeout warten, danach ablehnen
+    reject       neues Event ablehnen
+
+Mit einem Worker bleibt die Reihenfolge der Events erhalten.
+"""
+
+import time
+import threading
+from collections import deque
+from typing import Optional, Dict, Deque, List, Callable, Tuple
+import logging
+
+from drivers.goodix_policy import percentile
+
+logger = logging.getLogger(__name__)
+
+BACKPRESSURE_DROP_OLDEST = 'drop_oldest'
+BACKPRESSURE_BLOCK = 'block'
+BACKPRESSURE_REJECT = 'reject'
+BACKPRESSURE_POLICIES = (BACKPRESSURE_DROP_OLDEST, BACKPRESSURE_BLOCK, BACKPRESSURE_REJECT)
+
+# Anzahl gespeicherter Latenz-Samples pro Event
+LATENCY_WINDOW = 256
+
+
+class DispatchStats:
+    """Zähler, Queue-Tiefe und Latenzen (Warte- und Handler-Zeit) pro Event"""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.window = window
+        self.max_depth = 0
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self._wait: Dict[str, Deque[float]] = {}
+        self._handler: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def count(self, key: str, counter: str):
+        with self._lock:
+            counters = self._counters.setdefault(key, dict.fromkeys(
+                ('submitted', 'delivered', 'dropped', 'rejected', 'failed'), 0))
+            counters[counter] += 1
+
+    def record(self, key: str, wait: float, handler: float):
+        with self._lock:
+            self._wait.setdefault(key, deque(maxlen=self.window)).append(wait)
+            self._handler.setdefault(key, deque(maxlen=self.window)).append(handler)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            result = {}
+            for key, counters in self._counters.items():
+                entry = dict(counters)
+                for name, samples in (('wait', self._wait.get(key)),
+                                      ('handler', self._handler.get(key))):
+                    if samples:
+                        ordered = sorted(samples)
+                        entry[f'{name}_p50_ms'] = percentile(ordered, 50) * 1000
+                        entry[f'{name}_p99_ms'] = percentile(ordered, 99) * 1000
+                        entry[f'{name}_max_ms'] = ordered[-1] * 1000
+                result[key] = entry
+            return result
+
+
+class CallbackDispatcher:
+    """Begrenzte Event-Queue mit Worker-Pool"""
+
+    def __init__(self, workers: int = 1, queue_size: int = 8,
+                 backpressure: str = BACKPRESSURE_DROP_OLDEST,
+                 block_timeout: Optional[float] = 1.0, name: str = 'goodix-dispatch'):
+        if backpressure not in BACKPRESSURE_POLICIES:
+            raise ValueError(f"Unbekannte Backpressure-Policy: {backpressure}")
+        if workers < 1 or queue_size < 1:
+            raise ValueError("workers und queue_size müssen mindestens 1 sein")
+        self.workers = workers
+        self.queue_size = queue_size
+        self.backpressure = backpressure
+        self.block_timeout = block_timeout
+        self.name = name
+        self.stats = DispatchStats()
+        self._queue: Deque[Tuple[str, Callable, tuple, float]] = deque()
+        self._cond = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._busy = 0
+        self._running = False
+
+    @property
+    def depth(self) -> int:
+        return len(self._queue)
+
+    def start(self):
+        """Startet den Worker-Pool (geschieht beim ersten submit automatisch)"""
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+            self._threads = [threading.Thread(target=self._work, name=f'{self.name}-{index}',
+                                              daemon=True)
+                             for index in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, key: str, callback: Callable, *args) -> bool:
+        """
+        Reiht einen Callback-Aufruf ein, ohne auf den Konsumenten zu warten
+
+        Rückgabe: False, wenn das Event abgelehnt wurde (Queue voll).
+        """
+        if not self._running:
+            self.start()
+        self.stats.count(key, 'submitted')
+        with self._cond:
+            if len(self._queue) >= self.queue_size:
+                if self.backpressure == BACKPRESSURE_DROP_OLDEST:
+                    dropped = self._queue.popleft()
+                    self.stats.count(dropped[0], 'dropped')
+                    logger.debug(f"⚠️ Dispatch-Queue voll - {dropped[0]} verworfen")
+                elif self.backpressure == BACKPRESSURE_BLOCK:
+                    self._cond.wait_for(lambda: len(self._queue) < self.queue_size,
+                                        self.block_timeout)
+                if len(self._queue) >= self.queue_size:
+                    self.stats.count(key, 'rejected')
+                    logger.warning(f"⚠️ Dispatch-Queue voll - {key} abgelehnt")
+                    return False
+            self._queue.append((key, callback, args, time.perf_counter()))
+            self.stats.max_depth = max(self.stats.max_depth, len(self._queue))
+            self._cond.notify_all()
+        return True
+
+    def _work(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._queue or not self._running)
+                if not self._queue:
+                    return
+                key, callback, args, submitted = self._queue.popleft()
+                self._busy += 1
+                # Wartende Produzenten (block) wecken
+                self._cond.notify_all()
+
+            started = time.perf_counter()
+            try:
+                callback(*args)
+                self.stats.count(key, 'delivered')
+            except Exception as e:
+                self.stats.count(key, 'failed')
+                logger.error(f"❌ Callback {key} fehlgeschlagen: {e}")
+            finally:
+                self.stats.record(key, started - submitted, time.perf_counter() - started)
+                with self._cond:
+                    self._busy -= 1
+                    self._cond.notify_all()
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """Wartet, bis alle eingereihten Events abgearbeitet sind"""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._queue and not self._busy, timeout)
+
+    def shutdown(self, wait: bool = True, timeout: Optional[float] = 5.0):
+        """Beendet den Pool; eingereihte Events werden noch zugestellt"""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join(timeout)
+        self._threads = []
+
+    def snapshot(self) -> Dict[str, object]:
+        """Queue-Zustand und Statistiken pro Event"""
+        return {
+            'workers': self.workers,
+            'queue_size': self.queue_size,
+            'backpressure': self.backpressure,
+            'depth': self.depth,
+            'max_depth': self.stats.max_depth,
+            'events': self.stats.summary(),
+        }
@@ -0,0 +1,126 @@
+"""
+Goodix Finger Detection
+Ereignisgesteuerte Finger-Erkennung mit adaptivem Polling als Fallback
+
+Der Sensor wird einmal mit START_SCAN scharfgeschaltet; danach wartet der
+Detektor auf einem offenen IN-Transfer (Interrupt-Endpoint, falls vorhanden),
+bis das Device einen Status meldet. Ohne Interrupt-Endpoint wird SCAN_STATUS
+gepollt - mit einem Intervall, das sich bei bevorstehender Berührung verkürzt
+und im Leerlauf verlängert.
+"""
+
+import threading
+from typing import Optional, Callable, Iterator
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Status-Codes (siehe GoodixStatus im Treiber)
+STATUS_OK = 0x00
+STATUS_BUSY = 0x02
+STATUS_NO_FINGER = 0x05
+STATUS_FINGER_DETECTED = 0x06
+
+SCAN_STATUS_COMMAND = 0x21
+
+# Wartezeit pro offenem Event-Transfer; danach wird neu eingereicht
+EVENT_WAIT_MS = 1000
+
+# Status-Werte, die eine unmittelbar bevorstehende Berührung anzeigen
+IMMINENT_STATUSES = (STATUS_FINGER_DETECTED, STATUS_BUSY)
+
+
+class AdaptivePollInterval:
+    """
+    Poll-Intervall für SCAN_STATUS
+
+    Startet kurz (Finger wird meist direkt nach dem Scharfschalten
+    aufgelegt), wächst im Leerlauf exponentiell bis idle_interval und fällt
+    auf min_interval zurück, sobald der Status eine Berührung ankündigt.
+    """
+
+    def __init__(self, min_interval: float = 0.01, idle_interval: float = 0.25,
+                 growth: float = 1.5):
+        self.min_interval = min_interval
+        self.idle_interval = idle_interval
+        self.growth = growth
+        self.current = min_interval
+
+    def reset(self):
+        self.current = self.min_interval
+
+    def next(self, status: Optional[int]) -> float:
+        """Liefert das Intervall bis zur nächsten Abfrage"""
+        if status in IMMINENT_STATUSES:
+            self.current = self.min_interval
+        else:
+            self.current = min(self.current * self.growth, self.idle_interval)
+        return self.current
+
+
+class FingerDetector:
+    """
+    Liefert Scan-Status-Werte, sobald der Sensor sie meldet
+
+    Modi: 'event' (offener IN-Transfer), 'poll' (adaptives SCAN_STATUS-
+    Polling) oder 'auto' (event bei vorhandenem Interrupt-Endpoint).
+    """
+
+    def __init__(self, engine, send_command: Callable[[int], Optional[bytes]],
+                 interrupt_endpoint: Optional[int] = None, mode: str = 'auto',
+                 poll_interval: Optional[AdaptivePollInterval] = None):
+        self.engine = engine
+        self.send_command = send_command
+        self.interrupt_endpoint = interrupt_endpoint
+        self.poll_interval = poll_interval or AdaptivePollInterval()
+        self.mode = self._resolve_mode(mode)
+        self._stop = threading.Event()
+
+    def _resolve_mode(self, mode: str) -> str:
+        if mode == 'auto':
+            return 'event' if self.interrupt_endpoint is not None else 'poll'
+        if mode not in ('event', 'poll'):
+            raise ValueError(f"Unbekannter Finger-Detection-Modus: {mode}")
+        return mode
+
+    def stop(self):
+        """Beendet die Erkennung sofort (auch während eines offenen Transfers)"""
+        self._stop.set()
+        if self.mode == 'event':
+            self.engine.cancel_all()
+
+    @property
+    def stopped(self) -> bool:
+        return self._stop.is_set()
+
+    def statuses(self) -> Iterator[int]:
+        """Iteriert über gemeldete Status-Bytes bis stop() aufgerufen wird"""
+        if self.mode == 'event':
+            logger.debug("👂 Finger-Detection: warte auf Device-Event")
+            try:
+                yield from self._event_statuses()
+                return
+            except Exception as e:
+                if self.stopped:
+                    return
+                logger.warning(f"⚠️ Event-Modus fehlgeschlagen, wechsle auf Polling: {e}")
+                self.mode = 'poll'
+
+        logger.debug("🔁 Finger-Detection: adaptives Polling")
+        yield from self._polled_statuses()
+
+    def _event_statuses(self) -> Iterator[int]:
+        while not self.stopped:
+            data = self.engine.wait_event(EVENT_WAIT_MS, self.interrupt_endpoint)
+            if data and not self.stopped:
+                yield data[0]
+
+    def _polled_statuses(self) -> Iterator[int]:
+        self.poll_interval.reset()
+        while not self.stopped:
+            response = self.send_command(SCAN_STATUS_COMMAND)
+            status = response[0] if response else None
+            if status is not None:
+                yield status
+            # Event statt sleep: stop() weckt sofort auf
+            self._stop.wait(self.poll_interval.next(status))
@@ -0,0 +1,106 @@
+"""
+Goodix Frame Reader
+Streamt Bilddaten über mehrere Bulk-Pakete in einen vorab allokierten Puffer
+
+Ein Frame endet mit einem Short Packet (kürzer als wMaxPacketSize) oder -
+falls ein Längen-Header konfiguriert ist - nach der im Header angegebenen
+Länge. Konsumenten erhalten eine schreibgeschützte memoryview auf den
+Empfangspuffer; sie bleibt bis zum nächsten read_frame() gültig.
+"""
+
+import struct
+from typing import Optional, Callable
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Reale Goodix-Frames sind einige zehn Kilobyte groß
+DEFAULT_MAX_FRAME_SIZE = 64 * 1024
+
+# Liefert aus dem ersten Paket die Gesamtlänge des Frames (None = unbekannt)
+HeaderParser = Callable[[memoryview], Optional[int]]
+
+
+def length_prefixed_header(fmt: str = '<BH', length_field: int = 1,
+                           includes_header: bool = False) -> HeaderParser:
+    """
+    Erzeugt einen Parser für Frames mit Längenfeld im Header
+
+    fmt/length_field beschreiben das Header-Layout (z.B. Status-Byte +
+    uint16 Länge); includes_header gibt an, ob die Länge den Header enthält.
+    """
+    header = struct.Struct(fmt)
+
+    def parse(first_packet: memoryview) -> Optional[int]:
+        if len(first_packet) < header.size:
+            return None
+        length = header.unpack_from(first_packet)[length_field]
+        return length if includes_header else length + header.size
+
+    return parse
+
+
+class GoodixFrameReader:
+    """Liest Multi-Paket-Frames ohne Allokation pro Paket"""
+
+    def __init__(self, engine, max_frame_size: int = DEFAULT_MAX_FRAME_SIZE,
+                 header_parser: Optional[HeaderParser] = None):
+        self.engine = engine
+        self.header_parser = header_parser
+        self._buffer = bytearray(max_frame_size)
+        self._view = memoryview(self._buffer)
+
+    @property
+    def max_frame_size(self) -> int:
+        return len(self._buffer)
+
+    def read_frame(self, packet: bytes, timeout_ms: Optional[int] = None,
+                   into: Optional[memoryview] = None) -> Optional[memoryview]:
+        """
+        Sendet 'packet' (z.B. READ_IMAGE) und liest den kompletten Frame
+
+        Ohne 'into' wird der interne Puffer verwendet. Rückgabe ist eine
+        schreibgeschützte View auf die empfangenen Bytes (leer ohne Antwort),
+        None wenn das Kommando nicht gesendet werden konnte.
+        """
+        view = self._view if into is None else into
+        packet_size = self.engine.max_packet_size
+
+        with self.engine.lock:
+            # Mit Header zuerst nur ein Paket lesen, um die Länge zu kennen;
+            # sonst ein großer Transfer, den das Short Packet beendet.
+            first_length = packet_size if self.header_parser else len(view)
+            received = self.engine.transact_into(packet, view[:first_length], timeout_ms,
+                                                 key='READ_IMAGE')
+            if received is None:
+                return None
+
+            offset = received
+            expected = None
+            if self.header_parser and offset:
+                expected = self.header_parser(view[:offset])
+                if expected is not None and expected > len(view):
+                    logger.warning(f"⚠️ Frame ({expected} bytes) größer als Puffer "
+                                   f"({len(view)} bytes) - wird abgeschnitten")
+                    expected = len(view)
+
+            last = received
+            while self._needs_more(offset, last, expected, packet_size, len(view)):
+                end = expected if expected is not None else len(view)
+                last = self.engine.read_into(view[offset:end], timeout_ms)
+                offset += last
+
+        if expected is not None and offset < expected:
+            logger.warning(f"⚠️ Unvollständiger Frame: {offset}/{expected} bytes")
+
+        return view[:offset].toreadonly()
+
+    @staticmethod
+    def _needs_more(offset: int, last: int, expected: Optional[int],
+                    packet_size: int, capacity: int) -> bool:
+        if offset == 0 or last == 0 or offset >= capacity:
+            return False
+        if expected is not None:
+            return offset < expected
+        # Volles letztes Paket ohne Längenangabe: Frame geht weiter
+        return last % packet_size == 0
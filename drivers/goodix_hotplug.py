@@ -0,0 +1,265 @@
+"""
+Goodix Hotplug Monitor
+Erkennt Entfernen/Ankommen des Sensors und stellt die Session im Hintergrund wieder her
+
+Quellen (ohne Polling): libusb-Hotplug-Callbacks, falls libusb1 mit
+Hotplug-Support verfügbar ist, sonst der Kernel-uevent-Socket (Netlink).
+Nach Suspend/Resume oder einem USB-Reset wird die alte Session abgebaut,
+neu verbunden und - falls der Sensor vorher initialisiert war - erneut
+initialisiert. Der nächste Capture findet einen betriebsbereiten Sensor vor.
+"""
+
+import os
+import queue
+import socket
+import select
+import threading
+import time
+from typing import Optional, Callable
+import logging
+
+try:
+    import usb1
+except ImportError:
+    usb1 = None
+
+logger = logging.getLogger(__name__)
+
+HOTPLUG_ARRIVED = 'arrived'
+HOTPLUG_LEFT = 'left'
+
+# Nach 'add' setzt udev die Geräte-Rechte erst mit Verzögerung
+RECONNECT_ATTEMPTS = 6
+RECONNECT_DELAY = 0.1
+
+# Kernel-uevents (Multicast-Gruppe 1, ohne udev-Nachbearbeitung)
+NETLINK_KOBJECT_UEVENT = 15
+UEVENT_KERNEL_GROUP = 1
+
+
+class Usb1HotplugSource:
+    """libusb-Hotplug-Callbacks auf einem eigenen Kontext"""
+
+    name = 'libusb'
+
+    def __init__(self, vendor_id: int, product_id: int):
+        if usb1 is None or not usb1.hasCapability(usb1.CAP_HAS_HOTPLUG):
+            raise OSError("libusb ohne Hotplug-Support")
+        self.vendor_id = vendor_id
+        self.product_id = product_id
+        self._context = usb1.USBContext()
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, emit: Callable[[str], None]):
+        def on_hotplug(context, device, event):
+            # Läuft im libusb-Event-Handling: nur weiterreichen, keine USB-Aufrufe
+            emit(HOTPLUG_ARRIVED if event == usb1.HOTPLUG_EVENT_DEVICE_ARRIVED else HOTPLUG_LEFT)
+            return False
+
+        self._context.hotplugRegisterCallback(
+            on_hotplug,
+            events=usb1.HOTPLUG_EVENT_DEVICE_ARRIVED | usb1.HOTPLUG_EVENT_DEVICE_LEFT,
+            flags=usb1.HOTPLUG_NO_FLAGS,
+            vendor_id=self.vendor_id, product_id=self.product_id)
+        self._running = True
+        self._thread = threading.Thread(target=self._handle_events,
+                                        name='goodix-hotplug', daemon=True)
+        self._thread.start()
+
+    def _handle_events(self):
+        while self._running:
+            try:
+                self._context.handleEvents()
+            except usb1.USBErrorInterrupted:
+                continue
+            except Exception as e:
+                if self._running:
+                    logger.error(f"❌ Hotplug-Event-Fehler: {e}")
+                break
+
+    def stop(self):
+        self._running = False
+        self._context.interruptEventHandler()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+        self._context.close()
+
+
+class NetlinkHotplugSource:
+    """Kernel-uevents über einen Netlink-Socket (Linux, keine Abhängigkeiten)"""
+
+    name = 'netlink'
+
+    def __init__(self, vendor_id: int, product_id: int):
+        # PRODUCT=<vid>/<pid>/<bcdDevice> in Hex ohne führende Nullen
+        self._product_prefix = f"PRODUCT={vendor_id:x}/{product_id:x}/".encode()
+        self._socket = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM,
+                                     NETLINK_KOBJECT_UEVENT)
+        self._socket.bind((0, UEVENT_KERNEL_GROUP))
+        self._wakeup_r, self._wakeup_w = os.pipe()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, emit: Callable[[str], None]):
+        self._thread = threading.Thread(target=self._receive, args=(emit,),
+                                        name='goodix-hotplug', daemon=True)
+        self._thread.start()
+
+    def _receive(self, emit: Callable[[str], None]):
+        while True:
+            readable, _, _ = select.select([self._socket, self._wakeup_r], [], [])
+            if self._wakeup_r in readable:
+                return
+            try:
+                message = self._socket.recv(16384)
+            except OSError as e:
+                logger.error(f"❌ uevent-Empfang fehlgeschlagen: {e}")
+                return
+            event = self._parse(message)
+            if event:
+                emit(event)
+
+    def _parse(self, message: bytes) -> Optional[str]:
+        fields = message.split(b'\0')
+        if b'SUBSYSTEM=usb' not in fields or b'DEVTYPE=usb_device' not in fields:
+            return None
+        if not any(field.startswith(self._product_prefix) for field in fields):
+            return None
+        if b'ACTION=add' in fields:
+            return HOTPLUG_ARRIVED
+        if b'ACTION=remove' in fields:
+            return HOTPLUG_LEFT
+        return None
+
+    def stop(self):
+        os.write(self._wakeup_w, b'\0')
+        if self._thread:
+            self._thread.join(timeout=1.0)
+        self._socket.close()
+        os.close(self._wakeup_r)
+        os.close(self._wakeup_w)
+
+
+def open_hotplug_source(vendor_id: int, product_id: int, preferred: str = 'auto'):
+    """libusb-Hotplug bevorzugt, Netlink als Fallback"""
+    if preferred in ('auto', 'libusb'):
+        try:
+            return Usb1HotplugSource(vendor_id, product_id)
+        except Exception as e:
+            if preferred == 'libusb':
+                raise
+            logger.debug(f"libusb-Hotplug nicht verfügbar ({e}), verwende Netlink")
+    return NetlinkHotplugSource(vendor_id, product_id)
+
+
+class GoodixHotplugMonitor:
+    """
+    Hält die Treiber-Session über Hotplug-Ereignisse hinweg am Leben
+
+    Ereignisse werden in einem eigenen Worker-Thread abgearbeitet; 'ready'
+    ist gesetzt, solange der Sensor verbunden (und ggf. initialisiert) ist.
+    """
+
+    def __init__(self, driver, source: str = 'auto',
+                 on_event: Optional[Callable[[str], None]] = None):
+        self.driver = driver
+        self.source_name = source
+        self.on_event = on_event
+        self.ready = threading.Event()
+        self.reconnects = 0
+        self._source = None
+        self._events: 'queue.Queue[Optional[str]]' = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._restore_init = False
+        self._reconnecting = False
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None and self._worker.is_alive()
+
+    @property
+    def reconnecting(self) -> bool:
+        """True zwischen Entfernen und fertig wiederhergestellter Session"""
+        return self._reconnecting
+
+    def start(self):
+        self._source = open_hotplug_source(self.driver.vendor_id, self.driver.product_id,
+                                           self.source_name)
+        if self.driver.is_connected:
+            self.ready.set()
+        self._worker = threading.Thread(target=self._process_events,
+                                        name='goodix-reconnect', daemon=True)
+        self._worker.start()
+        self._source.start(self._events.put)
+        logger.info(f"🔌 Hotplug-Monitor aktiv ({self._source.name})")
+
+    def stop(self):
+        if self._source:
+            self._source.stop()
+            self._source = None
+        if self._worker:
+            self._events.put(None)
+            self._worker.join(timeout=2.0)
+            self._worker = None
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """Wartet, bis eine laufende Wiederherstellung abgeschlossen ist"""
+        return self.ready.wait(timeout)
+
+    def _process_events(self):
+        while True:
+            event = self._events.get()
+            if event is None:
+                return
+            try:
+                if event == HOTPLUG_LEFT:
+                    self._device_left()
+                else:
+                    self._device_arrived()
+            except Exception as e:
+                logger.error(f"❌ Hotplug-Behandlung fehlgeschlagen: {e}")
+            if self.on_event:
+                self.on_event(event)
+
+    def _teardown(self):
+        self._restore_init = self._restore_init or self.driver.is_initialized
+        self.driver.invalidate_identity()
+        if self.driver.is_connected:
+            self.driver.disconnect()
+
+    def _device_left(self):
+        logger.info("🔌 Sensor entfernt - Session abgebaut")
+        self.ready.clear()
+        self._reconnecting = True
+        self._teardown()
+
+    def _device_arrived(self):
+        logger.info("🔌 Sensor angeschlossen - stelle Session wieder her")
+        self.ready.clear()
+        self._reconnecting = True
+        # Alte Handles sind nach einer Neu-Enumeration ungültig
+        self._teardown()
+
+        delay = RECONNECT_DELAY
+        for attempt in range(RECONNECT_ATTEMPTS):
+            start = time.perf_counter()
+            if self.driver.connect():
+                if self._restore_init and not self.driver.initialize():
+                    logger.warning("⚠️ Re-Initialisierung fehlgeschlagen")
+                    self.driver.disconnect()
+                else:
+                    self.reconnects += 1
+                    self._restore_init = False
+                    self._reconnecting = False
+                    self.ready.set()
+                    logger.info(f"✅ Session wiederhergestellt "
+                                f"({(time.perf_counter() - start) * 1000:.1f} ms)")
+                    return
+            # Zwischenzeitlich erneut entfernt? Dann auf das nächste Ereignis warten
+            if not self._events.empty():
+                return
+            time.sleep(delay)
+            delay *= 2
+
+        self._reconnecting = False
+        logger.error("❌ Wiederverbindung nach Hotplug fehlgeschlagen")
@@ -0,0 +1,113 @@
+"""
+Goodix Device Identity Cache
+Hält Status, Device-Info und Firmware-Version pro Sensor über Prozessgrenzen
+
+Schlüssel ist Bus/Port-Pfad/Seriennummer. Jeder Eintrag trägt einen
+Fingerprint aus USB-Adresse und bcdDevice: die Adresse ändert sich bei jeder
+Neu-Enumeration (Hotplug, Reset, Resume), bcdDevice bei einem
+Firmware-Update. Beides liest pyusb aus dem bereits gecachten Descriptor -
+die Prüfung kostet keinen USB-Transfer.
+
+Die Endpoint-Map (Adressen und wMaxPacketSize) hängt nur vom Modell ab und
+wird separat pro VID:PID gecacht.
+"""
+
+import os
+import json
+import threading
+from typing import Optional, Dict, Any
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.path.expanduser("~/.cache/goodix/device_identity.json")
+DEFAULT_ENDPOINT_CACHE_PATH = os.path.expanduser("~/.cache/goodix/endpoints.json")
+
+
+def device_key(device) -> str:
+    """Stabiler Schlüssel für ein Device: Bus, Port-Pfad und Seriennummer"""
+    ports = '.'.join(str(p) for p in (getattr(device, 'port_numbers', None) or ()))
+    try:
+        serial = device.serial_number or ''
+    except Exception:
+        # Ohne Berechtigung für String-Descriptoren
+        serial = ''
+    return f"{device.bus}-{ports or device.address}-{serial}"
+
+
+def device_fingerprint(device) -> Dict[str, int]:
+    """Merkmale, deren Änderung einen Cache-Eintrag ungültig macht"""
+    return {'address': device.address, 'bcd_device': device.bcdDevice}
+
+
+def model_key(device) -> str:
+    """Schlüssel für modellabhängige Daten (Endpoint-Map)"""
+    return f"{device.idVendor:04x}:{device.idProduct:04x}"
+
+
+def model_fingerprint(device) -> Dict[str, int]:
+    """Neue Firmware kann andere Descriptoren liefern"""
+    return {'bcd_device': device.bcdDevice}
+
+
+class DeviceIdentityCache:
+    """JSON-Datei mit Identitäts-Einträgen, atomar geschrieben"""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if self._entries is None:
+            try:
+                with open(self.path) as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = {}
+        return self._entries
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self._entries, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"⚠️ Identity-Cache nicht gespeichert: {e}")
+
+    def get(self, key: str, fingerprint: Dict[str, int]) -> Optional[Dict[str, Any]]:
+        """Liefert die Identität, wenn der Fingerprint noch passt"""
+        with self._lock:
+            entry = self._load().get(key)
+            if entry is None:
+                return None
+            if entry.get('fingerprint') != fingerprint:
+                logger.info("🔄 Device neu enumeriert oder Firmware geändert - Identity-Cache verworfen")
+                del self._entries[key]
+                self._save()
+                return None
+            return dict(entry['identity'])
+
+    def put(self, key: str, fingerprint: Dict[str, int], identity: Dict[str, Any]):
+        with self._lock:
+            self._load()[key] = {'fingerprint': fingerprint, 'identity': identity}
+            self._save()
+
+    def invalidate(self, key: Optional[str] = None):
+        """Verwirft einen Eintrag (oder alle, ohne key)"""
+        with self._lock:
+            entries = self._load()
+            if key is None:
+                entries.clear()
+            elif entries.pop(key, None) is None:
+                return
+            self._save()
+
+
+class EndpointCache(DeviceIdentityCache):
+    """Endpoint-Adressen und Paketgrößen pro Modell"""
+
+    def __init__(self, path: str = DEFAULT_ENDPOINT_CACHE_PATH):
+        super().__init__(path)
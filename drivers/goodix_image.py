@@ -0,0 +1,133 @@
+"""
+Goodix Frame Decoder
+Wandelt READ_IMAGE-Nutzdaten in 2-D NumPy-Bilder um
+
+Unterstützte Pixel-Formate:
+    gray8     ein Byte pro Pixel                       → uint8, Zero-Copy
+    gray16    uint16 Little Endian pro Pixel           → uint16, Zero-Copy
+    packed12  2 Pixel in 3 Bytes (Goodix-typisch):     → uint16 (0..4095)
+              b0 = p0[7:0], b1 = p1[3:0]<<4 | p0[11:8], b2 = p1[11:4]
+
+Zero-Copy-Formate liefern eine schreibgeschützte View auf den
+Empfangspuffer (gültig, solange der Puffer nicht neu beschrieben wird).
+packed12 wird vektorisiert in einen wiederverwendeten Ausgabepuffer
+entpackt - keine Python-Schleife über Pixel.
+"""
+
+from typing import Optional, NamedTuple, Sequence, Tuple
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+PIXEL_GRAY8 = 'gray8'
+PIXEL_GRAY16 = 'gray16'
+PIXEL_PACKED12 = 'packed12'
+
+# Bekannte Sensor-Geometrien (Breite, Höhe) für die Format-Erkennung
+KNOWN_GEOMETRIES: Sequence[Tuple[int, int]] = ((108, 88), (80, 88), (88, 108), (80, 64), (64, 80))
+
+
+class FrameFormat(NamedTuple):
+    width: int
+    height: int
+    pixel_format: str = PIXEL_GRAY8
+    header_bytes: int = 0  # vor den Pixeln (z.B. Status/Länge)
+
+    @property
+    def pixels(self) -> int:
+        return self.width * self.height
+
+    @property
+    def payload_size(self) -> int:
+        """Bytes eines vollständigen Frames inkl. Header"""
+        return self.header_bytes + pixel_bytes(self.pixels, self.pixel_format)
+
+    @property
+    def max_value(self) -> int:
+        return {PIXEL_GRAY8: 255, PIXEL_PACKED12: 4095}.get(self.pixel_format, 65535)
+
+
+def pixel_bytes(pixels: int, pixel_format: str) -> int:
+    if pixel_format == PIXEL_GRAY8:
+        return pixels
+    if pixel_format == PIXEL_GRAY16:
+        return pixels * 2
+    if pixel_format == PIXEL_PACKED12:
+        return (pixels + 1) // 2 * 3
+    raise ValueError(f"Unbekanntes Pixel-Format: {pixel_format}")
+
+
+def infer_format(length: int, header_bytes: int = 0,
+                 geometries: Sequence[Tuple[int, int]] = KNOWN_GEOMETRIES) -> Optional[FrameFormat]:
+    """Ermittelt Geometrie und Pixel-Format aus der Frame-Länge"""
+    for width, height in geometries:
+        for pixel_format in (PIXEL_GRAY8, PIXEL_PACKED12, PIXEL_GRAY16):
+            fmt = FrameFormat(width, height, pixel_format, header_bytes)
+            if fmt.payload_size == length:
+                return fmt
+    return None
+
+
+class FrameDecoder:
+    """Dekodiert Frames eines festen Formats ohne Allokation pro Frame"""
+
+    def __init__(self, fmt: FrameFormat):
+        self.format = fmt
+        self._out: Optional[np.ndarray] = None
+        if fmt.pixel_format == PIXEL_PACKED12:
+            # Gerade Pixelzahl für das paarweise Entpacken
+            self._out = np.empty((fmt.pixels + 1) // 2 * 2, dtype=np.uint16)
+            self._low = np.empty((fmt.pixels + 1) // 2, dtype=np.uint8)
+
+    def decode(self, data, copy: bool = False) -> np.ndarray:
+        """
+        Rohdaten → 2-D-Array (height x width)
+
+        Ohne copy ist das Ergebnis eine View (Empfangspuffer bzw. interner
+        Ausgabepuffer) und bis zum nächsten Frame gültig.
+        """
+        fmt = self.format
+        if len(data) < fmt.payload_size:
+            raise ValueError(f"Frame zu kurz: {len(data)}/{fmt.payload_size} bytes")
+
+        if fmt.pixel_format == PIXEL_GRAY8:
+            image = np.frombuffer(data, dtype=np.uint8, count=fmt.pixels, offset=fmt.header_bytes)
+        elif fmt.pixel_format == PIXEL_GRAY16:
+            image = np.frombuffer(data, dtype='<u2', count=fmt.pixels, offset=fmt.header_bytes)
+        else:
+            image = self._unpack12(data)[:fmt.pixels]
+
+        image = image.reshape(fmt.height, fmt.width)
+        return image.copy() if copy else image
+
+    def _unpack12(self, data) -> np.ndarray:
+        pairs = len(self._low)
+        raw = np.frombuffer(data, dtype=np.uint8, count=pairs * 3,
+                            offset=self.format.header_bytes).reshape(pairs, 3)
+        out = self._out.reshape(pairs, 2)
+        even, odd = out[:, 0], out[:, 1]
+
+        # p0 = b0 | (b1 & 0x0F) << 8
+        np.bitwise_and(raw[:, 1], 0x0F, out=self._low)
+        even[:] = self._low
+        even <<= 8
+        even |= raw[:, 0]
+        # p1 = b1 >> 4 | b2 << 4
+        odd[:] = raw[:, 2]
+        odd <<= 4
+        np.right_shift(raw[:, 1], 4, out=self._low)
+        odd |= self._low
+        return self._out
+
+
+def to_uint8(image: np.ndarray, max_value: int, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Skaliert ein uint16-Bild mit 'max_value' auf 8 Bit (gray8 wird durchgereicht)"""
+    if image.dtype == np.uint8:
+        return image
+    shift = max(0, int(max_value).bit_length() - 8)
+    if out is None:
+        out = np.empty(image.shape, dtype=np.uint8)
+    np.right_shift(image, shift, out=out, casting='unsafe')
+    return out
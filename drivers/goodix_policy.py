@@ -0,0 +1,172 @@
+"""
+Goodix Transfer Policy
+Adaptive Timeouts und Retry-Budgets pro Kommando
+
+Aus den gemessenen Round-Trip-Zeiten (TransferStats) wird pro Kommando ein
+Timeout abgeleitet: Perzentil * Faktor + Puffer, begrenzt durch eine
+konfigurierbare Obergrenze. Die Anzahl der Versuche ergibt sich aus dem
+Retry-Budget geteilt durch den Timeout - ein Kommando, das selten antwortet
+(z.B. ECHO), blockiert damit nicht mehr 3x3 Mal 5 Sekunden. Zusätzlich kann
+eine Gesamt-Deadline pro Operation gesetzt werden (z.B. ein Auth-Versuch),
+die alle Timeouts und Retries darunter kappt. Die Deadline gilt nur im
+eigenen Kontext (Thread bzw. asyncio-Task) - Stream-Thread, Finger-Erkennung
+und parallele Daemon-Clients sehen die Deadlines der anderen nicht.
+"""
+
+import time
+import itertools
+import contextvars
+from contextlib import contextmanager
+from typing import Optional, Dict, List, NamedTuple, Iterator
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CEILING_MS = 5000
+
+# Obergrenzen pro Kommando (ms); Abfragen antworten in wenigen Millisekunden
+COMMAND_CEILINGS_MS = {
+    'STATUS': 1000,
+    'DEVICE_INFO': 1000,
+    'FIRMWARE_VERSION': 1000,
+    'SCAN_STATUS': 1000,
+    'CONFIG_QUERY': 1000,
+    'ECHO': 500,
+    'START_SCAN': 2000,
+    'INITIALIZE': 3000,
+    'RESET': 3000,
+    'READ_IMAGE': 5000,
+}
+
+PERCENTILES = (50, 90, 99)
+
+_policy_ids = itertools.count()
+
+
+class DeadlineExceeded(Exception):
+    """Die Deadline der laufenden Operation ist abgelaufen"""
+
+
+class CommandPlan(NamedTuple):
+    timeout_ms: int
+    write_attempts: int
+    read_attempts: int
+
+
+def percentile(sorted_samples: List[float], pct: float) -> float:
+    """Nearest-Rank-Perzentil einer sortierten Liste"""
+    index = max(0, min(len(sorted_samples) - 1,
+                       int(round(pct / 100 * len(sorted_samples))) - 1))
+    return sorted_samples[index]
+
+
+class TransferPolicy:
+    """Leitet Timeouts und Versuche aus TransferStats ab"""
+
+    def __init__(self, stats, ceilings_ms: Optional[Dict[str, int]] = None,
+                 default_ceiling_ms: int = DEFAULT_CEILING_MS,
+                 floor_ms: int = 50, percentile: float = 99, multiplier: float = 3.0,
+                 slack_ms: int = 20, budget_factor: float = 2.0,
+                 max_attempts: int = 3, min_samples: int = 8):
+        self.stats = stats
+        self.ceilings_ms = dict(COMMAND_CEILINGS_MS, **(ceilings_ms or {}))
+        self.default_ceiling_ms = default_ceiling_ms
+        self.floor_ms = floor_ms
+        self.percentile = percentile
+        self.multiplier = multiplier
+        self.slack_ms = slack_ms
+        self.budget_factor = budget_factor
+        self.max_attempts = max_attempts
+        self.min_samples = min_samples
+        # Pro Policy-Instanz und pro Kontext (Thread / asyncio-Task)
+        self._deadline: contextvars.ContextVar = contextvars.ContextVar(
+            f'goodix_deadline_{next(_policy_ids)}', default=None)
+
+    # ------------------------------------------------------------------
+    # Timeouts und Retries
+    # ------------------------------------------------------------------
+
+    def ceiling_ms(self, key: str) -> int:
+        return self.ceilings_ms.get(key, self.default_ceiling_ms)
+
+    def timeout_ms(self, key: str, ceiling_ms: Optional[int] = None) -> int:
+        """Gelernter Timeout; ohne genug Messwerte die Obergrenze"""
+        ceiling = ceiling_ms or self.ceiling_ms(key)
+        samples = self.stats.samples(key)
+        if len(samples) < self.min_samples:
+            return ceiling
+        learned = percentile(sorted(samples), self.percentile) * 1000 * self.multiplier
+        return int(min(ceiling, max(self.floor_ms, learned + self.slack_ms)))
+
+    def attempts(self, key: str, timeout_ms: int, ceiling_ms: Optional[int] = None) -> int:
+        """Versuche, die ins Retry-Budget (budget_factor * Obergrenze) passen"""
+        samples = len(self.stats.samples(key))
+        timeouts = self.stats.timeouts(key)
+        if samples + timeouts >= self.min_samples and timeouts > samples:
+            # Meist unbeantwortet - Wiederholen verlängert nur die Wartezeit
+            return 1
+        budget = (ceiling_ms or self.ceiling_ms(key)) * self.budget_factor
+        return max(1, min(self.max_attempts, int(budget // timeout_ms)))
+
+    def plan(self, key: str, ceiling_ms: Optional[int] = None) -> CommandPlan:
+        """
+        Timeout und Versuche für ein Kommando
+
+        ceiling_ms: explizite Obergrenze des Aufrufers (ersetzt die
+        konfigurierte). Eine laufende Deadline kappt den Timeout; ist sie
+        abgelaufen, wird DeadlineExceeded geworfen.
+        """
+        timeout = self.timeout_ms(key, ceiling_ms)
+        attempts = self.attempts(key, timeout, ceiling_ms)
+
+        remaining = self.remaining_ms()
+        if remaining is not None:
+            if remaining <= 0:
+                raise DeadlineExceeded(f"Deadline vor {key} abgelaufen")
+            timeout = max(1, min(timeout, int(remaining)))
+
+        return CommandPlan(timeout, attempts, attempts)
+
+    # ------------------------------------------------------------------
+    # Deadline pro Operation
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def deadline(self, seconds: float) -> Iterator[None]:
+        """Begrenzt alle Kommandos im Block auf insgesamt 'seconds'"""
+        previous = self._deadline.get()
+        deadline = time.perf_counter() + seconds
+        # Verschachtelte Deadlines können nur verkürzen
+        token = self._deadline.set(deadline if previous is None else min(previous, deadline))
+        try:
+            yield
+        finally:
+            self._deadline.reset(token)
+
+    def remaining_ms(self) -> Optional[float]:
+        deadline = self._deadline.get()
+        if deadline is None:
+            return None
+        return (deadline - time.perf_counter()) * 1000
+
+    def expired(self) -> bool:
+        remaining = self.remaining_ms()
+        return remaining is not None and remaining <= 0
+
+    # ------------------------------------------------------------------
+    # Statistiken
+    # ------------------------------------------------------------------
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Gelernte Perzentile, Timeouts und Versuche pro Kommando"""
+        result = {}
+        for key, entry in self.stats.summary().items():
+            samples = sorted(self.stats.samples(key))
+            if samples:
+                for pct in PERCENTILES:
+                    entry[f'p{pct}_ms'] = percentile(samples, pct) * 1000
+            timeout = self.timeout_ms(key)
+            entry['timeout_ms'] = timeout
+            entry['attempts'] = self.attempts(key, timeout)
+            result[key] = entry
+        return result
@@ -9,10 +9,29 @@ import time
 import threading
 import queue
 import struct
+import numpy as np
 from typing import Optional, Tuple, List, Dict, Callable
 from enum import Enum
 import logging
 
+from drivers.goodix_transfer import (GoodixTransferEngine, TransferStats, TransferError,
+                                     open_transfer_backend)
+from drivers.goodix_policy import TransferPolicy, DeadlineExceeded
+from drivers.goodix_transport import transport_from_env
+from drivers.goodix_frame import GoodixFrameReader, DEFAULT_MAX_FRAME_SIZE
+from drivers.goodix_ring import FrameRing
+from drivers.goodix_image import FrameFormat, FrameDecoder, infer_format
+from drivers.goodix_calibration import (CalibrationStore, DeviceCalibration, calibration_key,
+                                        calibration_fingerprint, CALIBRATION_FRAMES, OBSERVE_EVERY)
+from drivers.goodix_capture import (QualityGate, CaptureResult, Scorer, capture_from_ring,
+                                    wait_for_lift, DEFAULT_MIN_QUALITY, DEFAULT_CAPTURE_TIMEOUT)
+from drivers.goodix_finger_detect import FingerDetector
+from biometrics.quality import FrameScorer, QualityReport
+from biometrics.minutiae import MinutiaeExtractor, FeatureSet
+from drivers.goodix_dispatch import CallbackDispatcher, BACKPRESSURE_DROP_OLDEST
+from drivers.goodix_identity import (DeviceIdentityCache, EndpointCache, device_key,
+                                    device_fingerprint, model_key, model_fingerprint)
+
 logger = logging.getLogger(__name__)
 
 class GoodixStatus(Enum):
@@ -38,6 +57,17 @@ class GoodixCommand(Enum):
     RESET = 0x80
     ECHO = 0xFF
 
+# Idempotente Abfragen mit verlässlicher Antwort, die gepipelined werden dürfen.
+# Alle anderen Kommandos (INITIALIZE, START_SCAN, RESET, READ_IMAGE und ECHO,
+# das nicht immer beantwortet wird) laufen im Lockstep.
+PIPELINE_COMMANDS = frozenset({
+    GoodixCommand.STATUS, GoodixCommand.DEVICE_INFO, GoodixCommand.FIRMWARE_VERSION,
+    GoodixCommand.SCAN_STATUS, GoodixCommand.CONFIG_QUERY
+})
+
+# Kontinuierlicher Modus: so viele Lesefehler in Folge beenden den Stream
+STREAM_MAX_ERRORS = 5
+
 class GoodixFingerprintDriver:
     """
     Goodix Fingerprint Sensor Driver Prototype
@@ -45,28 +75,96 @@ class GoodixFingerprintDriver:
     Implementiert das reverse-engineerte Protokoll für den 27C6:55A2 Sensor
     """
     
-    def __init__(self, vendor_id: int = 0x27C6, product_id: int = 0x55A2):
+    def __init__(self, vendor_id: int = 0x27C6, product_id: int = 0x55A2,
+                 transfer_backend: str = 'auto',
+                 max_frame_size: int = DEFAULT_MAX_FRAME_SIZE,
+                 frame_format: Optional[FrameFormat] = None,
+                 calibrate: bool = True,
+                 calibration_store: Optional[CalibrationStore] = None,
+                 finger_detect: str = 'auto',
+                 identity_cache: Optional[DeviceIdentityCache] = None,
+                 fast_connect: bool = True,
+                 endpoint_cache: Optional[EndpointCache] = None,
+                 transfer_policy: Optional[TransferPolicy] = None,
+                 transport=None,
+                 callback_workers: int = 1,
+                 callback_queue_size: int = 8,
+                 backpressure: str = BACKPRESSURE_DROP_OLDEST):
         self.vendor_id = vendor_id
         self.product_id = product_id
         self.device: Optional[usb.core.Device] = None
         self.interface_number = 0
         self.endpoint_in = None
         self.endpoint_out = None
+        self.endpoint_out_addr = 0x01
+        self.endpoint_in_addr = 0x82
+        self.endpoint_intr_addr: Optional[int] = None
+        self.endpoint_in_max_packet = 512
         self.is_connected = False
         self.is_initialized = False
         
-        # Callback für Events
+        # Transfer-Engine ('auto' = libusb1 asynchron, sonst pyusb)
+        self.transfer_backend = transfer_backend
+        self._engine: Optional[GoodixTransferEngine] = None
+        
+        # Transport: None = direkte Hardware, sonst Record/Replay (auch per Umgebung)
+        self.transport = transport if transport is not None else transport_from_env()
+        
+        # Adaptive Timeouts/Retries - überlebt Reconnects, damit Gelerntes bleibt
+        self.policy = transfer_policy or TransferPolicy(TransferStats())
+        
+        # Bilddaten: vorab allokierter Frame-Puffer
+        self.max_frame_size = max_frame_size
+        self._frame_reader: Optional[GoodixFrameReader] = None
+        
+        # Pixel-Layout der Frames (None = aus der Frame-Länge erkennen)
+        self.frame_format = frame_format
+        self._decoder: Optional[FrameDecoder] = None
+        self._extractor: Optional[MinutiaeExtractor] = None
+        
+        # Hintergrund-Kalibrierung pro Seriennummer (Warmstart ohne Neuaufnahme)
+        self.calibrate = calibrate
+        self.calibration_store = calibration_store or CalibrationStore()
+        self.calibration: Optional[DeviceCalibration] = None
+        
+        # Callback für Events - laufen im Dispatcher-Pool, nie auf dem Scan-Thread
         self.on_finger_detected: Optional[Callable] = None
         self.on_scan_complete: Optional[Callable] = None
         self.on_error: Optional[Callable] = None
+        self.dispatcher = CallbackDispatcher(callback_workers, callback_queue_size, backpressure)
         
-        # Scan-Monitoring
+        # Scan-Monitoring ('auto' = Interrupt-Endpoint falls vorhanden, sonst Polling)
+        self.finger_detect = finger_detect
+        self._finger_detector: Optional[FingerDetector] = None
         self._scan_thread = None
         self._scan_active = False
         
+        # Kontinuierlicher Modus: Frames im Ring, ohne Allokation pro Frame
+        self.frame_ring: Optional[FrameRing] = None
+        self._stream_thread: Optional[threading.Thread] = None
+        self._stream_active = False
+        
+        # Device-Identität (Status/Info/Firmware) - einmal pro Enumeration abgefragt
+        self.identity_cache = identity_cache or DeviceIdentityCache()
+        self._identity_key: Optional[str] = None
+        self._identity: Optional[Dict[str, any]] = None
+        
+        # Fast Connect: Konfiguration nur bei Bedarf, Endpoint-Map aus Cache
+        self.fast_connect = fast_connect
+        self.endpoint_cache = endpoint_cache or EndpointCache()
+        self._endpoints_cached = False
+        self._endpoints_unverified = False
+        self.connect_time: Optional[float] = None
+        
     def connect(self) -> bool:
         """Verbindet mit dem Goodix-Device"""
+        start = time.perf_counter()
         try:
+            if self.transport is not None and not self.transport.needs_device:
+                # Transport ohne Hardware (Replay): kein USB-Device, keine Caches
+                self._endpoints_cached = self._endpoints_unverified = False
+                return self._open_session(self.transport.open(self), start)
+            
             logger.info(f"🔍 Suche nach Goodix-Device {self.vendor_id:04X}:{self.product_id:04X}")
             
             self.device = usb.core.find(idVendor=self.vendor_id, idProduct=self.product_id)
@@ -85,38 +183,104 @@ class GoodixFingerprintDriver:
             
             # Device konfigurieren (optional)
             try:
-                self.device.set_configuration()
-                logger.info("⚙️ USB-Konfiguration gesetzt")
+                if self._configure():
+                    logger.info("⚙️ USB-Konfiguration gesetzt")
             except Exception as e:
                 logger.warning(f"⚠️ Konfiguration fehlgeschlagen: {e}")
                 # Weiter machen - Device könnte schon konfiguriert sein
             
-            # Interface claimen (optional)
-            try:
-                usb.util.claim_interface(self.device, 0)
-                logger.info("🤝 Interface beansprucht")
-            except Exception as e:
-                logger.warning(f"⚠️ Interface-Claim fehlgeschlagen: {e}")
-                # Weiter machen - manchmal nicht nötig
-            
-            # Endpoints finden
-            try:
-                self._find_endpoints()
-                logger.info("🎯 Endpoints gefunden")
-            except Exception as e:
-                logger.warning(f"⚠️ Endpoint-Suche fehlgeschlagen: {e}")
-                # Fallback: Standard-Endpoints verwenden
-                self.endpoint_out = None
-                self.endpoint_in = None
+            # Endpoints finden (Fast Connect: aus dem Cache, Prüfung beim ersten Kommando)
+            self._endpoints_cached = self.fast_connect and self._load_endpoint_map()
+            self._endpoints_unverified = self._endpoints_cached
+            if self._endpoints_cached:
+                logger.debug("⚡ Endpoint-Map aus Cache")
+            else:
+                try:
+                    self._find_endpoints()
+                    logger.info("🎯 Endpoints gefunden")
+                except Exception as e:
+                    logger.warning(f"⚠️ Endpoint-Suche fehlgeschlagen: {e}")
+                    # Fallback: Standard-Endpoints verwenden
+                    self.endpoint_out = None
+                    self.endpoint_in = None
             
-            self.is_connected = True
-            logger.info("✅ Mit Goodix-Device verbunden (möglicherweise eingeschränkt)")
-            return True
+            # Interface claimen und Transfer-Engine öffnen
+            backend = open_transfer_backend(self.device, self.vendor_id, self.product_id,
+                                            self.interface_number, self.transfer_backend)
+            if self.transport is not None:
+                backend = self.transport.wrap(backend, self)
+            return self._open_session(backend, start)
             
         except Exception as e:
             logger.error(f"❌ Verbindungsfehler: {e}")
             return False
     
+    def _open_session(self, backend, start: float) -> bool:
+        """Baut Transfer-Engine und Frame-Reader über dem Backend auf"""
+        self._engine = GoodixTransferEngine(
+            backend,
+            endpoint_out=self.endpoint_out_addr,
+            endpoint_in=self.endpoint_in_addr,
+            max_packet_size=self.endpoint_in_max_packet,
+            policy=self.policy)
+        self._frame_reader = GoodixFrameReader(self._engine, self.max_frame_size)
+        
+        self.is_connected = True
+        self._load_identity()
+        self.connect_time = time.perf_counter() - start
+        logger.info(f"✅ Mit Goodix-Device verbunden ({self.connect_time * 1000:.1f} ms, "
+                    f"{'warm' if self._endpoints_cached else 'kalt'}, {backend.name})")
+        return True
+    
+    def _configure(self) -> bool:
+        """Setzt die Konfiguration nur, wenn sie von der aktiven abweicht"""
+        if self.fast_connect:
+            wanted = self.device[0].bConfigurationValue
+            try:
+                if self.device.get_active_configuration().bConfigurationValue == wanted:
+                    return False
+            except usb.core.USBError:
+                # Unkonfiguriertes Device
+                pass
+        self.device.set_configuration()
+        return True
+    
+    def _load_endpoint_map(self) -> bool:
+        """Übernimmt Endpoint-Adressen und Paketgröße aus dem Modell-Cache"""
+        try:
+            endpoints = self.endpoint_cache.get(model_key(self.device),
+                                                model_fingerprint(self.device))
+        except Exception as e:
+            logger.debug(f"Endpoint-Cache nicht verfügbar: {e}")
+            return False
+        if endpoints is None:
+            return False
+        
+        self.endpoint_in = None
+        self.endpoint_out = None
+        self.endpoint_out_addr = endpoints['out']
+        self.endpoint_in_addr = endpoints['in']
+        self.endpoint_intr_addr = endpoints.get('intr')
+        self.endpoint_in_max_packet = endpoints['in_max_packet']
+        return True
+    
+    def _store_endpoint_map(self):
+        self.endpoint_cache.put(model_key(self.device), model_fingerprint(self.device), {
+            'out': self.endpoint_out_addr,
+            'in': self.endpoint_in_addr,
+            'intr': self.endpoint_intr_addr,
+            'in_max_packet': self.endpoint_in_max_packet
+        })
+    
+    def _revalidate_endpoints(self):
+        """Gecachte Endpoint-Map passt nicht (mehr) - Descriptoren neu lesen"""
+        logger.warning("⚠️ Gecachte Endpoint-Map ungültig - lese Descriptoren neu")
+        self.endpoint_cache.invalidate(model_key(self.device))
+        self._find_endpoints()
+        self._engine.endpoint_out = self.endpoint_out_addr
+        self._engine.endpoint_in = self.endpoint_in_addr
+        self._engine.max_packet_size = self.endpoint_in_max_packet
+    
     def _find_endpoints(self):
         """Findet und konfiguriert die USB-Endpoints"""
         try:
@@ -124,7 +288,11 @@ class GoodixFingerprintDriver:
             intf = cfg[(0, 0)]
             
             for ep in intf:
-                if usb.util.endpoint_direction(ep.bEndpointAddress) == usb.util.ENDPOINT_IN:
+                if usb.util.endpoint_type(ep.bmAttributes) == usb.util.ENDPOINT_TYPE_INTR:
+                    if usb.util.endpoint_direction(ep.bEndpointAddress) == usb.util.ENDPOINT_IN:
+                        self.endpoint_intr_addr = ep.bEndpointAddress
+                        logger.debug(f"🔔 Interrupt Endpoint: 0x{ep.bEndpointAddress:02x}")
+                elif usb.util.endpoint_direction(ep.bEndpointAddress) == usb.util.ENDPOINT_IN:
                     self.endpoint_in = ep
                     logger.debug(f"📥 IN Endpoint: 0x{ep.bEndpointAddress:02x}")
                 elif usb.util.endpoint_direction(ep.bEndpointAddress) == usb.util.ENDPOINT_OUT:
@@ -143,6 +311,11 @@ class GoodixFingerprintDriver:
                 self.endpoint_in_addr = 0x82
             else:
                 self.endpoint_in_addr = self.endpoint_in.bEndpointAddress
+                self.endpoint_in_max_packet = self.endpoint_in.wMaxPacketSize
+            
+            # Nur tatsächlich gefundene Endpoints cachen, keine Standardwerte
+            if self.fast_connect and self.endpoint_out is not None and self.endpoint_in is not None:
+                self._store_endpoint_map()
                 
         except Exception as e:
             logger.warning(f"⚠️ Endpoint-Erkennung fehlgeschlagen: {e}")
@@ -153,8 +326,9 @@ class GoodixFingerprintDriver:
             self.endpoint_in_addr = 0x82   # Standard IN
             logger.info("🎯 Verwende Standard-Endpoints: OUT=0x01, IN=0x82")
     
-    def _send_command(self, command: GoodixCommand, data: bytes = b'', timeout: int = 5000) -> Optional[bytes]:
-        """Sendet ein Kommando und wartet auf Antwort"""
+    def _send_command(self, command: GoodixCommand, data: bytes = b'',
+                      timeout: Optional[int] = None) -> Optional[bytes]:
+        """Sendet ein Kommando und wartet auf Antwort (timeout: Obergrenze in ms, sonst Policy)"""
         if not self.is_connected:
             logger.error("❌ Device nicht verbunden")
             return None
@@ -166,49 +340,105 @@ class GoodixFingerprintDriver:
             
             logger.debug(f"📤 Sende: {packet.hex()}")
             
-            # Mehrere Versuche für robuste Kommunikation
-            for attempt in range(3):
-                try:
-                    # Senden
-                    endpoint_out = getattr(self, 'endpoint_out_addr', 0x01)
-                    bytes_sent = self.device.write(endpoint_out, packet, timeout)
-                    
-                    # Längere Pause für Device-Processing
-                    time.sleep(0.05)  # 50ms statt 10ms
-                    
-                    # Antwort empfangen mit mehreren Versuchen
-                    for read_attempt in range(3):
-                        try:
-                            endpoint_in = getattr(self, 'endpoint_in_addr', 0x82)
-                            response = self.device.read(endpoint_in, 512, timeout)
-                            response_bytes = bytes(response)
-                            
-                            if len(response_bytes) > 0:
-                                logger.debug(f"📥 Empfangen: {response_bytes.hex()}")
-                                return response_bytes
-                        except usb.core.USBTimeoutError:
-                            if read_attempt < 2:
-                                logger.debug(f"⏱️ Read timeout, Versuch {read_attempt + 2}/3")
-                                time.sleep(0.1)
-                            continue
-                    
-                    # Wenn kein Response, aber Send erfolgreich
-                    logger.debug("📤 Kommando gesendet, aber keine Antwort - das kann normal sein")
-                    return b''  # Leere Antwort als "Success" interpretieren
-                    
-                except usb.core.USBTimeoutError:
-                    if attempt < 2:
-                        logger.debug(f"⏱️ Send timeout, Versuch {attempt + 2}/3")
-                        time.sleep(0.1)
-                        continue
-                    else:
-                        logger.debug("⏱️ Finaler USB-Timeout")
-                        return None
+            # Antwort kommt zurück, sobald der IN-Transfer abgeschlossen ist
+            try:
+                response = self._engine.transact(packet, timeout, key=self._command_key(cmd_byte))
+            except Exception:
+                if not self._endpoints_unverified:
+                    raise
+                response = None
+            if self._endpoints_unverified:
+                # Erstes Kommando prüft die gecachte Endpoint-Map
+                self._endpoints_unverified = False
+                if response is None:
+                    self._revalidate_endpoints()
+                    response = self._engine.transact(packet, timeout,
+                                                     key=self._command_key(cmd_byte))
+            if response:
+                logger.debug(f"📥 Empfangen: {response.hex()}")
+            return response
                         
+        except DeadlineExceeded as e:
+            logger.warning(f"⏱️ {e}")
+            return None
         except Exception as e:
             logger.error(f"❌ Kommando-Fehler: {e}")
             return None
     
+    def _send_commands(self, commands: List[GoodixCommand],
+                       timeout: Optional[int] = None) -> List[Optional[bytes]]:
+        """
+        Sendet eine Kommandofolge; aufeinanderfolgende Abfragen aus
+        PIPELINE_COMMANDS laufen gemeinsam in der Pipeline, alle anderen
+        im Lockstep. Antworten in Reihenfolge der Kommandos.
+        """
+        results: List[Optional[bytes]] = []
+        batch: List[GoodixCommand] = []
+        
+        def flush():
+            if len(batch) == 1:
+                results.append(self._send_command(batch[0], timeout=timeout))
+            elif batch:
+                results.extend(self._send_pipelined(batch, timeout))
+            batch.clear()
+        
+        for command in commands:
+            if self._pipelineable(command):
+                batch.append(command)
+                continue
+            flush()
+            results.append(self._send_command(command, timeout=timeout))
+        flush()
+        return results
+    
+    def _pipelineable(self, command: GoodixCommand) -> bool:
+        # Ungeprüfte (gecachte) Endpoints zuerst per Einzelkommando validieren;
+        # Kommandos, die schon einmal unbeantwortet blieben, würden die
+        # Zuordnung der folgenden Antworten verschieben
+        return (command in PIPELINE_COMMANDS and not self._endpoints_unverified
+                and self._engine is not None and not self._engine.stats.timeouts(command.name))
+    
+    def _send_pipelined(self, commands: List[GoodixCommand],
+                        timeout: Optional[int]) -> List[Optional[bytes]]:
+        if not self.is_connected:
+            logger.error("❌ Device nicht verbunden")
+            return [None] * len(commands)
+        
+        requests = [(bytes([command.value]), command.name) for command in commands]
+        logger.debug(f"📤 Pipeline: {', '.join(command.name for command in commands)}")
+        try:
+            return self._engine.transact_many(requests, timeout)
+        except DeadlineExceeded as e:
+            logger.warning(f"⏱️ {e}")
+            return [None] * len(commands)
+        except Exception as e:
+            logger.error(f"❌ Kommando-Fehler: {e}")
+            return [None] * len(commands)
+    
+    @staticmethod
+    def _command_key(cmd_byte: int) -> str:
+        """Name eines Kommandos für Statistiken"""
+        try:
+            return GoodixCommand(cmd_byte).name
+        except ValueError:
+            return f"0x{cmd_byte:02X}"
+    
+    def get_transfer_stats(self) -> Dict[str, Dict[str, float]]:
+        """Round-Trip-Zeiten pro Kommando (ms)"""
+        return self.policy.stats.summary()
+    
+    def get_policy_stats(self) -> Dict[str, Dict[str, float]]:
+        """Perzentile sowie gelernte Timeouts und Versuche pro Kommando"""
+        return self.policy.snapshot()
+    
+    def get_dispatch_stats(self) -> Dict[str, object]:
+        """Queue-Tiefe, verworfene Events und Handler-Latenzen der Callbacks"""
+        return self.dispatcher.snapshot()
+    
+    def deadline(self, seconds: float):
+        """Context-Manager: alle Kommandos im Block enden spätestens nach 'seconds'"""
+        return self.policy.deadline(seconds)
+    
     def initialize(self) -> bool:
         """Initialisiert den Sensor"""
         if not self.is_connected:
@@ -217,55 +447,83 @@ class GoodixFingerprintDriver:
         
         logger.info("🔧 Initialisiere Goodix-Sensor...")
         
-        # 1. Device-Status prüfen (mit relaxten Erwartungen)
-        logger.info("📊 Prüfe Device-Status...")
-        status_response = self._send_command(GoodixCommand.STATUS)
-        
-        # Auch ohne Status-Response können wir fortfahren
-        if status_response is not None:
-            logger.info(f"📊 Device-Status: {status_response.hex()}")
+        # 1.-3. Status, Device-Info und Firmware stammen aus der Identität (connect)
+        identity = self._identity or {}
+        if identity.get('status_raw'):
+            logger.info(f"📊 Device-Status: {identity['status_raw']}")
         else:
             logger.info("📊 Kein Status-Response - fahre trotzdem fort")
+        if identity.get('device_info_raw'):
+            logger.info(f"ℹ️ Device-Info: {identity['device_info_raw']}")
+        if identity.get('firmware_raw'):
+            logger.info(f"🔧 Firmware: {identity['firmware_raw']}")
         
-        # 2. Device-Informationen abrufen (optional)
-        logger.info("ℹ️ Sammle Device-Informationen...")
-        info_response = self._send_command(GoodixCommand.DEVICE_INFO)
-        if info_response:
-            logger.info(f"ℹ️ Device-Info: {info_response.hex()}")
-        
-        # 3. Firmware-Version abrufen (optional)
-        version_response = self._send_command(GoodixCommand.FIRMWARE_VERSION)
-        if version_response:
-            logger.info(f"🔧 Firmware: {version_response.hex()}")
-        
-        # 4. Echo-Test für grundlegende Kommunikation
+        # 4./5. Echo-Test und Sensor-Initialisierung (sanft); INITIALIZE wartet
+        # im Lockstep auf die Echo-Antwort
         logger.info("🔄 Teste grundlegende Kommunikation...")
-        echo_response = self._send_command(GoodixCommand.ECHO)
+        logger.info("🔧 Starte Sensor-Initialisierung...")
+        echo_response, init_response = self._send_commands([GoodixCommand.ECHO,
+                                                            GoodixCommand.INITIALIZE])
         if echo_response is not None:
             logger.info(f"🔄 Echo-Response: {echo_response.hex()}")
         
-        # 5. Sensor initialisieren (sanft)
-        logger.info("🔧 Starte Sensor-Initialisierung...")
-        init_response = self._send_command(GoodixCommand.INITIALIZE)
-        
         # Relaxte Erfolgskriterien - jede Response ist ein Erfolg
         if init_response is not None:
             logger.info(f"✅ Init-Response: {init_response.hex()}")
-            self.is_initialized = True
             logger.info("✅ Sensor erfolgreich initialisiert")
-            return True
         else:
             # Auch ohne Response als Erfolg werten, wenn Verbindung stabil ist
             logger.info("⚠️ Keine Init-Response, aber Verbindung stabil")
             logger.info("✅ Sensor-Initialisierung als erfolgreich angenommen")
-            self.is_initialized = True
-            return True
+        self.is_initialized = True
+        
+        # 6. Hintergrund-Kalibrierung (Warmstart: aus dem Store)
+        self._load_calibration()
+        return True
+    
+    def _load_calibration(self):
+        """Lädt die Kalibrierung des Sensors oder nimmt sie einmalig auf"""
+        self.calibration = None
+        if not self.calibrate:
+            return
+        key = calibration_key(self.device, self.transport)
+        if key is None:
+            logger.debug("Keine Seriennummer - ohne Kalibrierung")
+            return
+        
+        frames = []
+        fmt = self.frame_format
+        if fmt is None:
+            # Format unbekannt: aus dem ersten Frame ermitteln
+            frame = self.read_image()
+            fmt = infer_format(len(frame)) if frame is not None else None
+            if fmt is None:
+                logger.warning("⚠️ Frame-Format unbekannt - ohne Kalibrierung")
+                return
+            frames.append(bytes(frame))
+        
+        calibration = DeviceCalibration.load(key, fmt, calibration_fingerprint(fmt, self._identity),
+                                             self.calibration_store)
+        if calibration.ready:
+            logger.info("⚡ Kalibrierung aus Cache")
+        else:
+            while len(frames) < CALIBRATION_FRAMES:
+                frame = self.read_image()
+                if frame is None or len(frame) < fmt.payload_size:
+                    break
+                frames.append(bytes(frame))
+            # Ohne Erfolg (Finger aufgelegt) holt der Drift-Monitor das später nach
+            calibration.calibrate(frames)
+        self.calibration = calibration
     
     def start_scan(self) -> bool:
         """Startet einen Fingerabdruck-Scan"""
         if not self.is_initialized:
             logger.error("❌ Sensor nicht initialisiert")
             return False
+        if self._stream_active:
+            logger.error("❌ Kontinuierlicher Modus aktiv - erst stop_continuous()")
+            return False
         
         logger.info("👆 Starte Fingerabdruck-Scan...")
         
@@ -280,6 +538,8 @@ class GoodixFingerprintDriver:
             
             # Scan-Monitoring in separatem Thread
             self._scan_active = True
+            self._finger_detector = FingerDetector(self._engine, self._send_command,
+                                                   self.endpoint_intr_addr, self.finger_detect)
             self._scan_thread = threading.Thread(target=self._monitor_scan)
             self._scan_thread.start()
             
@@ -290,94 +550,333 @@ class GoodixFingerprintDriver:
     
     def _monitor_scan(self):
         """Monitort den Scan-Fortschritt"""
-        while self._scan_active:
-            try:
-                # Scan-Status abfragen
-                status_response = self._send_command(GoodixCommand.SCAN_STATUS)
+        finger_present = False
+        try:
+            for status in self._finger_detector.statuses():
+                if not self._scan_active:
+                    break
                 
-                if status_response and len(status_response) > 0:
-                    status = status_response[0]
-                    
-                    if status == GoodixStatus.FINGER_DETECTED.value:
+                if status == GoodixStatus.FINGER_DETECTED.value:
+                    # Nur beim Auflegen melden, nicht bei jeder Status-Abfrage
+                    if not finger_present:
+                        finger_present = True
                         logger.info("👆 Finger erkannt!")
-                        if self.on_finger_detected:
-                            self.on_finger_detected()
-                    
-                    elif status == GoodixStatus.OK.value:
-                        logger.info("✅ Scan abgeschlossen!")
-                        self._scan_complete()
-                        break
-                    
-                    elif status == GoodixStatus.NO_FINGER.value:
-                        logger.debug("⏳ Warte auf Finger...")
+                        self._emit('on_finger_detected')
                 
-                time.sleep(0.1)  # 100ms Polling-Intervall
+                elif status == GoodixStatus.OK.value:
+                    logger.info("✅ Scan abgeschlossen!")
+                    self._scan_complete()
+                    break
                 
-            except Exception as e:
-                logger.error(f"❌ Scan-Monitoring-Fehler: {e}")
-                break
+                elif status == GoodixStatus.NO_FINGER.value:
+                    finger_present = False
+                    logger.debug("⏳ Warte auf Finger...")
+                
+        except Exception as e:
+            logger.error(f"❌ Scan-Monitoring-Fehler: {e}")
+            self._emit('on_error', e)
+    
+    def _emit(self, name: str, *args):
+        """Übergibt ein Event an den Dispatcher, falls ein Callback gesetzt ist"""
+        callback = getattr(self, name)
+        if callback:
+            self.dispatcher.submit(name, callback, *args)
     
     def _scan_complete(self):
         """Behandelt abgeschlossenen Scan"""
         self._scan_active = False
         
         # Versuche Bilddaten zu lesen
-        image_data = self._send_command(GoodixCommand.READ_IMAGE)
+        image_data = self.read_image()
         
-        if image_data and len(image_data) > 1:
+        if image_data is not None and len(image_data) > 1:
             logger.info(f"🖼️ Bilddaten empfangen: {len(image_data)} bytes")
             
+            # Kopie: der Frame-Puffer wird beim nächsten Read überschrieben,
+            # der Konsument läuft aber asynchron
             if self.on_scan_complete:
-                self.on_scan_complete(image_data)
+                self._emit('on_scan_complete', bytes(image_data))
         else:
             logger.warning("⚠️ Keine Bilddaten empfangen")
     
+    def read_image(self, timeout: Optional[int] = None) -> Optional[memoryview]:
+        """
+        Liest einen kompletten Frame (READ_IMAGE) über mehrere Bulk-Pakete
+        
+        Liefert eine schreibgeschützte View auf den Frame-Puffer; sie bleibt
+        bis zum nächsten read_image() gültig (bytes() für eine Kopie).
+        """
+        if not self.is_connected:
+            logger.error("❌ Device nicht verbunden")
+            return None
+        
+        try:
+            return self._frame_reader.read_frame(bytes([GoodixCommand.READ_IMAGE.value]), timeout)
+        except Exception as e:
+            logger.error(f"❌ Bild-Lesefehler: {e}")
+            return None
+    
+    def start_continuous(self, slots: int = 8) -> Optional[FrameRing]:
+        """
+        Startet den kontinuierlichen Modus: READ_IMAGE in Dauerschleife
+        
+        Frames landen direkt in den Slots eines vorab allokierten Rings
+        (frame_ring); Konsumenten lesen per ring.latest() oder
+        ring.next(seq) und bremsen den Sensor nie aus.
+        """
+        if not self.is_initialized:
+            logger.error("❌ Sensor nicht initialisiert")
+            return None
+        if self._scan_active:
+            logger.error("❌ Scan aktiv - erst stop_scan()")
+            return None
+        if self._stream_active:
+            return self.frame_ring
+        
+        if (self.frame_ring is None or self.frame_ring.slots != slots
+                or self.frame_ring.slot_size != self.max_frame_size):
+            self.frame_ring = FrameRing(slots, self.max_frame_size)
+        self._stream_active = True
+        self._stream_thread = threading.Thread(target=self._stream_frames,
+                                               name='goodix-stream', daemon=True)
+        self._stream_thread.start()
+        logger.info(f"🎞️ Kontinuierlicher Modus gestartet ({slots} Slots)")
+        return self.frame_ring
+    
+    def _stream_frames(self):
+        """Liest Frames so schnell, wie der Sensor sie liefert"""
+        ring = self.frame_ring
+        calibration = self.calibration
+        packet = bytes([GoodixCommand.READ_IMAGE.value])
+        errors = 0
+        while self._stream_active:
+            seq, slot = ring.acquire()
+            try:
+                frame = self._frame_reader.read_frame(packet, into=slot)
+            except Exception as e:
+                frame = None
+                logger.debug(f"Frame-Lesefehler: {e}")
+            
+            if frame is not None and len(frame) > 1:
+                ring.commit(seq, len(frame))
+                errors = 0
+                if calibration is not None and seq % OBSERVE_EVERY == 0:
+                    # Drift-Monitor - der Slot wird erst im nächsten Umlauf überschrieben
+                    calibration.observe(frame)
+                continue
+            
+            ring.abort(seq)
+            errors += 1
+            if errors >= STREAM_MAX_ERRORS and self._stream_active:
+                logger.error(f"❌ Kontinuierlicher Modus nach {errors} Lesefehlern beendet")
+                self._stream_active = False
+                self._emit('on_error', TransferError("Frame-Stream abgebrochen"))
+    
+    def stop_continuous(self):
+        """Beendet den kontinuierlichen Modus (der Ring bleibt lesbar)"""
+        self._stream_active = False
+        if self._stream_thread and self._stream_thread.is_alive():
+            self._stream_thread.join(timeout=2.0)
+        self._stream_thread = None
+        if self.frame_ring:
+            logger.info(f"⏹️ Kontinuierlicher Modus gestoppt ({self.frame_ring.produced} Frames, "
+                        f"{self.frame_ring.overruns} Overruns)")
+    
+    def capture(self, min_quality: float = DEFAULT_MIN_QUALITY,
+                timeout: Optional[float] = None,
+                scorer: Optional[Scorer] = None) -> Optional[CaptureResult]:
+        """
+        Qualitätsgesteuerter Capture ohne feste Wartezeiten
+        
+        Schaltet den Sensor scharf, bewertet jeden Frame beim Eintreffen und
+        liefert den ersten mit Qualität >= min_quality - oder nach 'timeout'
+        (Standard: laufende Deadline bzw. DEFAULT_CAPTURE_TIMEOUT) den besten
+        bis dahin (accepted=False). None ohne einen einzigen Frame.
+        """
+        if not self.is_initialized:
+            logger.error("❌ Sensor nicht initialisiert")
+            return None
+        timeout = self._capture_timeout(timeout)
+        
+        scan_response = self._send_command(GoodixCommand.START_SCAN)
+        if not scan_response or scan_response[0] != GoodixStatus.OK.value:
+            logger.error("❌ Scan-Start fehlgeschlagen")
+            return None
+        
+        ring = self.start_continuous()
+        if ring is None:
+            return None
+        try:
+            result = capture_from_ring(ring, QualityGate(min_quality, scorer or self.quality_scorer()),
+                                       timeout)
+        finally:
+            self.stop_continuous()
+        
+        if result is not None and result.accepted:
+            logger.info(f"✅ Frame akzeptiert: Qualität {result.quality:.2f} nach "
+                        f"{result.frames} Frames ({result.elapsed * 1000:.0f} ms)")
+        return result
+    
+    def wait_for_lift(self, timeout: float = 5.0, scorer: Optional[Scorer] = None) -> bool:
+        """Wartet, bis kein Finger mehr aufliegt (z.B. zwischen Enrollment-Scans)"""
+        if not self.is_initialized:
+            return False
+        ring = self.start_continuous()
+        if ring is None:
+            return False
+        try:
+            return wait_for_lift(ring, self._capture_timeout(timeout),
+                                 scorer or self.quality_scorer())
+        finally:
+            self.stop_continuous()
+    
+    def _capture_timeout(self, timeout: Optional[float]) -> float:
+        """Capture-Timeout, begrenzt durch eine laufende Deadline"""
+        timeout = DEFAULT_CAPTURE_TIMEOUT if timeout is None else timeout
+        remaining = self.policy.remaining_ms()
+        if remaining is not None:
+            timeout = min(timeout, max(0.0, remaining / 1000))
+        return timeout
+    
+    def decode_frame(self, data, copy: bool = False, raw: bool = False) -> Optional[np.ndarray]:
+        """
+        Dekodiert einen Roh-Frame in ein 2-D NumPy-Bild (uint8/uint16)
+        
+        Der Kalibrier-Hintergrund wird abgezogen (raw=True: unkorrigiert).
+        Ohne copy eine View auf 'data' bzw. einen internen Puffer - gültig
+        bis zum nächsten Frame. None, wenn das Format unbekannt ist.
+        """
+        fmt = self.frame_format or infer_format(len(data))
+        if fmt is None:
+            logger.warning(f"⚠️ Unbekanntes Frame-Format ({len(data)} bytes)")
+            return None
+        if self._decoder is None or self._decoder.format != fmt:
+            self._decoder = FrameDecoder(fmt)
+            logger.debug(f"🖼️ Frame-Format: {fmt.width}x{fmt.height} {fmt.pixel_format}")
+        image = self._decoder.decode(data)
+        if not raw and self.calibration is not None and self.calibration.format == fmt:
+            image = self.calibration.correct(image)
+        return image.copy() if copy else image
+    
+    def _correct_image(self, image: np.ndarray) -> np.ndarray:
+        calibration = self.calibration
+        if calibration is None or calibration.format.pixels != image.size:
+            return image
+        return calibration.correct(image)
+    
+    def quality_scorer(self) -> FrameScorer:
+        """Bildbasierter Scorer (Block-Kontrast, Kohärenz, Abdeckung) für capture()"""
+        return FrameScorer(self.frame_format, correct=self._correct_image)
+    
+    def assess_frame(self, data) -> Optional[QualityReport]:
+        """Qualitäts-Report eines Roh-Frames inkl. Block-Karte (None bei unbekanntem Format)"""
+        return self.quality_scorer().report(data)
+    
+    def extract_features(self, data) -> Optional[FeatureSet]:
+        """Minutien eines Roh-Frames (kalibriert; None bei unbekanntem Format)"""
+        if self._extractor is None:
+            self._extractor = MinutiaeExtractor()
+        return self._extractor.extract_frame(data, self.frame_format, self._correct_image)
+    
     def stop_scan(self):
         """Stoppt den aktuellen Scan"""
         self._scan_active = False
+        if self._finger_detector:
+            self._finger_detector.stop()
         if self._scan_thread and self._scan_thread.is_alive():
             self._scan_thread.join(timeout=1.0)
         logger.info("⏹️ Scan gestoppt")
     
-    def get_device_info(self) -> Dict[str, any]:
-        """Sammelt umfassende Device-Informationen"""
+    def get_device_info(self, refresh: bool = False) -> Dict[str, any]:
+        """
+        Sammelt umfassende Device-Informationen
+        
+        Status, Device-Info und Firmware kommen aus dem Identity-Cache
+        (gefüllt bei connect(), ungültig nach Hotplug oder Firmware-Wechsel);
+        refresh=True fragt das Device erneut ab.
+        """
         if not self.is_connected:
             return {}
         
+        if refresh or self._identity is None:
+            self._refresh_identity()
+        
         info = {
             'vendor_id': self.vendor_id,
             'product_id': self.product_id,
             'connected': self.is_connected,
             'initialized': self.is_initialized
         }
+        info.update(self._identity or {})
+        if self.calibration is not None:
+            info['calibration'] = self.calibration.snapshot()
+        return info
+    
+    def _load_identity(self):
+        """Übernimmt die gecachte Identität oder fragt sie einmalig ab"""
+        if self.device is None:
+            # Transport ohne Hardware: immer über das Backend abfragen
+            self._identity_key = None
+            self._refresh_identity()
+            return
+        try:
+            self._identity_key = device_key(self.device)
+            self._identity = self.identity_cache.get(self._identity_key,
+                                                     device_fingerprint(self.device))
+        except Exception as e:
+            logger.warning(f"⚠️ Identity-Cache nicht verfügbar: {e}")
+            self._identity_key = None
+            self._identity = None
         
-        # Status abrufen
-        status_response = self._send_command(GoodixCommand.STATUS)
-        if status_response:
-            info['status_raw'] = status_response.hex()
-            if len(status_response) > 0:
-                info['status'] = GoodixStatus(status_response[0]).name
+        if self._identity is not None:
+            logger.debug("⚡ Device-Identität aus Cache")
+        else:
+            self._refresh_identity()
+    
+    def _refresh_identity(self):
+        """Fragt Status, Device-Info und Firmware-Version beim Device ab"""
+        identity = {}
         
-        # Device-Info abrufen
-        device_response = self._send_command(GoodixCommand.DEVICE_INFO)
-        if device_response:
-            info['device_info_raw'] = device_response.hex()
+        # Status, Device-Info und Firmware-Version in einer Pipeline
+        status_response, device_response, version_response = self._send_commands(
+            [GoodixCommand.STATUS, GoodixCommand.DEVICE_INFO, GoodixCommand.FIRMWARE_VERSION])
         
-        # Firmware-Version abrufen
-        version_response = self._send_command(GoodixCommand.FIRMWARE_VERSION)
+        if status_response:
+            identity['status_raw'] = status_response.hex()
+            try:
+                identity['status'] = GoodixStatus(status_response[0]).name
+            except ValueError:
+                pass
+        if device_response:
+            identity['device_info_raw'] = device_response.hex()
         if version_response:
-            info['firmware_raw'] = version_response.hex()
+            identity['firmware_raw'] = version_response.hex()
         
-        return info
+        self._identity = identity
+        # Nur vollständige Antworten cachen - sonst beim nächsten connect erneut
+        if self._identity_key and 'device_info_raw' in identity and 'firmware_raw' in identity:
+            self.identity_cache.put(self._identity_key, device_fingerprint(self.device), identity)
+    
+    def invalidate_identity(self):
+        """Verwirft die gecachte Identität (z.B. nach Hotplug)"""
+        if self._identity_key:
+            self.identity_cache.invalidate(self._identity_key)
+        self._identity = None
     
     def disconnect(self):
         """Trennt die Verbindung sauber"""
         if self._scan_active:
             self.stop_scan()
+        if self._stream_active:
+            self.stop_continuous()
+        
+        if self._engine:
+            self._engine.close()
+            self._engine = None
+            self._frame_reader = None
         
         if self.device:
             try:
-                usb.util.release_interface(self.device, 0)
                 usb.util.dispose_resources(self.device)
                 logger.info("🔌 Verbindung getrennt")
             except:
@@ -385,6 +884,8 @@ class GoodixFingerprintDriver:
         
         self.is_connected = False
         self.is_initialized = False
+        self._identity = None
+        self.calibration = None
 
 def demo_driver():
     """Demo-Anwendung für den Goodix-Treiber"""
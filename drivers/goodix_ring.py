@@ -0,0 +1,171 @@
+"""
+Goodix Frame Ring
+Ringpuffer fester Größe für den kontinuierlichen Capture-Modus
+
+N Frame-Slots werden einmal allokiert und reihum wiederverwendet; der
+Frame-Reader schreibt direkt in den nächsten Slot. Jeder Frame trägt eine
+fortlaufende Sequenznummer. Konsumenten holen den neuesten Frame oder den
+nächsten nach einer Sequenznummer - der Producer wartet nie auf sie. Wer zu
+langsam liest, überspringt überschriebene Frames (gezählt als Overrun).
+
+Frames sind Views auf den Slot: sie bleiben gültig, bis der Producer den
+Slot N Frames später erneut beschreibt. valid() prüft das nach der
+Verarbeitung, copy_into() kopiert konsistent.
+"""
+
+import time
+import threading
+from typing import Optional, NamedTuple, Tuple, Dict
+import logging
+
+from drivers.goodix_frame import DEFAULT_MAX_FRAME_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Frames, aus denen die aktuelle Frame-Rate berechnet wird
+RATE_WINDOW = 32
+
+
+class RingFrame(NamedTuple):
+    seq: int
+    timestamp: float  # perf_counter beim Abschluss des Frames
+    data: memoryview  # schreibgeschützt, gültig solange valid(frame)
+
+
+class FrameRing:
+    """Vorab allokierte Frame-Slots mit Sequenznummern"""
+
+    def __init__(self, slots: int = 8, slot_size: int = DEFAULT_MAX_FRAME_SIZE):
+        if slots < 2:
+            raise ValueError("Ein Ring braucht mindestens 2 Slots")
+        self.slots = slots
+        self.slot_size = slot_size
+        self._buffer = bytearray(slots * slot_size)
+        self._view = memoryview(self._buffer)
+        self._lengths = [0] * slots
+        self._timestamps = [0.0] * slots
+        # Sequenznummer pro Slot; -1 = leer oder wird gerade beschrieben
+        self._seqs = [-1] * slots
+        self._head = 0  # nächste zu schreibende Sequenznummer
+        self._cond = threading.Condition()
+        self.produced = 0
+        self.overruns = 0
+        self.errors = 0
+
+    def _slot(self, seq: int) -> int:
+        return seq % self.slots
+
+    # ------------------------------------------------------------------
+    # Producer
+    # ------------------------------------------------------------------
+
+    def acquire(self) -> Tuple[int, memoryview]:
+        """Reserviert den nächsten Slot; liefert Sequenznummer und beschreibbare View"""
+        with self._cond:
+            seq = self._head
+            index = self._slot(seq)
+            # Der älteste Frame wird jetzt überschrieben
+            self._seqs[index] = -1
+        start = index * self.slot_size
+        return seq, self._view[start:start + self.slot_size]
+
+    def commit(self, seq: int, length: int, timestamp: Optional[float] = None):
+        """Veröffentlicht den Frame im reservierten Slot"""
+        index = self._slot(seq)
+        with self._cond:
+            self._lengths[index] = length
+            self._timestamps[index] = time.perf_counter() if timestamp is None else timestamp
+            self._seqs[index] = seq
+            self._head = seq + 1
+            self.produced += 1
+            self._cond.notify_all()
+
+    def abort(self, seq: int):
+        """Verwirft einen reservierten Slot ohne Frame (Lesefehler)"""
+        with self._cond:
+            self.errors += 1
+
+    # ------------------------------------------------------------------
+    # Konsumenten
+    # ------------------------------------------------------------------
+
+    @property
+    def latest_seq(self) -> int:
+        """Sequenznummer des neuesten Frames (-1 = noch keiner)"""
+        return self._head - 1
+
+    def get(self, seq: int) -> Optional[RingFrame]:
+        """Frame mit dieser Sequenznummer, falls er noch im Ring liegt"""
+        with self._cond:
+            return self._get(seq)
+
+    def _get(self, seq: int) -> Optional[RingFrame]:
+        if seq < 0:
+            return None
+        index = self._slot(seq)
+        if self._seqs[index] != seq:
+            return None
+        start = index * self.slot_size
+        return RingFrame(seq, self._timestamps[index],
+                         self._view[start:start + self._lengths[index]].toreadonly())
+
+    def latest(self) -> Optional[RingFrame]:
+        with self._cond:
+            return self._get(self._head - 1)
+
+    def next(self, after_seq: int = -1, timeout: Optional[float] = None) -> Optional[RingFrame]:
+        """
+        Nächster Frame nach 'after_seq' (wartet bis zu 'timeout')
+
+        Sind die Frames dazwischen schon überschrieben, wird der älteste noch
+        vorhandene geliefert und die Lücke als Overrun gezählt.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._head - 1 > after_seq, timeout):
+                return None
+            wanted = after_seq + 1
+            while wanted < self._head:
+                frame = self._get(wanted)
+                if frame is not None:
+                    break
+                wanted += 1
+            else:
+                return None
+            if wanted > after_seq + 1:
+                self.overruns += wanted - after_seq - 1
+            return frame
+
+    def valid(self, frame: RingFrame) -> bool:
+        """True, solange der Slot des Frames nicht überschrieben wurde"""
+        return self._seqs[self._slot(frame.seq)] == frame.seq
+
+    def copy_into(self, frame: RingFrame, out: memoryview) -> Optional[int]:
+        """Kopiert einen Frame; None, falls er währenddessen überschrieben wurde"""
+        length = len(frame.data)
+        out[:length] = frame.data
+        return length if self.valid(frame) else None
+
+    # ------------------------------------------------------------------
+    # Statistik
+    # ------------------------------------------------------------------
+
+    def frame_rate(self) -> Optional[float]:
+        """Frames pro Sekunde über die letzten RATE_WINDOW Frames"""
+        with self._cond:
+            newest = self._get(self._head - 1)
+            oldest_seq = max(0, self._head - min(RATE_WINDOW, self.slots - 1))
+            oldest = self._get(oldest_seq)
+            if newest is None or oldest is None or newest.seq == oldest.seq:
+                return None
+            return (newest.seq - oldest.seq) / (newest.timestamp - oldest.timestamp)
+
+    def snapshot(self) -> Dict[str, object]:
+        return {
+            'slots': self.slots,
+            'slot_size': self.slot_size,
+            'latest_seq': self.latest_seq,
+            'produced': self.produced,
+            'overruns': self.overruns,
+            'errors': self.errors,
+            'fps': self.frame_rate(),
+        }
@@ -0,0 +1,670 @@
+"""
+Goodix Sensor Simulator
+Ausführbares Device-Modell für Lasttests des kompletten Stacks ohne Hardware
+
+Der Simulator implementiert die Transfer-Backend-Schnittstelle
+(submit_write/submit_read/...) und wird wie Record/Replay als Transport in
+den Treiber eingehängt - Treiber, Login-Manager, Daemon und Diagnose laufen
+unverändert. Modelliert werden:
+
+    - die Zustandsmaschine POWER_ON → INITIALIZE → START_SCAN → SCAN_STATUS
+      (NO_FINGER → FINGER_DETECTED → OK) → READ_IMAGE
+    - Latenz und Jitter pro Kommando; das Device arbeitet seriell, Antworten
+      kommen in Kommando-Reihenfolge
+    - Multi-Paket-Frames mit USB-Semantik (Short Packet bzw. ZLP beendet
+      einen Transfer) und synthetischen Fingerabdruck-Bildern (Rillenmuster
+      mit Minutien, Fixed-Pattern-Hintergrund, Rauschen, Versatz pro Auflage)
+    - Fehlerinjektion: verlorene Antworten, Endpoint-Stalls und Resets
+
+Die Antworten auf Abfragen stammen aus
+GoodixProtocolKnowledgeBase.create_protocol_simulator().
+
+Aktivierung über die Umgebung:
+    GOODIX_SIMULATOR=1                          Simulator statt Hardware
+    GOODIX_SIMULATOR_SEED=42                    reproduzierbare Läufe
+    GOODIX_SIMULATOR_FAULTS=timeout=0.05,stall=0.01,reset=0.001
+    GOODIX_SIMULATOR_FINGER_DELAY_MS=300        Auflegen nach START_SCAN (-1 = nie)
+    GOODIX_SIMULATOR_INTERRUPT=1                Status-Events über Interrupt-Endpoint
+"""
+
+import os
+import time
+import heapq
+import random
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Deque, List, NamedTuple, Callable
+import logging
+
+import numpy as np
+
+from analysis.protocol_knowledge_base import GoodixProtocolKnowledgeBase
+from drivers.goodix_transfer import PendingTransfer, TransferError
+from drivers.goodix_image import FrameFormat, PIXEL_GRAY8, PIXEL_GRAY16, PIXEL_PACKED12
+
+logger = logging.getLogger(__name__)
+
+# Kommandos und Status-Codes (siehe GoodixCommand/GoodixStatus im Treiber)
+CMD_INITIALIZE = 0x10
+CMD_START_SCAN = 0x20
+CMD_SCAN_STATUS = 0x21
+CMD_READ_IMAGE = 0x30
+CMD_RESET = 0x80
+
+STATUS_OK = 0x00
+STATUS_ERROR = 0x01
+STATUS_NOT_READY = 0x03
+STATUS_NO_FINGER = 0x05
+STATUS_FINGER_DETECTED = 0x06
+
+# Zustände der Zustandsmaschine
+STATE_POWER_ON = 'power_on'
+STATE_READY = 'ready'
+STATE_SCANNING = 'scanning'
+STATE_IMAGE_READY = 'image_ready'
+
+# Verarbeitungszeit pro Kommando (ms) vor der Antwort
+DEFAULT_LATENCY_MS = {
+    0x01: 1.0,           # STATUS
+    0x02: 1.2,           # DEVICE_INFO
+    0x03: 1.0,           # FIRMWARE_VERSION
+    0x40: 1.0,           # CONFIG_QUERY
+    0xFF: 0.5,           # ECHO
+    CMD_INITIALIZE: 25.0,
+    CMD_START_SCAN: 5.0,
+    CMD_SCAN_STATUS: 1.0,
+    CMD_READ_IMAGE: 8.0,  # Integrationszeit des Sensors
+    CMD_RESET: 50.0,
+}
+
+FAULT_KINDS = ('timeout', 'stall', 'reset')
+
+
+class FaultProfile(NamedTuple):
+    """Wahrscheinlichkeit pro Kommando für jede Fehlerart"""
+    timeout: float = 0.0  # Kommando wird ausgeführt, Antwort geht verloren
+    stall: float = 0.0    # OUT-Endpoint stallt, Kommando wird nicht ausgeführt
+    reset: float = 0.0    # Device resettet: Zustand und ausstehende Transfers verloren
+
+    @classmethod
+    def parse(cls, spec: str) -> 'FaultProfile':
+        """'timeout=0.05,stall=0.01' → FaultProfile"""
+        rates = {}
+        for part in filter(None, (p.strip() for p in spec.split(','))):
+            kind, _, rate = part.partition('=')
+            if kind not in FAULT_KINDS:
+                raise ValueError(f"Unbekannte Fehlerart: {kind}")
+            rates[kind] = float(rate)
+        return cls(**rates)
+
+
+@dataclass
+class SimulatorConfig:
+    """Parameter des simulierten Sensors"""
+    width: int = 108
+    height: int = 88
+    pixel_format: str = PIXEL_GRAY8
+    packet_size: int = 512
+    endpoint_out: int = 0x01
+    endpoint_in: int = 0x82
+    interrupt_endpoint: Optional[int] = None
+    latency_ms: Dict[int, float] = field(default_factory=lambda: dict(DEFAULT_LATENCY_MS))
+    default_latency_ms: float = 1.0
+    jitter_ms: float = 0.3
+    packet_interval_ms: float = 0.05
+    finger: int = 0                         # Identität des aufgelegten Fingers
+    finger_delay_ms: Optional[float] = 300  # None = Finger wird nie aufgelegt
+    capture_ms: float = 150                 # vom Auflegen bis Scan abgeschlossen
+    contact_ms: float = 1500                # Auflagedauer
+    faults: FaultProfile = FaultProfile()
+    seed: int = 0
+
+
+class FingerprintSynthesizer:
+    """
+    Erzeugt Sensor-Frames: Fixed-Pattern-Hintergrund plus optional ein Finger
+
+    Das Rillenmuster eines Fingers ist ein Phasenfeld um einen Kern; jede
+    Minutie ist eine Phasensingularität (atan2-Term), an der eine Rille endet
+    oder sich gabelt. Pro Auflage variieren Versatz, Drehung, Anpressdruck
+    und Kontaktfläche - wie bei echten Captures desselben Fingers.
+    """
+
+    def __init__(self, width: int, height: int, seed: int = 0):
+        self.width = width
+        self.height = height
+        self.seed = seed
+        yy, xx = np.mgrid[0:height, 0:width]
+        self._xx = xx.astype(np.float32)
+        self._yy = yy.astype(np.float32)
+
+        rng = np.random.default_rng(seed)
+        # Hintergrund: Gradient, Spaltenoffsets und Pixel-Offsets pro Device
+        gradient = 12 * (self._xx / width) - 8 * (self._yy / height)
+        columns = rng.normal(0, 4, width).astype(np.float32)
+        pixels = rng.normal(0, 2, (height, width)).astype(np.float32)
+        self.background = (190 + gradient + columns[np.newaxis, :] + pixels).astype(np.float32)
+        self._fingers: Dict[int, dict] = {}
+
+    def _finger(self, finger: int) -> dict:
+        params = self._fingers.get(finger)
+        if params is None:
+            rng = np.random.default_rng((self.seed, finger))
+            count = int(rng.integers(20, 36))
+            params = {
+                'period': float(rng.uniform(7.0, 9.5)),
+                'aspect': float(rng.uniform(0.7, 1.0)),
+                'warp': float(rng.uniform(1.0, 3.0)),
+                'warp_phase': float(rng.uniform(0, 2 * np.pi)),
+                # Minutien relativ zum Kern, Vorzeichen = Ende/Gabelung
+                'minutiae': np.stack([rng.uniform(-0.45, 0.45, count) * self.width,
+                                      rng.uniform(-0.45, 0.45, count) * self.height,
+                                      rng.choice([-1.0, 1.0], count)], axis=1),
+            }
+            self._fingers[finger] = params
+        return params
+
+    def render(self, finger: Optional[int], rng: np.random.Generator) -> np.ndarray:
+        """Frame als float32 (0..255); finger=None liefert einen leeren Sensor"""
+        frame = self.background + rng.normal(0, 3, self.background.shape).astype(np.float32)
+        if finger is None:
+            return frame
+
+        params = self._finger(finger)
+        dx, dy = rng.uniform(-5, 5, 2)
+        theta = np.radians(rng.uniform(-10, 10))
+        cx = self.width / 2 + dx
+        cy = self.height / 2 + dy
+        u = np.cos(theta) * (self._xx - cx) + np.sin(theta) * (self._yy - cy)
+        v = -np.sin(theta) * (self._xx - cx) + np.cos(theta) * (self._yy - cy)
+
+        angle = np.arctan2(v, u)
+        phase = (2 * np.pi / params['period']) * np.hypot(u, params['aspect'] * v)
+        phase += params['warp'] * np.sin(2 * angle + params['warp_phase'])
+        for mx, my, sign in params['minutiae']:
+            phase += sign * np.arctan2(v - my, u - mx)
+        ridges = np.cos(phase)
+
+        # Kontaktfläche: Ellipse mit weichem Rand, Anpressdruck skaliert den Kontrast
+        ax = self.width * rng.uniform(0.42, 0.55)
+        ay = self.height * rng.uniform(0.5, 0.65)
+        radius = np.hypot((self._xx - cx) / ax, (self._yy - cy) / ay)
+        contact = np.clip((1.0 - radius) / 0.15, 0.0, 1.0)
+        pressure = rng.uniform(0.7, 1.0)
+        frame -= contact * pressure * (70 + 50 * ridges)
+        return frame
+
+    def encode(self, frame: np.ndarray, pixel_format: str) -> bytes:
+        """Quantisiert einen Frame in das Pixel-Format der Nutzdaten"""
+        if pixel_format == PIXEL_GRAY8:
+            return np.clip(frame, 0, 255).astype(np.uint8).tobytes()
+        if pixel_format == PIXEL_GRAY16:
+            return (np.clip(frame, 0, 255) * 256).astype('<u2').tobytes()
+        if pixel_format == PIXEL_PACKED12:
+            pixels = (np.clip(frame, 0, 255) * 16).astype(np.uint16).ravel()
+            if len(pixels) % 2:
+                pixels = np.append(pixels, np.uint16(0))
+            p0, p1 = pixels[0::2], pixels[1::2]
+            packed = np.empty((len(p0), 3), dtype=np.uint8)
+            packed[:, 0] = p0 & 0xFF
+            packed[:, 1] = (p0 >> 8) | ((p1 & 0x0F) << 4)
+            packed[:, 2] = p1 >> 4
+            return packed.tobytes()
+        raise ValueError(f"Unbekanntes Pixel-Format: {pixel_format}")
+
+
+class _Scheduler:
+    """Ein Thread, der fällige Device-Aktionen in Zeitreihenfolge ausführt"""
+
+    def __init__(self):
+        self._queue: List[list] = []
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='goodix-simulator', daemon=True)
+        self._thread.start()
+
+    def call_at(self, due: float, callback: Callable[[], None]) -> list:
+        with self._cond:
+            self._seq += 1
+            entry = [due, self._seq, callback]
+            heapq.heappush(self._queue, entry)
+            self._cond.notify()
+            return entry
+
+    @staticmethod
+    def cancel(entry: list):
+        entry[2] = None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running:
+                    if not self._queue:
+                        self._cond.wait()
+                        continue
+                    delay = self._queue[0][0] - time.perf_counter()
+                    if delay > 0:
+                        self._cond.wait(delay)
+                        continue
+                    break
+                if not self._running:
+                    return
+                callback = heapq.heappop(self._queue)[2]
+            if callback is not None:
+                try:
+                    callback()
+                except Exception as e:
+                    logger.error(f"❌ Simulator-Fehler: {e}")
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        self._thread.join(timeout=1.0)
+
+
+class _PendingRead:
+    __slots__ = ('pending', 'view', 'copy', 'offset', 'timer')
+
+    def __init__(self, pending: PendingTransfer, view: memoryview, copy: bool):
+        self.pending = pending
+        self.view = view
+        self.copy = copy
+        self.offset = 0
+        self.timer: Optional[list] = None
+
+
+class GoodixSimulatedDevice:
+    """
+    Simulierter Goodix-Sensor
+
+    Überlebt Reconnects wie echte Hardware: der Zustand (z.B. initialisiert)
+    bleibt erhalten, bis ein RESET oder ein injizierter Reset ihn verwirft.
+    """
+
+    def __init__(self, config: Optional[SimulatorConfig] = None):
+        self.config = config or SimulatorConfig()
+        self.state = STATE_POWER_ON
+        self.counters: Dict[str, int] = {'commands': 0, 'frames': 0, 'timeout': 0,
+                                         'stall': 0, 'reset': 0}
+        self._rng = random.Random(self.config.seed)
+        self._frame_rng = np.random.default_rng(self.config.seed)
+        self._synth = FingerprintSynthesizer(self.config.width, self.config.height,
+                                             self.config.seed)
+        self._responses = {int(command, 16): response for command, response in
+                           GoodixProtocolKnowledgeBase().create_protocol_simulator().items()}
+        self._lock = threading.RLock()
+        self._scheduler = _Scheduler()
+        self._busy_until = 0.0
+        self._packets: Dict[int, Deque[bytes]] = {}
+        self._reads: Dict[int, Deque[_PendingRead]] = {}
+        self._injected: Deque[str] = deque()
+        # Fingerauflage als Zeitfenster (perf_counter)
+        self._finger: Optional[int] = None
+        self._finger_down = float('inf')
+        self._finger_up = float('inf')
+        self._capture_done = float('inf')
+        self._events: List[list] = []
+
+    # ------------------------------------------------------------------
+    # Steuerung für Tests und Lastläufe
+    # ------------------------------------------------------------------
+
+    def inject(self, fault: str):
+        """Erzwingt einen Fehler beim nächsten Kommando"""
+        if fault not in FAULT_KINDS:
+            raise ValueError(f"Unbekannte Fehlerart: {fault}")
+        with self._lock:
+            self._injected.append(fault)
+
+    def place_finger(self, finger: Optional[int] = None, delay_ms: float = 0):
+        """Legt einen Finger auf (nach delay_ms) - auch außerhalb eines Scans"""
+        with self._lock:
+            self._place_finger(time.perf_counter() + delay_ms / 1000,
+                               self.config.finger if finger is None else finger)
+
+    def lift_finger(self):
+        with self._lock:
+            self._finger_up = min(self._finger_up, time.perf_counter())
+
+    def close(self):
+        self._scheduler.stop()
+
+    # ------------------------------------------------------------------
+    # Transfer-Schnittstelle (von SimulatorBackend genutzt)
+    # ------------------------------------------------------------------
+
+    def submit_write(self, endpoint: int, data: bytes) -> PendingTransfer:
+        pending = PendingTransfer(endpoint)
+        if not data:
+            pending._complete('completed', 0)
+            return pending
+
+        with self._lock:
+            self.counters['commands'] += 1
+            fault = self._next_fault()
+            if fault == 'stall':
+                self.counters['stall'] += 1
+                pending._complete('error', error=TransferError("Endpoint-Stall (simuliert)"))
+                return pending
+            if fault == 'reset':
+                self.counters['reset'] += 1
+                pending._complete('completed', len(data))
+                self._scheduler.call_at(time.perf_counter(), self._reset_fault)
+                return pending
+
+            # Serielle Verarbeitung: ein Kommando beginnt, wenn das vorige fertig ist
+            command = data[0]
+            now = time.perf_counter()
+            start = max(now, self._busy_until)
+            self._busy_until = start + self._latency(command)
+            drop = fault == 'timeout'
+            if drop:
+                self.counters['timeout'] += 1
+            self._scheduler.call_at(self._busy_until,
+                                    lambda: self._execute(command, bytes(data[1:]), drop))
+
+        pending._complete('completed', len(data))
+        return pending
+
+    def submit_read(self, endpoint: int, view: memoryview, timeout_ms: int,
+                    copy: bool = False) -> PendingTransfer:
+        """Liest in 'view'; copy=True liefert die Daten zusätzlich als bytes"""
+        pending = PendingTransfer(endpoint)
+        read = _PendingRead(pending, view, copy)
+
+        def cancel():
+            with self._lock:
+                if self._discard(endpoint, read):
+                    self._finish(read, 'cancelled')
+
+        def expire():
+            with self._lock:
+                if self._discard(endpoint, read):
+                    self._finish(read, 'timeout')
+
+        pending._cancel = cancel
+        with self._lock:
+            self._reads.setdefault(endpoint, deque()).append(read)
+            read.timer = self._scheduler.call_at(time.perf_counter() + timeout_ms / 1000, expire)
+            self._pump(endpoint)
+        return pending
+
+    def cancel_all(self):
+        with self._lock:
+            reads = [read for queue in self._reads.values() for read in queue]
+        for read in reads:
+            read.pending.cancel()
+
+    # ------------------------------------------------------------------
+    # Device-Verhalten
+    # ------------------------------------------------------------------
+
+    def _next_fault(self) -> Optional[str]:
+        if self._injected:
+            return self._injected.popleft()
+        faults = self.config.faults
+        roll = self._rng.random()
+        for kind in FAULT_KINDS:
+            rate = getattr(faults, kind)
+            if roll < rate:
+                return kind
+            roll -= rate
+        return None
+
+    def _latency(self, command: int) -> float:
+        config = self.config
+        latency = config.latency_ms.get(command, config.default_latency_ms)
+        latency += self._rng.uniform(-config.jitter_ms, config.jitter_ms)
+        return max(0.0, latency) / 1000
+
+    def _execute(self, command: int, data: bytes, drop: bool):
+        """Führt ein Kommando aus (Scheduler-Thread) und stellt die Antwort bereit"""
+        with self._lock:
+            now = time.perf_counter()
+            self._advance(now)
+
+            if command == CMD_READ_IMAGE:
+                payload = self._read_image(now)
+                if payload is None:
+                    response = [bytes([STATUS_NOT_READY])]
+                else:
+                    response = self._packetize(payload)
+            else:
+                response = [self._respond(command, now)]
+
+            if drop:
+                return
+            endpoint = self.config.endpoint_in
+            interval = self.config.packet_interval_ms / 1000
+            self._packets.setdefault(endpoint, deque()).append(response[0])
+            self._pump(endpoint)
+            for index, packet in enumerate(response[1:], 1):
+                self._scheduler.call_at(now + index * interval,
+                                        lambda packet=packet: self._deliver(endpoint, packet))
+
+    def _respond(self, command: int, now: float) -> bytes:
+        if command in self._responses:
+            return self._responses[command]
+        if command == CMD_INITIALIZE:
+            self.state = STATE_READY
+            return bytes([STATUS_OK])
+        if command == CMD_RESET:
+            self._power_on()
+            return bytes([STATUS_OK])
+        if command == CMD_START_SCAN:
+            if self.state == STATE_POWER_ON:
+                return bytes([STATUS_NOT_READY])
+            self._start_scan(now)
+            return bytes([STATUS_OK])
+        if command == CMD_SCAN_STATUS:
+            return bytes([self._scan_status(now)])
+        return bytes([STATUS_ERROR])
+
+    def _start_scan(self, now: float):
+        self.state = STATE_SCANNING
+        self._capture_done = float('inf')
+        finger_on = self._finger is not None and self._finger_down <= now < self._finger_up
+        if finger_on:
+            self._capture_done = now + self.config.capture_ms / 1000
+        elif self.config.finger_delay_ms is not None:
+            self._place_finger(now + self.config.finger_delay_ms / 1000, self.config.finger)
+        self._schedule_events()
+
+    def _place_finger(self, down: float, finger: int):
+        self._finger = finger
+        self._finger_down = down
+        self._finger_up = down + self.config.contact_ms / 1000
+        if self.state == STATE_SCANNING:
+            self._capture_done = down + self.config.capture_ms / 1000
+            self._schedule_events()
+
+    def _schedule_events(self):
+        """Meldet Finger und Scan-Ende über den Interrupt-Endpoint"""
+        endpoint = self.config.interrupt_endpoint
+        if endpoint is None or self.state != STATE_SCANNING:
+            return
+        for entry in self._events:
+            self._scheduler.cancel(entry)
+        self._events = [
+            self._scheduler.call_at(self._finger_down,
+                                    lambda: self._deliver(endpoint, bytes([STATUS_FINGER_DETECTED]))),
+            self._scheduler.call_at(self._capture_done, self._scan_event),
+        ]
+
+    def _scan_event(self):
+        with self._lock:
+            self._advance(time.perf_counter())
+            if self.state == STATE_IMAGE_READY:
+                self._deliver(self.config.interrupt_endpoint, bytes([STATUS_OK]))
+
+    def _advance(self, now: float):
+        if self.state == STATE_SCANNING and now >= self._capture_done:
+            self.state = STATE_IMAGE_READY
+
+    def _scan_status(self, now: float) -> int:
+        if self.state == STATE_POWER_ON:
+            return STATUS_NOT_READY
+        if self.state == STATE_SCANNING:
+            return STATUS_FINGER_DETECTED if now >= self._finger_down else STATUS_NO_FINGER
+        return STATUS_OK
+
+    def _read_image(self, now: float) -> Optional[bytes]:
+        if self.state == STATE_POWER_ON:
+            return None
+        finger = self._finger if self._finger_down <= now < self._finger_up else None
+        if self.state == STATE_IMAGE_READY:
+            self.state = STATE_READY
+        self.counters['frames'] += 1
+        frame = self._synth.render(finger, self._frame_rng)
+        return self._synth.encode(frame, self.config.pixel_format)
+
+    def _packetize(self, payload: bytes) -> List[bytes]:
+        size = self.config.packet_size
+        packets = [payload[i:i + size] for i in range(0, len(payload), size)]
+        if len(payload) % size == 0:
+            # Zero-Length-Packet beendet einen Transfer aus vollen Paketen
+            packets.append(b'')
+        return packets
+
+    def _power_on(self):
+        self.state = STATE_POWER_ON
+        self._finger = None
+        self._finger_down = self._finger_up = self._capture_done = float('inf')
+        for entry in self._events:
+            self._scheduler.cancel(entry)
+        self._events = []
+
+    def _reset_fault(self):
+        """Injizierter Reset: Zustand, gepufferte Antworten und Transfers verloren"""
+        with self._lock:
+            logger.debug("💥 Simulierter Device-Reset")
+            self._power_on()
+            self._busy_until = 0.0
+            self._packets.clear()
+            reads = [read for queue in self._reads.values() for read in queue]
+            self._reads.clear()
+            for read in reads:
+                self._finish(read, 'error', TransferError("Device-Reset (simuliert)"))
+
+    # ------------------------------------------------------------------
+    # USB-Semantik der IN-Transfers
+    # ------------------------------------------------------------------
+
+    def _deliver(self, endpoint: int, packet: bytes):
+        with self._lock:
+            self._packets.setdefault(endpoint, deque()).append(packet)
+            self._pump(endpoint)
+
+    def _pump(self, endpoint: int):
+        """Ordnet Pakete den ausstehenden Reads zu; Short Packet beendet einen Transfer"""
+        packets = self._packets.get(endpoint)
+        reads = self._reads.get(endpoint)
+        while packets and reads:
+            read = reads[0]
+            packet = packets.popleft()
+            count = min(len(packet), len(read.view) - read.offset)
+            read.view[read.offset:read.offset + count] = packet[:count]
+            read.offset += count
+            if len(packet) < self.config.packet_size or read.offset >= len(read.view):
+                reads.popleft()
+                self._finish(read, 'completed')
+
+    def _discard(self, endpoint: int, read: _PendingRead) -> bool:
+        reads = self._reads.get(endpoint)
+        if not reads or read not in reads:
+            return False
+        reads.remove(read)
+        return True
+
+    def _finish(self, read: _PendingRead, status: str, error: Optional[Exception] = None):
+        if read.timer is not None:
+            self._scheduler.cancel(read.timer)
+        data = bytes(read.view[:read.offset]) if read.copy else None
+        read.pending._complete(status, read.offset, data, error)
+
+
+class SimulatorBackend:
+    """Transfer-Backend einer Verbindung zum simulierten Device"""
+
+    name = 'simulator'
+    asynchronous = True
+
+    def __init__(self, device: GoodixSimulatedDevice):
+        self.device = device
+
+    def submit_write(self, endpoint: int, data: bytes, timeout_ms: int) -> PendingTransfer:
+        return self.device.submit_write(endpoint, data)
+
+    def submit_read(self, endpoint: int, length: int, timeout_ms: int) -> PendingTransfer:
+        # Wie libusb1: Daten als bytes der tatsächlichen Länge
+        return self.device.submit_read(endpoint, memoryview(bytearray(length)), timeout_ms,
+                                       copy=True)
+
+    def submit_interrupt_read(self, endpoint: int, length: int, timeout_ms: int) -> PendingTransfer:
+        return self.submit_read(endpoint, length, timeout_ms)
+
+    def submit_read_into(self, endpoint: int, view: memoryview, timeout_ms: int) -> PendingTransfer:
+        return self.device.submit_read(endpoint, view, timeout_ms)
+
+    def cancel_all(self):
+        self.device.cancel_all()
+
+    def close(self):
+        self.device.cancel_all()
+
+
+class SimulatorTransport:
+    """Keine Hardware: jede Verbindung geht an dasselbe simulierte Device"""
+
+    needs_device = False
+
+    def __init__(self, config: Optional[SimulatorConfig] = None):
+        self.config = config or SimulatorConfig()
+        self.device = GoodixSimulatedDevice(self.config)
+
+    @property
+    def calibration_key(self) -> str:
+        """Der Fixed-Pattern-Hintergrund hängt nur vom Seed ab"""
+        return f"simulator-{self.config.seed}"
+
+    def open(self, driver) -> SimulatorBackend:
+        config = self.config
+        driver.endpoint_out_addr = config.endpoint_out
+        driver.endpoint_in_addr = config.endpoint_in
+        driver.endpoint_intr_addr = config.interrupt_endpoint
+        driver.endpoint_in_max_packet = config.packet_size
+        driver.frame_format = FrameFormat(config.width, config.height, config.pixel_format)
+        logger.info(f"🧪 Simulierter Sensor ({config.width}x{config.height} {config.pixel_format}, "
+                    f"Seed {config.seed})")
+        return SimulatorBackend(self.device)
+
+
+_shared_transport: Optional[SimulatorTransport] = None
+_shared_lock = threading.Lock()
+
+
+def shared_transport() -> SimulatorTransport:
+    """Ein simulierter Sensor pro Prozess - wie die echte Hardware"""
+    global _shared_transport
+    with _shared_lock:
+        if _shared_transport is None:
+            _shared_transport = SimulatorTransport(config_from_env())
+        return _shared_transport
+
+
+def config_from_env() -> SimulatorConfig:
+    """SimulatorConfig aus den GOODIX_SIMULATOR_*-Variablen"""
+    config = SimulatorConfig()
+    if os.environ.get('GOODIX_SIMULATOR_SEED'):
+        config.seed = int(os.environ['GOODIX_SIMULATOR_SEED'])
+    if os.environ.get('GOODIX_SIMULATOR_FAULTS'):
+        config.faults = FaultProfile.parse(os.environ['GOODIX_SIMULATOR_FAULTS'])
+    if os.environ.get('GOODIX_SIMULATOR_FINGER_DELAY_MS'):
+        delay = float(os.environ['GOODIX_SIMULATOR_FINGER_DELAY_MS'])
+        config.finger_delay_ms = None if delay < 0 else delay
+    if os.environ.get('GOODIX_SIMULATOR_INTERRUPT') == '1':
+        config.interrupt_endpoint = 0x83
+    return config
@@ -0,0 +1,692 @@
+"""
+Goodix USB Transfer Engine
+Ereignisgesteuerte Bulk-Transfers für den Goodix-Sensor (27C6:55A2)
+
+Asynchrone libusb1-Submissions mit Completion-Callbacks; ein Kommando kehrt
+zurück, sobald der IN-Transfer abgeschlossen ist - ohne feste Sleeps im
+Hot-Path. Ohne python-libusb1 wird auf synchrone pyusb-Transfers
+zurückgefallen (Abschluss = Rückkehr von write()/read()).
+"""
+
+import time
+import array
+import threading
+from collections import deque, OrderedDict
+from typing import Optional, Dict, Callable, List, Sequence, Tuple, Union
+import logging
+
+import usb.core
+import usb.util
+
+from drivers.goodix_policy import TransferPolicy, CommandPlan
+
+try:
+    import usb1
+except ImportError:  # python-libusb1 ist optional
+    usb1 = None
+
+logger = logging.getLogger(__name__)
+
+# Bulk-Endpoints laut Descriptor-Analyse (512 bytes max packet size)
+DEFAULT_ENDPOINT_OUT = 0x01
+DEFAULT_ENDPOINT_IN = 0x82
+DEFAULT_PACKET_SIZE = 512
+
+# Anzahl gespeicherter Round-Trip-Samples pro Kommando
+STATS_WINDOW = 256
+
+# Zwischenpuffer des pyusb-Backends (eine Transfer-Länge pro Puffer)
+SCRATCH_BUFFERS = 4
+
+
+class TransferError(Exception):
+    """Fehler beim Einreichen oder Abschließen eines USB-Transfers"""
+
+
+class PendingTransfer:
+    """
+    Ein eingereichter USB-Transfer
+
+    Der Abschluss wird vom Backend per Callback gemeldet; Wartende blockieren
+    auf einem Event statt zu pollen.
+    """
+
+    def __init__(self, endpoint: int):
+        self.endpoint = endpoint
+        self.status: Optional[str] = None  # completed | timeout | cancelled | error
+        self.actual_length = 0
+        self.data: Optional[bytes] = None
+        self.error: Optional[Exception] = None
+        self.submitted_at = time.perf_counter()
+        self.completed_at: Optional[float] = None
+        self._done = threading.Event()
+        self._callbacks: List[Callable[['PendingTransfer'], None]] = []
+        self._lock = threading.Lock()
+        self._cancel: Optional[Callable[[], None]] = None
+        self._transfer = None  # Referenz auf das Backend-Objekt halten
+        self._copy_data = True
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    @property
+    def ok(self) -> bool:
+        return self.status == 'completed'
+
+    @property
+    def has_data(self) -> bool:
+        """Daten empfangen - auch ein Timeout kann Teildaten liefern"""
+        return self.status in ('completed', 'timeout') and self.actual_length > 0
+
+    @property
+    def elapsed(self) -> Optional[float]:
+        """Dauer vom Submit bis zum Abschluss in Sekunden"""
+        if self.completed_at is None:
+            return None
+        return self.completed_at - self.submitted_at
+
+    def _complete(self, status: str, actual_length: int = 0,
+                  data: Optional[bytes] = None, error: Optional[Exception] = None):
+        with self._lock:
+            if self._done.is_set():
+                return
+            self.status = status
+            self.actual_length = actual_length
+            self.data = data
+            self.error = error
+            self.completed_at = time.perf_counter()
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+
+        for callback in callbacks:
+            try:
+                callback(self)
+            except Exception as e:
+                logger.error(f"❌ Transfer-Callback-Fehler: {e}")
+
+    def add_done_callback(self, callback: Callable[['PendingTransfer'], None]):
+        """Registriert einen Callback für den Abschluss (sofort, falls schon fertig)"""
+        with self._lock:
+            if not self._done.is_set():
+                self._callbacks.append(callback)
+                return
+        callback(self)
+
+    def wait(self, deadline: Optional[float] = None) -> bool:
+        """Wartet bis zum Abschluss oder bis zur Deadline (perf_counter-Zeit)"""
+        if deadline is None:
+            return self._done.wait()
+        return self._done.wait(max(0.0, deadline - time.perf_counter()))
+
+    def cancel(self):
+        """Bricht den Transfer ab, falls er noch aussteht"""
+        if self._done.is_set():
+            return
+        if self._cancel is not None:
+            try:
+                self._cancel()
+                return
+            except Exception as e:
+                logger.debug(f"Transfer-Abbruch fehlgeschlagen: {e}")
+        self._complete('cancelled')
+
+
+class PyusbTransferBackend:
+    """
+    Synchrone Transfers über pyusb
+
+    Es gibt keine echten Submissions: write()/read() blockieren, bis der
+    Transfer abgeschlossen ist, und liefern dann einen fertigen
+    PendingTransfer zurück.
+    """
+
+    name = 'pyusb'
+    asynchronous = False
+
+    def __init__(self, device: usb.core.Device, interface: int = 0):
+        self.device = device
+        self.interface = interface
+        self._scratch: 'OrderedDict[int, array.array]' = OrderedDict()
+
+    def submit_write(self, endpoint: int, data: bytes, timeout_ms: int) -> PendingTransfer:
+        pending = PendingTransfer(endpoint)
+        try:
+            written = self.device.write(endpoint, data, timeout_ms)
+            pending._complete('completed', written)
+        except usb.core.USBTimeoutError as e:
+            pending._complete('timeout', error=e)
+        except usb.core.USBError as e:
+            pending._complete('error', error=e)
+        return pending
+
+    def submit_read(self, endpoint: int, length: int, timeout_ms: int) -> PendingTransfer:
+        pending = PendingTransfer(endpoint)
+        try:
+            response = self.device.read(endpoint, length, timeout_ms)
+            data = bytes(response)
+            pending._complete('completed', len(data), data)
+        except usb.core.USBTimeoutError as e:
+            pending._complete('timeout', error=e)
+        except usb.core.USBError as e:
+            pending._complete('error', error=e)
+        return pending
+
+    def submit_interrupt_read(self, endpoint: int, length: int, timeout_ms: int) -> PendingTransfer:
+        # pyusb wählt den Transfer-Typ anhand des Endpoint-Descriptors
+        return self.submit_read(endpoint, length, timeout_ms)
+
+    def submit_read_into(self, endpoint: int, view: memoryview, timeout_ms: int) -> PendingTransfer:
+        """
+        Liest in einen vorhandenen Puffer
+
+        pyusb akzeptiert nur array('B') als Zielpuffer und schreibt immer ab
+        dessen Anfang; daher wird über wiederverwendete Zwischenpuffer pro
+        Transfer-Länge gelesen und einmal in den Zielpuffer kopiert.
+        """
+        pending = PendingTransfer(endpoint)
+        scratch = self._scratch_buffer(len(view))
+        try:
+            length = self.device.read(endpoint, scratch, timeout_ms)
+            view[:length] = memoryview(scratch)[:length]
+            pending._complete('completed', length)
+        except usb.core.USBTimeoutError as e:
+            pending._complete('timeout', error=e)
+        except usb.core.USBError as e:
+            pending._complete('error', error=e)
+        return pending
+
+    def _scratch_buffer(self, length: int) -> array.array:
+        scratch = self._scratch.get(length)
+        if scratch is None:
+            scratch = array.array('B', bytes(length))
+            self._scratch[length] = scratch
+            while len(self._scratch) > SCRATCH_BUFFERS:
+                self._scratch.popitem(last=False)
+        else:
+            self._scratch.move_to_end(length)
+        return scratch
+
+    def close(self):
+        try:
+            usb.util.release_interface(self.device, self.interface)
+        except Exception as e:
+            logger.debug(f"Interface-Freigabe fehlgeschlagen: {e}")
+
+
+class Usb1TransferBackend:
+    """
+    Asynchrone Transfers über python-libusb1
+
+    Transfers werden mit Completion-Callback eingereicht; ein einzelner
+    Event-Thread pro Kontext bedient libusb_handle_events und weckt die
+    Wartenden, sobald ein Transfer abgeschlossen ist.
+
+    Mit bus/address öffnet das Backend genau das Gerät, das pyusb bereits
+    konfiguriert hat - bei zwei Readern oder nach einer Re-Enumeration
+    sonst womöglich ein anderes.
+    """
+
+    name = 'libusb1'
+    asynchronous = True
+
+    def __init__(self, vendor_id: int, product_id: int, interface: int = 0,
+                 bus: Optional[int] = None, address: Optional[int] = None):
+        if usb1 is None:
+            raise TransferError("python-libusb1 nicht installiert")
+
+        self.interface = interface
+        self._context = usb1.USBContext()
+        self._context.open()
+        try:
+            if bus is None or address is None:
+                self._handle = self._context.openByVendorIDAndProductID(vendor_id, product_id)
+            else:
+                self._handle = self._open_at(vendor_id, product_id, bus, address)
+        except Exception:
+            self._context.close()
+            raise
+        if self._handle is None:
+            self._context.close()
+            location = f" an Bus {bus} Adresse {address}" if bus is not None else ""
+            raise TransferError(f"Device {vendor_id:04X}:{product_id:04X}{location} "
+                                f"nicht über libusb1 geöffnet")
+
+        try:
+            self._handle.claimInterface(interface)
+        except Exception:
+            self._handle.close()
+            self._context.close()
+            raise
+
+        self._pending: Dict[int, PendingTransfer] = {}
+        self._pending_lock = threading.Lock()
+        self._running = True
+        self._event_thread = threading.Thread(target=self._handle_events,
+                                              name='goodix-usb-events', daemon=True)
+        self._event_thread.start()
+
+    def _open_at(self, vendor_id: int, product_id: int, bus: int, address: int):
+        """Handle des Geräts an bus/address (None, wenn dort kein passendes Gerät hängt)"""
+        for device in self._context.getDeviceList(skip_on_error=True):
+            if (device.getBusNumber() == bus and device.getDeviceAddress() == address
+                    and device.getVendorID() == vendor_id and device.getProductID() == product_id):
+                return device.open()
+        return None
+
+    def _handle_events(self):
+        """Event-Loop: blockiert in libusb, bis Transfers abgeschlossen werden"""
+        while self._running:
+            try:
+                self._context.handleEventsTimeout(0.5)
+            except usb1.USBErrorInterrupted:
+                continue
+            except Exception as e:
+                if self._running:
+                    logger.error(f"❌ USB-Event-Fehler: {e}")
+                break
+
+    def _on_transfer_done(self, transfer):
+        pending = transfer.getUserData()
+        with self._pending_lock:
+            self._pending.pop(id(pending), None)
+
+        status = transfer.getStatus()
+        if status in (usb1.TRANSFER_COMPLETED, usb1.TRANSFER_TIMED_OUT):
+            length = transfer.getActualLength()
+            data = None
+            if pending.endpoint & usb.util.ENDPOINT_IN and pending._copy_data:
+                data = bytes(transfer.getBuffer()[:length])
+            pending._complete('completed' if status == usb1.TRANSFER_COMPLETED else 'timeout',
+                              length, data)
+        elif status == usb1.TRANSFER_CANCELLED:
+            pending._complete('cancelled')
+        else:
+            pending._complete('error', error=TransferError(f"Transfer-Status {status}"))
+
+    def _submit(self, endpoint: int, buffer_or_len: Union[bytes, int, memoryview],
+                timeout_ms: int, copy_data: bool = True, interrupt: bool = False) -> PendingTransfer:
+        pending = PendingTransfer(endpoint)
+        pending._copy_data = copy_data
+        transfer = self._handle.getTransfer()
+        setup = transfer.setInterrupt if interrupt else transfer.setBulk
+        setup(endpoint, buffer_or_len, callback=self._on_transfer_done,
+              user_data=pending, timeout=timeout_ms)
+        pending._transfer = transfer
+        pending._cancel = transfer.cancel
+
+        with self._pending_lock:
+            self._pending[id(pending)] = pending
+        try:
+            transfer.submit()
+        except Exception as e:
+            with self._pending_lock:
+                self._pending.pop(id(pending), None)
+            pending._complete('error', error=e)
+        return pending
+
+    def submit_write(self, endpoint: int, data: bytes, timeout_ms: int) -> PendingTransfer:
+        return self._submit(endpoint, bytes(data), timeout_ms)
+
+    def submit_read(self, endpoint: int, length: int, timeout_ms: int) -> PendingTransfer:
+        return self._submit(endpoint, length, timeout_ms)
+
+    def submit_interrupt_read(self, endpoint: int, length: int, timeout_ms: int) -> PendingTransfer:
+        return self._submit(endpoint, length, timeout_ms, interrupt=True)
+
+    def submit_read_into(self, endpoint: int, view: memoryview, timeout_ms: int) -> PendingTransfer:
+        """Liest direkt in den übergebenen (beschreibbaren) Puffer - ohne Kopie"""
+        return self._submit(endpoint, view, timeout_ms, copy_data=False)
+
+    def cancel_all(self):
+        """Bricht alle ausstehenden Transfers ab"""
+        with self._pending_lock:
+            pending = list(self._pending.values())
+        for transfer in pending:
+            transfer.cancel()
+
+    def close(self):
+        self.cancel_all()
+        self._running = False
+        try:
+            self._context.interruptEventHandler()
+        except Exception:
+            pass
+        self._event_thread.join(timeout=1.0)
+        try:
+            self._handle.releaseInterface(self.interface)
+        except Exception as e:
+            logger.debug(f"Interface-Freigabe fehlgeschlagen: {e}")
+        try:
+            self._handle.close()
+            self._context.close()
+        except Exception as e:
+            logger.debug(f"libusb1-Kontext schließen fehlgeschlagen: {e}")
+
+
+class TransferStats:
+    """Round-Trip-Zeiten pro Kommando (gleitendes Fenster)"""
+
+    def __init__(self, window: int = STATS_WINDOW):
+        self.window = window
+        self._samples: Dict[str, deque] = {}
+        self._timeouts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, key: str, seconds: float):
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self.window)).append(seconds)
+
+    def record_timeout(self, key: str):
+        with self._lock:
+            self._timeouts[key] = self._timeouts.get(key, 0) + 1
+
+    def timeouts(self, key: str) -> int:
+        with self._lock:
+            return self._timeouts.get(key, 0)
+
+    def samples(self, key: str) -> List[float]:
+        with self._lock:
+            return list(self._samples.get(key, ()))
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Liefert count/mean/min/max/last (ms) und Timeouts pro Kommando"""
+        with self._lock:
+            keys = set(self._samples) | set(self._timeouts)
+            result = {}
+            for key in sorted(keys):
+                samples = list(self._samples.get(key, ()))
+                entry = {'count': len(samples), 'timeouts': self._timeouts.get(key, 0)}
+                if samples:
+                    entry.update({
+                        'mean_ms': sum(samples) / len(samples) * 1000,
+                        'min_ms': min(samples) * 1000,
+                        'max_ms': max(samples) * 1000,
+                        'last_ms': samples[-1] * 1000,
+                    })
+                result[key] = entry
+            return result
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._timeouts.clear()
+
+
+class GoodixTransferEngine:
+    """
+    Kommando/Antwort-Engine über einem Transfer-Backend
+
+    Beim asynchronen Backend wird der IN-Transfer vor dem OUT-Transfer
+    eingereicht, damit die Antwort ohne Lücke zwischen Write und Read
+    abgeholt wird. Timeouts und Versuche pro Kommando bestimmt die
+    TransferPolicy; write_attempts/read_attempts sind die Obergrenzen.
+    """
+
+    def __init__(self, backend, endpoint_out: int = DEFAULT_ENDPOINT_OUT,
+                 endpoint_in: int = DEFAULT_ENDPOINT_IN,
+                 max_packet_size: int = DEFAULT_PACKET_SIZE,
+                 write_attempts: int = 3, read_attempts: int = 3,
+                 policy: Optional[TransferPolicy] = None):
+        self.backend = backend
+        self.endpoint_out = endpoint_out
+        self.endpoint_in = endpoint_in
+        self.max_packet_size = max_packet_size
+        self.write_attempts = write_attempts
+        self.read_attempts = read_attempts
+        # Eine gemeinsame Statistik: die Policy lernt aus den Messungen der Engine
+        self.policy = policy or TransferPolicy(TransferStats(),
+                                               max_attempts=max(write_attempts, read_attempts))
+        self.stats = self.policy.stats
+        # Ein Kommando zur Zeit: Antworten werden nicht vertauscht.
+        # Reentrant, damit Frame-Reads mehrere Transfers am Stück halten können.
+        self.lock = threading.RLock()
+
+    def plan(self, key: str, timeout_ms: Optional[int] = None) -> CommandPlan:
+        """Timeout und Versuche laut Policy, begrenzt durch die Engine-Obergrenzen"""
+        plan = self.policy.plan(key, timeout_ms)
+        return plan._replace(write_attempts=min(plan.write_attempts, self.write_attempts),
+                             read_attempts=min(plan.read_attempts, self.read_attempts))
+
+    def transact(self, packet: bytes, timeout_ms: Optional[int] = None,
+                 key: Optional[str] = None) -> Optional[bytes]:
+        """
+        Sendet ein Paket und liefert die Antwort
+
+        timeout_ms ist eine Obergrenze; ohne Angabe gilt die der Policy.
+        Rückgabe: Antwort-Bytes, b'' wenn das Device nicht antwortet,
+        None wenn das Senden fehlschlägt.
+        """
+        key = key or f"0x{packet[0]:02X}"
+        with self.lock:
+            start = time.perf_counter()
+            plan = self.plan(key, timeout_ms)
+            read = self._exchange(
+                packet, plan, key,
+                lambda: self.backend.submit_read(self.endpoint_in, self.max_packet_size,
+                                                 plan.timeout_ms))
+            if read is None:
+                return None
+            if not read.has_data:
+                return b''
+            self.stats.record(key, time.perf_counter() - start)
+            return read.data
+
+    def transact_many(self, requests: Sequence[Tuple[bytes, str]],
+                      timeout_ms: Optional[int] = None) -> List[Optional[bytes]]:
+        """
+        Pipeline: mehrere Kommandos mit gleichzeitig ausstehenden Transfers
+
+        Alle IN-Transfers werden vorab eingereicht, danach alle OUT-Transfers
+        in Reihenfolge. USB-Bulk-Transfers eines Endpoints werden in Ordnung
+        abgearbeitet, also gehört die n-te Antwort zum n-ten Kommando. Nur für
+        idempotente Abfragen: bleibt eine Antwort aus, ist die Zuordnung
+        unsicher - der Rest wird verworfen und im Lockstep wiederholt.
+        Rückgabe je Kommando wie transact().
+        """
+        if not self.backend.asynchronous or len(requests) < 2:
+            return [self.transact(packet, timeout_ms, key) for packet, key in requests]
+
+        with self.lock:
+            # Gemeinsame Wartezeit: längster Einzel-Timeout der Pipeline
+            pipeline_ms = max(self.plan(key, timeout_ms).timeout_ms for _, key in requests)
+            reads = [self.backend.submit_read(self.endpoint_in, self.max_packet_size, pipeline_ms)
+                     for _ in requests]
+            writes = [self.backend.submit_write(self.endpoint_out, packet, pipeline_ms)
+                      for packet, _ in requests]
+            deadline = time.perf_counter() + pipeline_ms / 1000
+
+            results: List[Optional[bytes]] = []
+            for (packet, key), write, read in zip(requests, writes, reads):
+                if not write.wait(deadline) or not write.ok:
+                    break
+                if not read.wait(deadline) or not read.has_data:
+                    # Ohne Antwort wird das Kommando künftig im Lockstep gesendet
+                    self.stats.record_timeout(key)
+                    break
+                self.stats.record(key, read.completed_at - write.submitted_at)
+                results.append(read.data)
+
+            if len(results) == len(requests):
+                return results
+
+            # Pipeline aus dem Tritt: offene Transfers abbrechen, späte Antworten
+            # verwerfen und die übrigen Kommandos einzeln senden
+            pending = writes[len(results):] + reads[len(results):]
+            for transfer in pending:
+                transfer.cancel()
+            for transfer in pending:
+                transfer.wait(time.perf_counter() + 1.0)
+            self._drain()
+            logger.debug(f"⏱️ Pipeline nach {len(results)}/{len(requests)} Antworten "
+                         f"im Lockstep fortgesetzt")
+
+            for packet, key in requests[len(results):]:
+                results.append(self.transact(packet, timeout_ms, key))
+            return results
+
+    def _drain(self, timeout_ms: int = 20, max_packets: int = 8):
+        """Verwirft verspätete Antworten auf dem IN-Endpoint"""
+        for _ in range(max_packets):
+            read = self.backend.submit_read(self.endpoint_in, self.max_packet_size, timeout_ms)
+            if not read.wait(time.perf_counter() + timeout_ms / 1000 + 0.1):
+                read.cancel()
+                read.wait(time.perf_counter() + 1.0)
+            if not read.has_data:
+                return
+
+    def transact_into(self, packet: bytes, view: memoryview, timeout_ms: Optional[int] = None,
+                      key: Optional[str] = None) -> Optional[int]:
+        """
+        Sendet ein Paket und schreibt die Antwort direkt in 'view'
+
+        Rückgabe: Anzahl empfangener Bytes (0 ohne Antwort), None wenn das
+        Senden fehlschlägt.
+        """
+        key = key or f"0x{packet[0]:02X}"
+        with self.lock:
+            start = time.perf_counter()
+            plan = self.plan(key, timeout_ms)
+            read = self._exchange(
+                packet, plan, key,
+                lambda: self.backend.submit_read_into(self.endpoint_in, view, plan.timeout_ms))
+            if read is None:
+                return None
+            if not read.has_data:
+                return 0
+            self.stats.record(key, time.perf_counter() - start)
+            return read.actual_length
+
+    def read_into(self, view: memoryview, timeout_ms: Optional[int] = None,
+                  key: str = 'READ_IMAGE') -> int:
+        """Liest einen einzelnen IN-Transfer in 'view' (0 bei Timeout)"""
+        with self.lock:
+            timeout_ms = self.plan(key, timeout_ms).timeout_ms
+            read = self.backend.submit_read_into(self.endpoint_in, view, timeout_ms)
+            if not read.wait(time.perf_counter() + timeout_ms / 1000):
+                read.cancel()
+                read.wait(time.perf_counter() + 1.0)
+            if read.status == 'error':
+                raise TransferError(f"Empfang fehlgeschlagen: {read.error}")
+            return read.actual_length if read.has_data else 0
+
+    def wait_event(self, timeout_ms: int, endpoint: Optional[int] = None) -> Optional[bytes]:
+        """
+        Hält einen IN-Transfer offen, bis das Device von sich aus Daten sendet
+
+        Mit 'endpoint' wird ein Interrupt-Endpoint bedient (ohne die
+        Kommando-Sperre); sonst der Bulk-IN-Endpoint. Rückgabe: Daten oder
+        None bei Timeout/Abbruch.
+        """
+        if endpoint is not None:
+            read = self.backend.submit_interrupt_read(endpoint, self.max_packet_size, timeout_ms)
+            return self._await_event(read, timeout_ms)
+        with self.lock:
+            read = self.backend.submit_read(self.endpoint_in, self.max_packet_size, timeout_ms)
+            return self._await_event(read, timeout_ms)
+
+    @staticmethod
+    def _await_event(read: PendingTransfer, timeout_ms: int) -> Optional[bytes]:
+        if not read.wait(time.perf_counter() + timeout_ms / 1000):
+            read.cancel()
+            read.wait(time.perf_counter() + 1.0)
+        if read.status == 'error':
+            raise TransferError(f"Event-Transfer fehlgeschlagen: {read.error}")
+        return read.data if read.has_data else None
+
+    def _exchange(self, packet: bytes, plan: CommandPlan, key: str,
+                  submit_read: Callable[[], PendingTransfer]) -> Optional[PendingTransfer]:
+        timeout_ms = plan.timeout_ms
+        for attempt in range(plan.write_attempts):
+            if attempt and self.policy.expired():
+                logger.debug("⏱️ Deadline erreicht - keine weiteren Sendeversuche")
+                break
+            read = None
+            if self.backend.asynchronous:
+                read = submit_read()
+
+            write = self.backend.submit_write(self.endpoint_out, packet, timeout_ms)
+            write.wait(time.perf_counter() + timeout_ms / 1000)
+
+            if not write.ok:
+                if read is not None:
+                    read.cancel()
+                    read.wait(time.perf_counter() + 1.0)
+                if write.status == 'timeout' or not write.done:
+                    write.cancel()
+                    self.stats.record_timeout(key)
+                    logger.debug(f"⏱️ Send timeout, Versuch {attempt + 2}/{plan.write_attempts}")
+                    continue
+                raise TransferError(f"Senden fehlgeschlagen: {write.error}")
+
+            return self._await_response(read, plan, key, submit_read)
+
+        logger.debug("⏱️ Finaler USB-Timeout")
+        return None
+
+    def _await_response(self, read: Optional[PendingTransfer], plan: CommandPlan, key: str,
+                        submit_read: Callable[[], PendingTransfer]) -> PendingTransfer:
+        timeout_ms = plan.timeout_ms
+        for read_attempt in range(plan.read_attempts):
+            if read_attempt and self.policy.expired():
+                logger.debug("⏱️ Deadline erreicht - keine weiteren Leseversuche")
+                break
+            if read is None:
+                read = submit_read()
+
+            if not read.wait(time.perf_counter() + timeout_ms / 1000):
+                read.cancel()
+                read.wait(time.perf_counter() + 1.0)
+
+            if read.has_data:
+                return read
+            if read.status == 'error':
+                raise TransferError(f"Empfang fehlgeschlagen: {read.error}")
+            if read.status in ('timeout', 'cancelled'):
+                self.stats.record_timeout(key)
+                logger.debug(f"⏱️ Read timeout, Versuch {read_attempt + 2}/{plan.read_attempts}")
+            last, read = read, None
+
+        logger.debug("📤 Kommando gesendet, aber keine Antwort - das kann normal sein")
+        return last
+
+    def cancel_all(self):
+        """Bricht ausstehende Transfers ab (nur asynchrone Backends)"""
+        cancel_all = getattr(self.backend, 'cancel_all', None)
+        if cancel_all is not None:
+            cancel_all()
+
+    def close(self):
+        self.backend.close()
+
+
+def open_transfer_backend(device: usb.core.Device, vendor_id: int, product_id: int,
+                          interface: int = 0, preferred: str = 'auto'):
+    """
+    Öffnet das passende Transfer-Backend
+
+    'auto' versucht libusb1 (asynchron) und fällt auf pyusb zurück;
+    'libusb1' und 'pyusb' erzwingen das jeweilige Backend. libusb1 öffnet
+    dasselbe Gerät (Bus/Adresse) wie das übergebene pyusb-Device.
+    """
+    if preferred in ('auto', 'libusb1') and usb1 is not None:
+        try:
+            backend = Usb1TransferBackend(vendor_id, product_id, interface,
+                                          bus=getattr(device, 'bus', None),
+                                          address=getattr(device, 'address', None))
+            logger.info("⚡ Asynchrone libusb1-Transfers aktiv")
+            return backend
+        except Exception as e:
+            if preferred == 'libusb1':
+                raise
+            logger.warning(f"⚠️ libusb1-Backend nicht verfügbar, verwende pyusb: {e}")
+    elif preferred == 'libusb1':
+        raise TransferError("python-libusb1 nicht installiert")
+
+    try:
+        usb.util.claim_interface(device, interface)
+        logger.info("🤝 Interface beansprucht")
+    except Exception as e:
+        logger.warning(f"⚠️ Interface-Claim fehlgeschlagen: {e}")
+        # Weiter machen - manchmal nicht nötig
+    return PyusbTransferBackend(device, interface)
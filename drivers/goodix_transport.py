@@ -0,0 +1,358 @@
+"""
+Goodix Transport Record/Replay
+Zeichnet alle USB-Transfers einer Session auf und spielt sie ohne Hardware ab
+
+Der Recorder umhüllt ein beliebiges Transfer-Backend und schreibt jeden
+abgeschlossenen Transfer (Richtung, Endpoint, Status, Zeitpunkt, Dauer,
+Nutzdaten) in eine kompakte Binärdatei. Der Replayer liefert diese Transfers
+deterministisch zurück - wahlweise so schnell wie möglich oder mit den
+aufgezeichneten Latenzen.
+
+Dateiformat (Little Endian):
+    Header:  magic 'GDXS', Version, VID, PID, wMaxPacketSize,
+             OUT-/IN-/Interrupt-Endpoint (0 = keiner), Startzeit
+    Record:  Sequenz, Operation, Endpoint, Status, Offset [µs],
+             Dauer [µs], Länge, danach 'Länge' Bytes Nutzdaten
+
+Aktivierung ohne Codeänderung über die Umgebung:
+    GOODIX_RECORD=session.gxs        aufzeichnen (mit echter Hardware)
+    GOODIX_REPLAY=session.gxs        abspielen (ohne Hardware)
+    GOODIX_REPLAY_REALTIME=1         mit aufgezeichneten Latenzen
+    GOODIX_SIMULATOR=1               simulierter Sensor (drivers/goodix_simulator.py)
+"""
+
+import os
+import time
+import struct
+import threading
+from collections import deque
+from typing import Optional, Dict, Deque, List, NamedTuple, Tuple, BinaryIO
+import logging
+
+from drivers.goodix_transfer import PendingTransfer, TransferError
+
+logger = logging.getLogger(__name__)
+
+SESSION_MAGIC = b'GDXS'
+SESSION_VERSION = 1
+
+HEADER = struct.Struct('<4sBHHHBBBd')
+RECORD = struct.Struct('<IBBBIII')
+
+OP_WRITE = 1
+OP_READ = 2
+OP_INTERRUPT = 3
+
+STATUS_CODES = {'completed': 0, 'timeout': 1, 'cancelled': 2, 'error': 3}
+STATUS_NAMES = {code: name for name, code in STATUS_CODES.items()}
+
+
+class SessionHeader(NamedTuple):
+    vendor_id: int
+    product_id: int
+    max_packet_size: int
+    endpoint_out: int
+    endpoint_in: int
+    endpoint_intr: Optional[int]
+    created_at: float
+
+
+class SessionRecord(NamedTuple):
+    seq: int
+    op: int
+    endpoint: int
+    status: str
+    offset: float    # Sekunden seit Session-Start (Submit)
+    duration: float  # Sekunden bis zum Abschluss
+    payload: bytes
+
+
+class SessionWriter:
+    """Schreibt Transfers thread-sicher in eine Session-Datei"""
+
+    def __init__(self, path: str, header: SessionHeader):
+        self.path = path
+        self._file: BinaryIO = open(path, 'wb')
+        self._file.write(HEADER.pack(SESSION_MAGIC, SESSION_VERSION, header.vendor_id,
+                                     header.product_id, header.max_packet_size,
+                                     header.endpoint_out, header.endpoint_in,
+                                     header.endpoint_intr or 0, header.created_at))
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._start = time.perf_counter()
+        self.records = 0
+
+    def next_seq(self) -> int:
+        with self._lock:
+            self._seq += 1
+            return self._seq
+
+    def write(self, seq: int, op: int, pending: PendingTransfer, payload: bytes):
+        offset = max(0, int((pending.submitted_at - self._start) * 1e6))
+        duration = max(0, int((pending.elapsed or 0) * 1e6))
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.write(RECORD.pack(seq, op, pending.endpoint,
+                                         STATUS_CODES.get(pending.status, STATUS_CODES['error']),
+                                         offset, duration, len(payload)))
+            self._file.write(payload)
+            self.records += 1
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+def read_session(path: str) -> Tuple[SessionHeader, List[SessionRecord]]:
+    """Liest eine Session-Datei vollständig (Records in Submit-Reihenfolge)"""
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    magic, version, vid, pid, packet_size, ep_out, ep_in, ep_intr, created = \
+        HEADER.unpack_from(data, 0)
+    if magic != SESSION_MAGIC:
+        raise ValueError(f"{path}: keine Goodix-Session-Datei")
+    if version != SESSION_VERSION:
+        raise ValueError(f"{path}: nicht unterstützte Session-Version {version}")
+    header = SessionHeader(vid, pid, packet_size, ep_out, ep_in, ep_intr or None, created)
+
+    records = []
+    view = memoryview(data)
+    offset = HEADER.size
+    while offset + RECORD.size <= len(data):
+        seq, op, endpoint, status, start_us, duration_us, length = RECORD.unpack_from(data, offset)
+        offset += RECORD.size
+        payload = bytes(view[offset:offset + length])
+        offset += length
+        records.append(SessionRecord(seq, op, endpoint, STATUS_NAMES.get(status, 'error'),
+                                     start_us / 1e6, duration_us / 1e6, payload))
+
+    records.sort(key=lambda record: record.seq)
+    return header, records
+
+
+class RecordingBackend:
+    """Reicht Transfers an das echte Backend durch und zeichnet sie auf"""
+
+    def __init__(self, backend, writer: SessionWriter):
+        self.backend = backend
+        self.writer = writer
+        self.name = f"{backend.name}+record"
+        self.asynchronous = backend.asynchronous
+
+    def _record(self, op: int, pending: PendingTransfer, seq: int,
+                payload_of=lambda pending: pending.data or b'') -> PendingTransfer:
+        pending.add_done_callback(lambda done: self.writer.write(seq, op, done, payload_of(done)))
+        return pending
+
+    def submit_write(self, endpoint: int, data: bytes, timeout_ms: int) -> PendingTransfer:
+        seq = self.writer.next_seq()
+        payload = bytes(data)
+        return self._record(OP_WRITE, self.backend.submit_write(endpoint, data, timeout_ms),
+                            seq, lambda _: payload)
+
+    def submit_read(self, endpoint: int, length: int, timeout_ms: int) -> PendingTransfer:
+        seq = self.writer.next_seq()
+        return self._record(OP_READ, self.backend.submit_read(endpoint, length, timeout_ms), seq)
+
+    def submit_interrupt_read(self, endpoint: int, length: int, timeout_ms: int) -> PendingTransfer:
+        seq = self.writer.next_seq()
+        return self._record(OP_INTERRUPT,
+                            self.backend.submit_interrupt_read(endpoint, length, timeout_ms), seq)
+
+    def submit_read_into(self, endpoint: int, view: memoryview, timeout_ms: int) -> PendingTransfer:
+        seq = self.writer.next_seq()
+        # Beim Abschluss steht die Antwort bereits im Zielpuffer
+        return self._record(OP_READ, self.backend.submit_read_into(endpoint, view, timeout_ms),
+                            seq, lambda done: bytes(view[:done.actual_length]))
+
+    def cancel_all(self):
+        cancel_all = getattr(self.backend, 'cancel_all', None)
+        if cancel_all is not None:
+            cancel_all()
+
+    def close(self):
+        try:
+            self.backend.close()
+        finally:
+            self.writer.close()
+            logger.info(f"💾 Session aufgezeichnet: {self.writer.records} Transfers → "
+                        f"{self.writer.path}")
+
+
+class ReplayBackend:
+    """
+    Spielt eine aufgezeichnete Session ab
+
+    Writes und Reads werden pro Endpoint in Aufzeichnungsreihenfolge
+    bedient. Aufgezeichnete Abbrüche bleiben in Echtzeit offen, bis der
+    Aufrufer selbst abbricht, und enden bei max. Tempo sofort als Timeout;
+    ist die Session erschöpft, verhält sich das Device stumm.
+    """
+
+    name = 'replay'
+    asynchronous = True
+
+    def __init__(self, records: List[SessionRecord], realtime: bool = False,
+                 strict: bool = False):
+        self.realtime = realtime
+        self.strict = strict
+        self._queues: Dict[Tuple[str, int], Deque[SessionRecord]] = {}
+        for record in records:
+            kind = 'write' if record.op == OP_WRITE else 'read'
+            self._queues.setdefault((kind, record.endpoint), deque()).append(record)
+        self._lock = threading.Lock()
+        self._pending: Dict[int, PendingTransfer] = {}
+        self._timers: Dict[int, threading.Timer] = {}
+
+    def _next(self, kind: str, endpoint: int) -> Optional[SessionRecord]:
+        with self._lock:
+            queue = self._queues.get((kind, endpoint))
+            return queue.popleft() if queue else None
+
+    def _serve(self, pending: PendingTransfer, record: Optional[SessionRecord],
+               timeout_ms: int, complete):
+        key = id(pending)
+
+        def cancel():
+            timer = self._timers.pop(key, None)
+            if timer is not None:
+                timer.cancel()
+            self._pending.pop(key, None)
+            pending._complete('cancelled')
+
+        def finish():
+            self._timers.pop(key, None)
+            self._pending.pop(key, None)
+            if record is None:
+                # Session erschöpft: stummes Device
+                pending._complete('timeout')
+            else:
+                complete()
+
+        pending._cancel = cancel
+        self._pending[key] = pending
+        if record is not None and record.status == 'cancelled':
+            if self.realtime:
+                # Bleibt offen wie aufgezeichnet, bis der Aufrufer abbricht
+                return
+            # Max. Tempo: der Aufrufer hat damals nach seinem Timeout abgebrochen
+            record = record._replace(status='timeout', payload=b'')
+
+        if not self.realtime:
+            finish()
+            return
+        delay = timeout_ms / 1000 if record is None else record.duration
+        timer = threading.Timer(delay, finish)
+        timer.daemon = True
+        self._timers[key] = timer
+        timer.start()
+
+    def submit_write(self, endpoint: int, data: bytes, timeout_ms: int) -> PendingTransfer:
+        pending = PendingTransfer(endpoint)
+        record = self._next('write', endpoint)
+
+        def complete():
+            if self.strict and record.payload != bytes(data):
+                pending._complete('error', error=TransferError(
+                    f"Replay-Abweichung: erwartet {record.payload.hex()}, "
+                    f"gesendet {bytes(data).hex()}"))
+            elif record.status == 'error':
+                pending._complete('error', error=TransferError("aufgezeichneter Sendefehler"))
+            else:
+                pending._complete(record.status, len(data))
+
+        self._serve(pending, record, timeout_ms, complete)
+        return pending
+
+    def _submit_read(self, endpoint: int, length: int, timeout_ms: int,
+                     view: Optional[memoryview] = None) -> PendingTransfer:
+        pending = PendingTransfer(endpoint)
+        record = self._next('read', endpoint)
+
+        def complete():
+            if record.status == 'error':
+                pending._complete('error', error=TransferError("aufgezeichneter Empfangsfehler"))
+                return
+            payload = record.payload[:length]
+            if view is not None:
+                view[:len(payload)] = payload
+                pending._complete(record.status, len(payload))
+            else:
+                pending._complete(record.status, len(payload), payload)
+
+        self._serve(pending, record, timeout_ms, complete)
+        return pending
+
+    def submit_read(self, endpoint: int, length: int, timeout_ms: int) -> PendingTransfer:
+        return self._submit_read(endpoint, length, timeout_ms)
+
+    def submit_interrupt_read(self, endpoint: int, length: int, timeout_ms: int) -> PendingTransfer:
+        return self._submit_read(endpoint, length, timeout_ms)
+
+    def submit_read_into(self, endpoint: int, view: memoryview, timeout_ms: int) -> PendingTransfer:
+        return self._submit_read(endpoint, len(view), timeout_ms, view)
+
+    def cancel_all(self):
+        for pending in list(self._pending.values()):
+            pending.cancel()
+
+    def close(self):
+        self.cancel_all()
+
+
+class RecordTransport:
+    """Echte Hardware, jede Session wird in 'path' aufgezeichnet"""
+
+    needs_device = True
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def wrap(self, backend, driver) -> RecordingBackend:
+        header = SessionHeader(driver.vendor_id, driver.product_id, driver.endpoint_in_max_packet,
+                               driver.endpoint_out_addr, driver.endpoint_in_addr,
+                               driver.endpoint_intr_addr, time.time())
+        logger.info(f"⏺️ Zeichne USB-Session auf: {self.path}")
+        return RecordingBackend(backend, SessionWriter(self.path, header))
+
+
+class ReplayTransport:
+    """Keine Hardware: jede Verbindung spielt die Session von vorn ab"""
+
+    needs_device = False
+
+    def __init__(self, path: str, realtime: bool = False, strict: bool = False):
+        self.path = path
+        self.realtime = realtime
+        self.strict = strict
+        self._session: Optional[Tuple[SessionHeader, List[SessionRecord]]] = None
+
+    def open(self, driver) -> ReplayBackend:
+        if self._session is None:
+            self._session = read_session(self.path)
+        header, records = self._session
+
+        driver.endpoint_out_addr = header.endpoint_out
+        driver.endpoint_in_addr = header.endpoint_in
+        driver.endpoint_intr_addr = header.endpoint_intr
+        driver.endpoint_in_max_packet = header.max_packet_size
+        logger.info(f"▶️ Spiele USB-Session ab: {self.path} ({len(records)} Transfers, "
+                    f"{'Echtzeit' if self.realtime else 'max. Tempo'})")
+        return ReplayBackend(records, self.realtime, self.strict)
+
+
+def transport_from_env():
+    """Transport aus GOODIX_SIMULATOR / GOODIX_RECORD / GOODIX_REPLAY (None = direkte Hardware)"""
+    if os.environ.get('GOODIX_SIMULATOR') == '1':
+        # Erst hier importiert: der Simulator benötigt numpy
+        from drivers.goodix_simulator import shared_transport
+        return shared_transport()
+    if os.environ.get('GOODIX_REPLAY'):
+        return ReplayTransport(os.environ['GOODIX_REPLAY'],
+                               realtime=os.environ.get('GOODIX_REPLAY_REALTIME') == '1')
+    if os.environ.get('GOODIX_RECORD'):
+        return RecordTransport(os.environ['GOODIX_RECORD'])
+    return None
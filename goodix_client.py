@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Goodix Daemon Client
+Schlanker Client für goodixd - kein pyusb-Import, keine Sensor-Initialisierung
+"""
+
+import sys
+import os
+import json
+import socket
+import getpass
+from typing import Optional
+
+
+# Socket des System-Daemons (root, Rechte 0666 - Zugriff pro Benutzer über SO_PEERCRED)
+SYSTEM_SOCKET = '/run/goodixd.sock'
+
+
+def default_socket_path() -> str:
+    """Socket-Pfad: $GOODIX_SOCKET, /run für root, sonst $XDG_RUNTIME_DIR"""
+    if os.environ.get('GOODIX_SOCKET'):
+        return os.environ['GOODIX_SOCKET']
+    if os.geteuid() == 0:
+        return SYSTEM_SOCKET
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR', f'/tmp/goodixd-{os.getuid()}')
+    return os.path.join(runtime_dir, 'goodixd.sock')
+
+
+def client_socket_path() -> str:
+    """Socket für Clients: der eigene Daemon, sonst der System-Daemon"""
+    path = default_socket_path()
+    if not os.path.exists(path) and os.path.exists(SYSTEM_SOCKET):
+        return SYSTEM_SOCKET
+    return path
+
+
+class GoodixClient:
+    """Sendet Anfragen an goodixd über den Unix-Socket"""
+
+    def __init__(self, socket_path: Optional[str] = None, timeout: float = 30.0):
+        self.socket_path = socket_path or client_socket_path()
+        self.timeout = timeout
+
+    def request(self, op: str, **params) -> dict:
+        request = dict(params, op=op)
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            sock.sendall(json.dumps(request).encode() + b'\n')
+            with sock.makefile('rb') as reader:
+                line = reader.readline()
+        if not line:
+            return {'ok': False, 'error': 'keine Antwort vom Daemon'}
+        return json.loads(line)
+
+    def available(self) -> bool:
+        try:
+            return self.request('ping').get('ok', False)
+        except OSError:
+            return False
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("🔐 Goodix Daemon Client")
+        print("=" * 25)
+        print("Verwendung:")
+        print(f"  {sys.argv[0]} ping               - Daemon-Status")
+        print(f"  {sys.argv[0]} enroll [username]  - Fingerabdruck registrieren")
+        print(f"  {sys.argv[0]} verify [username]  - Fingerabdruck prüfen")
+        print(f"  {sys.argv[0]} identify           - Benutzer per Fingerabdruck finden")
+        print(f"  {sys.argv[0]} list               - Registrierte Benutzer")
+        print(f"  {sys.argv[0]} stats              - Gelernte Kommando-Latenzen")
+        print(f"  {sys.argv[0]} remove <username>  - Benutzer entfernen")
+        sys.exit(1)
+
+    action = sys.argv[1].lower()
+    username = sys.argv[2] if len(sys.argv) > 2 else getpass.getuser()
+
+    params = {}
+    if action in ('enroll', 'verify', 'remove'):
+        params['user'] = username
+
+    client = GoodixClient()
+    try:
+        response = client.request(action, **params)
+    except OSError as e:
+        print(f"❌ goodixd nicht erreichbar ({client.socket_path}): {e}")
+        sys.exit(2)
+
+    if action == 'list' and response.get('ok'):
+        for name, data in response['users'].items():
+            print(f"👤 {name} - {data['templates']} Templates")
+    elif action == 'stats' and response.get('ok'):
+        for name, entry in response['commands'].items():
+            latency = (f"p50={entry['p50_ms']:.2f}ms p99={entry['p99_ms']:.2f}ms"
+                       if entry['count'] else "keine Antwort")
+            print(f"📊 {name:<18} n={entry['count']:<4} {latency} "
+                  f"timeouts={entry['timeouts']} → {entry['timeout_ms']}ms x{entry['attempts']}")
+    elif response.get('ok'):
+        print(f"✅ {action} erfolgreich ({response.get('elapsed_ms')} ms)")
+        if response.get('user'):
+            print(f"   👤 {response['user']}")
+    else:
+        print(f"❌ {action} fehlgeschlagen: {response.get('error', 'kein Match')}")
+
+    sys.exit(0 if response.get('ok') else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,37 +1,55 @@
 #!/usr/bin/env python3
 """
 Goodix Fingerprint Demo-Login
-Nutzt Hardware-Erkennung für simulierten Fingerabdruck-Login
+Fingerabdruck-Login mit eigener Demo-Benutzerdatei (DEMO_USERS_FILE)
+
+Scans und Vergleich laufen wie in goodix_login.py: Minutien aus dem
+Frame (Treiber) im Binärformat, Vergleich mit MinutiaeMatcher.verify().
 """
 
 import sys
 import os
-import json
 import time
 from drivers.goodix_prototype_driver import GoodixFingerprintDriver
+from biometrics.matcher import MinutiaeMatcher, prepare
+from biometrics.template import (encode_template, template_to_text, template_from_text,
+                                 template_header, load_template)
+from biometrics.store import EnrollmentStore
+
+DEMO_USERS_FILE = '/tmp/goodix_demo_users.json'
 
 class GoodixDemoLogin:
-    """Demo-Login mit Hardware-Erkennung"""
+    """Demo-Login: Minutien-Templates in einer eigenen Benutzerdatei"""
     
     def __init__(self):
         self.driver = GoodixFingerprintDriver()
-        self.enrolled_users = self.load_enrolled_users()
+        self.matcher = MinutiaeMatcher()
+        self.store = EnrollmentStore.shared(DEMO_USERS_FILE)
+    
+    @property
+    def enrolled_users(self):
+        return self.store.users
     
     def load_enrolled_users(self):
-        """Lädt registrierte Benutzer"""
-        try:
-            with open('/tmp/goodix_demo_users.json', 'r') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return {}
+        """Lädt registrierte Benutzer neu"""
+        return self.store.load()
     
-    def save_enrolled_users(self):
-        """Speichert registrierte Benutzer"""
-        with open('/tmp/goodix_demo_users.json', 'w') as f:
-            json.dump(self.enrolled_users, f, indent=2)
+    def save_enrolled_users(self, changed_user=None):
+        """Speichert registrierte Benutzer (atomar, Rechte 0600)"""
+        self.store.save(changed_user)
+    
+    def scan_template(self, accepted_only=True):
+        """Capture + Minutien-Template als Base64-Text (None ohne brauchbaren Frame)"""
+        capture = self.driver.capture()
+        if capture is None or (accepted_only and not capture.accepted):
+            return None
+        features = self.driver.extract_features(capture.data)
+        if features is None:
+            return None
+        return template_to_text(encode_template(features, time.time(), len(capture.data)))
     
     def enroll_user(self, username):
-        """Registriert einen Benutzer (Hardware-Test)"""
+        """Registriert einen Benutzer (3 Scans)"""
         print(f"🔐 Hardware-Demo-Enrollment für {username}")
         print("=" * 50)
         
@@ -48,43 +66,43 @@ class GoodixDemoLogin:
         print("✅ Sensor-Initialisierung erfolgreich!")
         print()
         
-        # Demo-Enrollment (simuliert)
-        print("📋 Demo-Enrollment-Prozess:")
-        print("   (Echte Fingerabdruck-Scans werden simuliert)")
+        print("📋 Demo-Enrollment: 3 Scans desselben Fingers")
         print()
         
+        templates = []
         for i in range(3):
-            print(f"👆 Scan {i+1}/3: Drücken Sie Enter zum Fortfahren...")
-            input()
-            
-            # Hardware-Test für jeden "Scan"
-            device_info = self.driver.get_device_info()
-            if device_info['connected']:
-                print(f"   ✅ Scan {i+1} - Hardware reagiert korrekt")
-                time.sleep(1)
-            else:
-                print(f"   ❌ Scan {i+1} - Hardware-Problem")
+            print(f"👆 Scan {i+1}/3: Finger auflegen...")
+            template = self.scan_template()
+            if template is None:
+                print(f"   ❌ Scan {i+1} fehlgeschlagen")
+                self.driver.disconnect()
                 return False
+            templates.append(template)
+            header = template_header(template_from_text(template))
+            print(f"   ✅ Scan {i+1} - {header.count} Minutien (Qualität {header.quality:.2f})")
+            
+            if i < 2:
+                print("   ✋ Finger abheben...")
+                self.driver.wait_for_lift()
         
         # Benutzer speichern
         self.enrolled_users[username] = {
             'enrolled_date': time.strftime('%Y-%m-%d %H:%M:%S'),
             'hardware_verified': True,
-            'demo_templates': ['template1', 'template2', 'template3']
+            'templates': templates
         }
-        self.save_enrolled_users()
+        self.save_enrolled_users(username)
         
         self.driver.disconnect()
         
         print()
         print(f"🎉 Demo-Enrollment für {username} erfolgreich!")
-        print("   Hardware-Kommunikation funktioniert perfekt")
-        print("   Fingerabdruck-Templates simuliert und gespeichert")
+        print("   Fingerabdruck-Templates gespeichert")
         
         return True
     
     def authenticate_user(self, username):
-        """Authentifiziert Benutzer (Hardware-Test)"""
+        """Authentifiziert Benutzer per Minutien-Vergleich"""
         print(f"🔐 Hardware-Demo-Login für {username}")
         print("=" * 40)
         
@@ -106,32 +124,30 @@ class GoodixDemoLogin:
         print("✅ Sensor-Initialisierung erfolgreich!")
         print()
         
-        # Demo-Authentifizierung
-        print("👆 Demo-Fingerabdruck-Scan:")
-        print("   Drücken Sie Enter für 'Finger auflegen'...")
-        input()
-        
-        # Hardware reagiert
-        device_info = self.driver.get_device_info()
-        if device_info['connected']:
-            print("   📡 Hardware-Sensor reagiert...")
-            time.sleep(1)
-            print("   🔍 Template-Vergleich (simuliert)...")
-            time.sleep(1)
-            print("   ✅ Fingerabdruck erkannt!")
-            
-            self.driver.disconnect()
-            
-            print()
-            print("🎉 LOGIN ERFOLGREICH!")
-            print(f"   Willkommen zurück, {username}!")
-            print(f"   Letzte Registrierung: {self.enrolled_users[username]['enrolled_date']}")
-            
-            return True
-        else:
-            print("   ❌ Hardware-Problem")
-            self.driver.disconnect()
+        print("👆 Demo-Fingerabdruck-Scan: Finger auflegen...")
+        template = self.scan_template(accepted_only=False)
+        self.driver.disconnect()
+        if template is None:
+            print("   ❌ Scan fehlgeschlagen")
             return False
+        
+        gallery = self.store.templates(username)
+        if not gallery:
+            print("   ❌ Keine Minutien-Templates - bitte neu registrieren")
+            return False
+        
+        print("   🔍 Template-Vergleich...")
+        result = self.matcher.verify(prepare(load_template(template)), gallery)
+        if not result.accepted:
+            print(f"   ❌ Fingerabdruck nicht erkannt (Score {result.score:.2f})")
+            return False
+        
+        print(f"   ✅ Fingerabdruck erkannt! (Template {result.index+1}, Score {result.score:.2f})")
+        print()
+        print("🎉 LOGIN ERFOLGREICH!")
+        print(f"   Willkommen zurück, {username}!")
+        print(f"   Letzte Registrierung: {self.enrolled_users[username]['enrolled_date']}")
+        return True
 
 def main():
     if len(sys.argv) < 2:
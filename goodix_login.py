@@ -6,84 +6,105 @@ Praktische Anwendung für Fingerabdruck-basierte Authentifizierung
 
 import sys
 import os
-import json
 import time
-import hashlib
 import getpass
 from pathlib import Path
 from drivers.goodix_prototype_driver import GoodixFingerprintDriver
+from drivers.goodix_capture import frame_contrast
+from biometrics.matcher import MinutiaeMatcher, prepare
+from biometrics.gallery import StackedGallery, IdentifyResult
+from biometrics.pool import MatcherPool, POOL_MIN_ROWS
+from biometrics.template import encode_template, template_to_text, load_template
+from biometrics.store import EnrollmentStore
 import logging
 
+# Obergrenze für einen kompletten Auth-Versuch (Sekunden)
+AUTH_TIMEOUT = 15
+
+# Obergrenze pro Enrollment-Scan (Sekunden); der Capture endet beim ersten guten Frame
+SCAN_TIMEOUT = 30
+
+# Mindest-Bildqualität für Enrollment-Scans (strenger als beim Login)
+ENROLL_MIN_QUALITY = 0.5
+
 class GoodixLoginManager:
     """Verwaltet Fingerabdruck-Login für Goodix-Sensor"""
     
     def __init__(self):
         self.driver = GoodixFingerprintDriver()
         self.data_file = Path.home() / '.goodix_fingerprints.json'
-        self.enrolled_users = self.load_enrollment_data()
+        # Gestapelte Templates + Dreiecks-Index, gebunden an den Stand von data_file
+        self.gallery_file = Path.home() / '.goodix_fingerprints.gallery.npz'
+        # Prozessweit geteilt: Datei nur bei Änderung neu lesen, Templates dekodiert im Cache
+        self.store = EnrollmentStore.shared(self.data_file)
+        self.matcher = MinutiaeMatcher()
+        # Galerie aller Benutzer für 1:N, geladen oder gebaut beim ersten identify
+        self._gallery = None
+        self._gallery_users = None
+        # Worker-Prozesse für große Galerien (GOODIX_MATCH_WORKERS, 0 = im Prozess)
+        self.match_workers = int(os.environ.get('GOODIX_MATCH_WORKERS') or 0)
+        self._pool = None
         
         # Logging konfigurieren
         logging.basicConfig(level=logging.INFO,
                           format='%(asctime)s - %(levelname)s - %(message)s')
         self.logger = logging.getLogger(__name__)
     
+    @property
+    def enrolled_users(self) -> dict:
+        """Benutzer der Enrollment-Datei (Dict des geteilten Stores)"""
+        return self.store.users
+    
+    @enrolled_users.setter
+    def enrolled_users(self, users: dict):
+        self.store.users = users
+        self.store.invalidate()
+    
     def load_enrollment_data(self) -> dict:
-        """Lädt gespeicherte Fingerabdruck-Daten"""
-        try:
-            if self.data_file.exists():
-                with open(self.data_file, 'r') as f:
-                    return json.load(f)
-        except Exception as e:
-            self.logger.warning(f"Konnte Enrollment-Daten nicht laden: {e}")
-        
-        return {}
+        """Lädt gespeicherte Fingerabdruck-Daten neu von der Platte"""
+        return self.store.load()
     
-    def save_enrollment_data(self):
-        """Speichert Fingerabdruck-Daten"""
+    def save_enrollment_data(self, changed_user: str = None):
+        """Speichert Fingerabdruck-Daten (changed_user: Cache und Galerie nur für diesen Benutzer nachziehen)"""
         try:
-            with open(self.data_file, 'w') as f:
-                json.dump(self.enrolled_users, f, indent=2)
-            
-            # Datei-Berechtigung auf User beschränken
-            os.chmod(self.data_file, 0o600)
+            # Atomar ersetzt, Rechte 0600
+            self.store.save(changed_user)
             
         except Exception as e:
             self.logger.error(f"Konnte Enrollment-Daten nicht speichern: {e}")
+            self._gallery = None
+            return
+        
+        if self._gallery is None or changed_user is None or self._gallery_users is not self.enrolled_users:
+            self._gallery = None
+            return
+        # Inkrementell: Zeilen des Benutzers ersetzen, Index-Einträge folgen mit
+        self._gallery.remove(changed_user)
+        for template in self._stored_templates(changed_user):
+            self._gallery.add(changed_user, template)
+        self._gallery.save(str(self.gallery_file), self._enrollment_source())
     
     def generate_fingerprint_template(self, scan_data: bytes) -> str:
-        """Generiert ein Fingerabdruck-Template aus Scan-Daten"""
-        # Vereinfachtes Template-System für Demo
-        # In einem echten System würden hier komplexe biometrische
-        # Algorithmen verwendet werden
-        
+        """Generiert ein Fingerabdruck-Template (Minutien, Binärformat als Base64-Text)"""
         if not scan_data or len(scan_data) == 0:
             return None
         
-        # Hash der Scan-Daten als einfaches "Template"
-        template_hash = hashlib.sha256(scan_data).hexdigest()
-        
-        # Zusätzliche Metadaten
-        template = {
-            'hash': template_hash,
-            'timestamp': time.time(),
-            'length': len(scan_data),
-            'quality': self.assess_scan_quality(scan_data)
-        }
-        
-        return json.dumps(template)
+        # Minutien (x, y, Winkel, Typ, Qualität) aus dem kalibrierten Bild
+        features = self.driver.extract_features(scan_data)
+        # Unbekanntes Frame-Format: nur Metadaten samt Kontrast-Qualität
+        quality = self.assess_scan_quality(scan_data) if features is None else 0.0
+        return template_to_text(encode_template(features, time.time(), len(scan_data), quality))
     
-    def assess_scan_quality(self, scan_data: bytes) -> str:
-        """Bewertet die Qualität eines Fingerabdruck-Scans"""
+    def assess_scan_quality(self, scan_data: bytes) -> float:
+        """Bildqualität 0..1 eines Scans (Block-Kontrast, Rillen-Kohärenz, Abdeckung)"""
         if not scan_data:
-            return 'poor'
+            return 0.0
         
-        # Einfache Qualitätsbewertung basierend auf Daten-Eigenschaften
-        if len(scan_data) < 100:
-            return 'poor'
-        elif len(scan_data) < 500:
-            return 'fair'
-        else:
-            return 'good'
+        report = self.driver.assess_frame(scan_data)
+        if report is None:
+            # Unbekanntes Frame-Format: nur der Kontrast der Rohdaten
+            return round(frame_contrast(scan_data), 3)
+        return round(report.score, 3)
     
     def enroll_fingerprint(self, username: str = None) -> bool:
         """Registriert einen neuen Fingerabdruck"""
@@ -118,45 +139,25 @@ class GoodixLoginManager:
             for scan_num in range(3):
                 print(f"👆 Scan {scan_num + 1}/3: Finger auf Sensor legen...")
                 
-                # Callback für Scan-Events
-                scan_completed = False
-                scan_data = None
-                
-                def on_scan_complete(image_data):
-                    nonlocal scan_completed, scan_data
-                    scan_completed = True
-                    scan_data = image_data
-                
-                self.driver.on_scan_complete = on_scan_complete
+                # Endet beim ersten ausreichend guten Frame
+                result = self.driver.capture(min_quality=ENROLL_MIN_QUALITY, timeout=SCAN_TIMEOUT)
+                if result is None or not result.accepted:
+                    print(f"   ⏱️ Scan {scan_num + 1} - Timeout oder Bildqualität zu gering")
+                    return False
                 
-                # Scan starten
-                if self.driver.start_scan():
-                    # Warten auf Scan-Completion
-                    timeout = 30  # 30 Sekunden Timeout
-                    start_time = time.time()
-                    
-                    while not scan_completed and (time.time() - start_time) < timeout:
-                        time.sleep(0.1)
-                    
-                    if scan_completed and scan_data:
-                        template = self.generate_fingerprint_template(scan_data)
-                        if template:
-                            templates.append(template)
-                            print(f"   ✅ Scan {scan_num + 1} erfolgreich!")
-                        else:
-                            print(f"   ❌ Scan {scan_num + 1} - Template-Erstellung fehlgeschlagen")
-                            return False
-                    else:
-                        print(f"   ⏱️ Scan {scan_num + 1} - Timeout oder kein Finger erkannt")
-                        return False
+                template = self.generate_fingerprint_template(result.data)
+                if template:
+                    templates.append(template)
+                    print(f"   ✅ Scan {scan_num + 1} erfolgreich! "
+                          f"(Qualität {result.quality:.2f}, {result.elapsed:.1f}s)")
                 else:
-                    print(f"   ❌ Scan {scan_num + 1} - Scan-Start fehlgeschlagen")
+                    print(f"   ❌ Scan {scan_num + 1} - Template-Erstellung fehlgeschlagen")
                     return False
                 
-                # Kurze Pause zwischen Scans
+                # Nächster Scan erst nach dem Abheben - sonst dieselbe Auflage
                 if scan_num < 2:
-                    print("   Finger entfernen und kurz warten...")
-                    time.sleep(2)
+                    print("   Finger entfernen...")
+                    self.driver.wait_for_lift()
             
             # Templates speichern
             self.enrolled_users[username] = {
@@ -165,7 +166,7 @@ class GoodixLoginManager:
                 'scan_count': len(templates)
             }
             
-            self.save_enrollment_data()
+            self.save_enrollment_data(username)
             
             print(f"\n🎉 Fingerabdruck für '{username}' erfolgreich registriert!")
             print(f"📊 {len(templates)} Templates gespeichert")
@@ -191,51 +192,79 @@ class GoodixLoginManager:
         print(f"🔐 Fingerabdruck-Login für: {username}")
         print("👆 Bitte Finger auf den Sensor legen...")
         
+        # Gesamter Auth-Versuch (Verbinden, Init, Scan) endet spätestens nach AUTH_TIMEOUT
+        with self.driver.deadline(AUTH_TIMEOUT):
+            return self._authenticate_scan(username)
+    
+    def identify_user(self) -> str:
+        """Findet den Benutzer zu einem Fingerabdruck (1:N über alle Benutzer)"""
+        if not self.enrolled_users:
+            print("❌ Keine Benutzer registriert")
+            return None
+        
+        print(f"🔎 Fingerabdruck-Identifikation ({len(self.enrolled_users)} Benutzer)")
+        print("👆 Bitte Finger auf den Sensor legen...")
+        
+        with self.driver.deadline(AUTH_TIMEOUT):
+            return self._identify_scan()
+    
+    def _scan_auth_template(self) -> str:
+        """Verbindet, initialisiert und liefert das Template eines Auth-Scans"""
         # Mit Sensor verbinden
         if not self.driver.connect():
             print("❌ Fehler: Konnte nicht mit Sensor verbinden")
-            return False
+            return None
+        
+        # Sensor initialisieren
+        if not self.driver.initialize():
+            print("❌ Fehler: Sensor-Initialisierung fehlgeschlagen")
+            return None
+        
+        # Auth-Scan: erster guter Frame, sonst der beste bis zur Auth-Deadline
+        result = self.driver.capture()
+        if result is None:
+            print("⏱️ Timeout - kein Finger erkannt")
+            return None
+        if not result.accepted:
+            print(f"⚠️ Bildqualität gering ({result.quality:.2f}) - vergleiche trotzdem")
         
+        return self.generate_fingerprint_template(result.data)
+    
+    def _identify_scan(self) -> str:
+        """Scan und 1:N-Vergleich - innerhalb der Auth-Deadline"""
         try:
-            # Sensor initialisieren
-            if not self.driver.initialize():
-                print("❌ Fehler: Sensor-Initialisierung fehlgeschlagen")
-                return False
-            
-            # Auth-Scan durchführen
-            scan_completed = False
-            scan_data = None
+            template = self._scan_auth_template()
+            if not template:
+                return None
             
-            def on_scan_complete(image_data):
-                nonlocal scan_completed, scan_data
-                scan_completed = True
-                scan_data = image_data
+            started = time.perf_counter()
+            result = self.identify_template(template)
+            elapsed = (time.perf_counter() - started) * 1000
+            if result.label is None:
+                print(f"❌ Fingerabdruck keinem Benutzer zugeordnet ({elapsed:.0f} ms)")
+                return None
+            print(f"✅ Erkannt: {result.label} (Score {result.score:.2f}, {elapsed:.0f} ms)")
+            return result.label
             
-            self.driver.on_scan_complete = on_scan_complete
+        except KeyboardInterrupt:
+            print("\n❌ Identifikation abgebrochen")
+            return None
+        finally:
+            self.driver.disconnect()
+    
+    def _authenticate_scan(self, username: str) -> bool:
+        """Verbindet, scannt und vergleicht - innerhalb der Auth-Deadline"""
+        try:
+            auth_template = self._scan_auth_template()
+            if not auth_template:
+                return False
             
-            if self.driver.start_scan():
-                # Warten auf Scan
-                timeout = 15  # 15 Sekunden für Auth
-                start_time = time.time()
-                
-                while not scan_completed and (time.time() - start_time) < timeout:
-                    time.sleep(0.1)
-                
-                if scan_completed and scan_data:
-                    # Template generieren und vergleichen
-                    auth_template = self.generate_fingerprint_template(scan_data)
-                    
-                    if self.match_template(auth_template, username):
-                        print("✅ Fingerabdruck-Authentifizierung erfolgreich!")
-                        return True
-                    else:
-                        print("❌ Fingerabdruck nicht erkannt")
-                        return False
-                else:
-                    print("⏱️ Timeout - kein Finger erkannt")
-                    return False
+            # Template vergleichen
+            if self.match_template(auth_template, username):
+                print("✅ Fingerabdruck-Authentifizierung erfolgreich!")
+                return True
             else:
-                print("❌ Scan-Start fehlgeschlagen")
+                print("❌ Fingerabdruck nicht erkannt")
                 return False
                 
         except KeyboardInterrupt:
@@ -245,33 +274,108 @@ class GoodixLoginManager:
             self.driver.disconnect()
     
     def match_template(self, auth_template: str, username: str) -> bool:
-        """Vergleicht Auth-Template mit gespeicherten Templates"""
+        """Vergleicht die Minutien des Auth-Templates mit den gespeicherten Templates"""
         if not auth_template:
             return False
         
         try:
-            auth_data = json.loads(auth_template)
-            stored_templates = self.enrolled_users[username]['templates']
+            auth_features = load_template(auth_template)
+            if auth_features is None:
+                self.logger.warning("Auth-Scan ohne Minutien (unbekanntes Frame-Format)")
+                return False
             
-            # Vereinfachter Matching-Algorithmus
-            # In einem echten System würden hier biometrische
-            # Matching-Algorithmen verwendet werden
+            # Nur ein stat(); gespeicherte Templates kommen dekodiert aus dem Cache
+            self.store.refresh()
             
-            for stored_template_str in stored_templates:
-                stored_data = json.loads(stored_template_str)
-                
-                # Hash-Vergleich als einfacher Matcher
-                if auth_data['hash'] == stored_data['hash']:
-                    return True
-                
-                # Zusätzlich: Ähnlichkeits-Check könnte hier implementiert werden
+            gallery = self._stored_templates(username)
+            if not gallery:
+                self.logger.warning(f"Keine Minutien-Templates für '{username}' - bitte neu registrieren")
+                return False
             
-            return False
+            # Vorfilter, Ausrichtung und Paarung; endet beim ersten sicheren Treffer
+            result = self.matcher.verify(prepare(auth_features), gallery)
+            self.logger.info(f"Match-Score {result.score:.2f} ({result.matched} Minutien, "
+                             f"Stufe {result.stage})")
+            return result.accepted
             
         except Exception as e:
             self.logger.error(f"Template-Matching-Fehler: {e}")
             return False
     
+    def _enrollment_source(self) -> dict:
+        """Stand der Enrollment-Datei, an den die gespeicherte Galerie gebunden ist"""
+        try:
+            stat = self.data_file.stat()
+        except OSError:
+            return {}
+        return {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+    
+    def _stored_templates(self, username: str) -> list:
+        """Vorbereitete Minutien-Templates eines Benutzers (aus dem Template-Cache)"""
+        return self.store.templates(username)
+    
+    def identification_gallery(self) -> StackedGallery:
+        """Gestapelte Templates aller Benutzer samt Index (von der Platte oder neu gebaut)"""
+        if self._gallery is None or self._gallery_users is not self.enrolled_users:
+            source = self._enrollment_source()
+            gallery = StackedGallery.load(str(self.gallery_file), source)
+            if gallery is None:
+                started = time.perf_counter()
+                gallery = StackedGallery()
+                for username in self.enrolled_users:
+                    for template in self._stored_templates(username):
+                        gallery.add(username, template)
+                gallery.save(str(self.gallery_file), source)
+                self.logger.info(f"Identifikations-Galerie gebaut: {len(gallery)} Templates "
+                                 f"({(time.perf_counter() - started) * 1000:.0f} ms)")
+            self._gallery, self._gallery_users = gallery, self.enrolled_users
+        return self._gallery
+    
+    def match_pool(self, gallery: StackedGallery):
+        """
+        MatcherPool für die Galerie (sonst None): erst ab POOL_MIN_ROWS
+        Templates und mit mindestens zwei Workern auf eigenen CPU-Kernen -
+        kleinere Galerien verteilt der Pool ohnehin nicht. Die Entscheidung
+        ist mit und ohne Pool dieselbe, er verkürzt nur die Ablehnungen.
+        """
+        workers = min(self.match_workers, os.cpu_count() or 1)
+        if workers < 2 or len(gallery) < POOL_MIN_ROWS:
+            return None
+        if self._pool is None:
+            self._pool = MatcherPool(gallery, workers)
+        self._pool.use(gallery)
+        return self._pool
+    
+    def close_match_pool(self):
+        """Beendet die Matcher-Worker (z.B. beim Herunterfahren des Daemons)"""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
+    
+    def identify_template(self, auth_template: str) -> IdentifyResult:
+        """1:N-Vergleich eines Auth-Templates gegen alle Benutzer"""
+        empty = IdentifyResult(None, 0.0, 0, False)
+        if not auth_template:
+            return empty
+        try:
+            auth_features = load_template(auth_template)
+            if auth_features is None:
+                self.logger.warning("Auth-Scan ohne Minutien (unbekanntes Frame-Format)")
+                return empty
+            
+            # Batch-Scoring über alle Templates, exakte Prüfung der besten
+            self.store.refresh()
+            gallery = self.identification_gallery()
+            searcher = self.match_pool(gallery) or gallery
+            result = searcher.identify(prepare(auth_features), self.matcher)
+            self.logger.info(f"Identify-Score {result.score:.2f} ({result.matched} Minutien, "
+                             f"{result.candidates} Kandidaten)")
+            return result
+            
+        except Exception as e:
+            self.logger.error(f"Identifikations-Fehler: {e}")
+            return empty
+    
     def list_enrolled_users(self):
         """Zeigt registrierte Benutzer an"""
         if not self.enrolled_users:
@@ -293,7 +397,7 @@ class GoodixLoginManager:
         """Entfernt einen registrierten Benutzer"""
         if username in self.enrolled_users:
             del self.enrolled_users[username]
-            self.save_enrollment_data()
+            self.save_enrollment_data(username)
             print(f"✅ Benutzer '{username}' entfernt")
         else:
             print(f"❌ Benutzer '{username}' nicht gefunden")
@@ -307,6 +411,7 @@ def main():
         print("Verwendung:")
         print(f"  {sys.argv[0]} enroll [username]  - Fingerabdruck registrieren")
         print(f"  {sys.argv[0]} auth [username]    - Authentifizierung durchführen")
+        print(f"  {sys.argv[0]} identify           - Benutzer per Fingerabdruck finden")
         print(f"  {sys.argv[0]} list               - Registrierte Benutzer anzeigen")
         print(f"  {sys.argv[0]} remove <username>  - Benutzer entfernen")
         print(f"  {sys.argv[0]} test               - Sensor-Test")
@@ -331,6 +436,10 @@ def main():
             success = manager.authenticate_user(username)
             sys.exit(0 if success else 1)
         
+        elif action == 'identify':
+            success = manager.identify_user() is not None
+            sys.exit(0 if success else 1)
+        
         elif action == 'list':
             manager.list_enrolled_users()
             sys.exit(0)
@@ -361,7 +470,7 @@ def main():
         
         else:
             print(f"❌ Unbekannte Aktion: {action}")
-            print("Verfügbare Aktionen: enroll, auth, list, remove, test")
+            print("Verfügbare Aktionen: enroll, auth, identify, list, remove, test")
             sys.exit(1)
     
     except KeyboardInterrupt:
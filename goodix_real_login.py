@@ -7,11 +7,13 @@ Echter Fingerabdruck-Login für Linux-System
 import sys
 import os
 import pwd
-import json
-import hashlib
 import time
 from pathlib import Path
 from drivers.goodix_prototype_driver import GoodixFingerprintDriver
+from biometrics.matcher import MinutiaeMatcher, prepare
+from biometrics.template import (encode_template, template_to_text, template_from_text,
+                                 template_header, load_template)
+from biometrics.store import EnrollmentStore
 import logging
 
 # Setup logging
@@ -21,9 +23,15 @@ logger = logging.getLogger(__name__)
 class GoodixRealLogin:
     def __init__(self):
         self.driver = GoodixFingerprintDriver()
+        self.matcher = MinutiaeMatcher()
         self.enrolled_users_file = os.path.expanduser("~/.config/goodix/enrolled_users.json")
         self.ensure_config_dir()
-        self.enrolled_users = self.load_enrolled_users()
+        # Geteilt mit den anderen Front-Ends im Prozess, Templates dekodiert im Cache
+        self.store = EnrollmentStore.shared(self.enrolled_users_file)
+    
+    @property
+    def enrolled_users(self):
+        return self.store.users
     
     def ensure_config_dir(self):
         """Erstelle Konfigurationsverzeichnis falls nicht vorhanden"""
@@ -31,48 +39,34 @@ class GoodixRealLogin:
         Path(config_dir).mkdir(parents=True, exist_ok=True)
     
     def load_enrolled_users(self):
-        """Lädt gespeicherte Fingerabdruck-Templates"""
-        try:
-            if os.path.exists(self.enrolled_users_file):
-                with open(self.enrolled_users_file, 'r') as f:
-                    return json.load(f)
-            return {}
-        except Exception as e:
-            logger.error(f"Fehler beim Laden der Enrollment-Daten: {e}")
-            return {}
+        """Lädt gespeicherte Fingerabdruck-Templates neu von der Platte"""
+        return self.store.load()
     
-    def save_enrolled_users(self):
-        """Speichert Enrollment-Daten"""
+    def save_enrolled_users(self, changed_user=None):
+        """Speichert Enrollment-Daten (atomar, Rechte 0600)"""
         try:
-            with open(self.enrolled_users_file, 'w') as f:
-                json.dump(self.enrolled_users, f, indent=2)
-            # Sichere Berechtigungen setzen
-            os.chmod(self.enrolled_users_file, 0o600)
+            self.store.save(changed_user)
             logger.info(f"Enrollment-Daten gespeichert in {self.enrolled_users_file}")
         except Exception as e:
             logger.error(f"Fehler beim Speichern der Enrollment-Daten: {e}")
     
     def generate_fingerprint_template(self, scan_data):
-        """Generiert ein Fingerabdruck-Template aus Scan-Daten"""
-        # Vereinfachte Template-Generierung
-        # In einer echten Implementierung würde hier Minutiae-Extraktion stattfinden
-        if scan_data:
-            template_hash = hashlib.sha256(str(scan_data).encode()).hexdigest()
-            return {
-                'template': template_hash,
-                'timestamp': time.time(),
-                'quality': 'high'  # Vereinfacht
-            }
-        return None
+        """Generiert ein Minutien-Template aus einem Frame (Binärformat als Base64-Text)"""
+        if not scan_data:
+            return None
+        features = self.driver.extract_features(scan_data)
+        if features is None:
+            return None
+        return template_to_text(encode_template(features, time.time(), len(scan_data)))
     
     def compare_templates(self, template1, template2):
-        """Vergleicht zwei Fingerabdruck-Templates"""
+        """Vergleicht zwei Fingerabdruck-Templates (Minutien-Matching)"""
         if not template1 or not template2:
             return False
-        
-        # Vereinfachter Vergleich
-        # In einer echten Implementierung würde hier Minutiae-Matching stattfinden
-        return template1.get('template') == template2.get('template')
+        features1, features2 = load_template(template1), load_template(template2)
+        if features1 is None or features2 is None:
+            return False
+        return self.matcher.match(prepare(features1), prepare(features2)).accepted
     
     def enroll_user(self, username=None):
         """Registriert einen Fingerabdruck für einen User"""
@@ -107,14 +101,16 @@ class GoodixRealLogin:
             print("   Finger auflegen und kurz warten...")
             
             try:
-                # Echten Scan durchführen
-                scan_result = self.driver.start_scan()
+                # Echten Scan durchführen - endet beim ersten ausreichend guten Frame
+                capture = self.driver.capture()
+                scan_result = capture.data if capture is not None and capture.accepted else None
                 if scan_result:
                     # Template aus Scan-Daten generieren
                     template = self.generate_fingerprint_template(scan_result)
                     if template:
                         templates.append(template)
-                        print(f"   ✅ Scan {i+1} erfolgreich (Qualität: {template['quality']})")
+                        header = template_header(template_from_text(template))
+                        print(f"   ✅ Scan {i+1} erfolgreich (Qualität: {header.quality:.2f}, {header.count} Minutien)")
                     else:
                         print(f"   ❌ Template-Generierung fehlgeschlagen")
                         return False
@@ -123,9 +119,10 @@ class GoodixRealLogin:
                     print("   💡 Finger erneut auflegen und 2 Sekunden warten")
                     return False
                 
-                # Kurze Pause zwischen Scans
+                # Nächster Scan erst nach dem Abheben
                 if i < 2:
-                    time.sleep(1)
+                    print("   Finger entfernen...")
+                    self.driver.wait_for_lift()
                     
             except Exception as e:
                 logger.error(f"Scan-Fehler: {e}")
@@ -139,7 +136,7 @@ class GoodixRealLogin:
             'device_info': self.driver.get_device_info() if hasattr(self.driver, 'get_device_info') else 'unknown'
         }
         
-        self.save_enrolled_users()
+        self.save_enrolled_users(username)
         
         print(f"\n🎉 Fingerabdruck für {username} erfolgreich registriert!")
         print(f"📁 Gespeichert in: {self.enrolled_users_file}")
@@ -173,8 +170,9 @@ class GoodixRealLogin:
         print("👆 Bitte Finger auf den Sensor legen...")
         
         try:
-            # Scan durchführen
-            scan_result = self.driver.start_scan()
+            # Scan durchführen (bester Frame, falls keiner die Schwelle erreicht)
+            capture = self.driver.capture()
+            scan_result = capture.data if capture is not None else None
             if scan_result:
                 print("🔍 Verarbeite Fingerabdruck...")
                 
@@ -184,15 +182,15 @@ class GoodixRealLogin:
                     print("❌ Template-Generierung fehlgeschlagen")
                     return False
                 
-                # Mit gespeicherten Templates vergleichen
-                stored_templates = self.enrolled_users[username]['templates']
+                # Mit gespeicherten Templates vergleichen (frühester sicherer Treffer gewinnt)
+                gallery = self.store.templates(username)
                 
                 print("🔎 Vergleiche mit gespeicherten Templates...")
-                for i, stored_template in enumerate(stored_templates):
-                    if self.compare_templates(scanned_template, stored_template):
-                        print(f"✅ Fingerabdruck erkannt! (Template {i+1})")
-                        print(f"🎉 LOGIN ERFOLGREICH! Willkommen zurück, {username}!")
-                        return True
+                result = self.matcher.verify(prepare(load_template(scanned_template)), gallery)
+                if result.accepted:
+                    print(f"✅ Fingerabdruck erkannt! (Template {result.index+1}, Score {result.score:.2f})")
+                    print(f"🎉 LOGIN ERFOLGREICH! Willkommen zurück, {username}!")
+                    return True
                 
                 print("❌ Fingerabdruck nicht erkannt")
                 print("💡 Versuchen Sie es erneut oder registrieren Sie den Finger neu")
@@ -229,7 +227,7 @@ class GoodixRealLogin:
         """Entfernt einen Benutzer aus der Registrierung"""
         if username in self.enrolled_users:
             del self.enrolled_users[username]
-            self.save_enrolled_users()
+            self.save_enrolled_users(username)
             print(f"✅ Benutzer {username} erfolgreich entfernt")
         else:
             print(f"❌ Benutzer {username} nicht gefunden")
@@ -6,25 +6,44 @@ Für robuste Fingerabdruck-Scans
 
 import sys
 import os
-import json
-import hashlib
 import time
 import usb.core
 import usb.util
 from pathlib import Path
 import logging
 
+from drivers.goodix_capture import QualityGate, LIFT_QUALITY
+from drivers.goodix_frame import DEFAULT_MAX_FRAME_SIZE
+from biometrics.quality import FrameScorer
+from biometrics.minutiae import MinutiaeExtractor
+from biometrics.matcher import MinutiaeMatcher, prepare
+from biometrics.template import (encode_template, template_to_text, template_from_text,
+                                 template_header, load_template)
+from biometrics.store import EnrollmentStore
+
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Obergrenze für einen Capture (Sekunden); er endet beim ersten guten Frame
+CAPTURE_TIMEOUT = 10
+
 class GoodixSimpleLogin:
     def __init__(self):
         self.device = None
         self.is_connected = False
         self.enrolled_users_file = os.path.expanduser("~/.config/goodix/enrolled_users.json")
         self.ensure_config_dir()
-        self.enrolled_users = self.load_enrolled_users()
+        # Geteilt mit den anderen Front-Ends im Prozess, Templates dekodiert im Cache
+        self.store = EnrollmentStore.shared(self.enrolled_users_file)
+        # Bildqualität der Frames (Format aus der Frame-Länge)
+        self.scorer = FrameScorer()
+        self.extractor = MinutiaeExtractor()
+        self.matcher = MinutiaeMatcher()
+    
+    @property
+    def enrolled_users(self):
+        return self.store.users
     
     def ensure_config_dir(self):
         """Erstelle Konfigurationsverzeichnis"""
@@ -64,7 +83,7 @@ class GoodixSimpleLogin:
             print(f"❌ Verbindungsfehler: {e}")
             return False
     
-    def simple_command(self, cmd_byte, data=b''):
+    def simple_command(self, cmd_byte, data=b'', length=512):
         """Einfache Kommando-Übertragung"""
         if not self.is_connected:
             return None
@@ -73,11 +92,10 @@ class GoodixSimpleLogin:
             # Kommando senden
             packet = bytes([cmd_byte]) + data
             self.device.write(0x01, packet, 1000)  # 1s timeout
-            time.sleep(0.1)  # Kurze Pause
             
-            # Response versuchen (optional)
+            # Response versuchen (optional) - read() wartet selbst auf die Antwort
             try:
-                response = self.device.read(0x82, 512, 1000)
+                response = self.device.read(0x82, length, 1000)
                 return bytes(response)
             except:
                 return b''  # Kein Response ist OK
@@ -86,31 +104,38 @@ class GoodixSimpleLogin:
             logger.debug(f"Kommando-Fehler: {e}")
             return None
     
-    def wait_for_finger(self):
-        """Wartet auf Finger auf dem Sensor"""
+    def read_frame(self):
+        """Liest einen kompletten Frame (READ_IMAGE, endet mit dem Short Packet)"""
+        return self.simple_command(0x30, length=DEFAULT_MAX_FRAME_SIZE)
+    
+    def wait_for_finger(self, timeout=CAPTURE_TIMEOUT):
+        """Liest Frames, bis einer gut genug ist - sonst der beste bis zum Timeout"""
         print("👆 Lege den Finger auf den Sensor...")
-        print("   (Finger gerade auflegen und 3 Sekunden halten)")
         
-        # Einfache Finger-Detection mit mehreren Versuchen
-        for attempt in range(10):  # 10 Versuche = 10 Sekunden
-            try:
-                # Scan-Status abfragen (vereinfacht)
-                response = self.simple_command(0x21)  # SCAN_STATUS
-                
-                if response and len(response) > 0:
-                    # Jede Response als "Finger erkannt" interpretieren
-                    print(f"   📱 Finger-Signal erkannt! (Attempt {attempt + 1})")
-                    time.sleep(2)  # 2 Sekunden halten
-                    return True
-                
-                print(f"   ⏳ Warte auf Finger... ({attempt + 1}/10)")
-                time.sleep(1)
-                
-            except Exception as e:
-                logger.debug(f"Finger-Check {attempt}: {e}")
-                time.sleep(1)
+        gate = QualityGate(scorer=self.scorer)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            frame = self.read_frame()
+            if frame and len(frame) > 1 and gate.offer(frame):
+                result = gate.result()
+                print(f"   📱 Finger erfasst! (Qualität {result.quality:.2f}, "
+                      f"{result.frames} Frames)")
+                return result.data
         
+        result = gate.result()
+        if result is not None and result.quality >= LIFT_QUALITY:
+            print(f"   ⚠️ Timeout - verwende besten Frame (Qualität {result.quality:.2f})")
+            return result.data
         print("   ⏰ Timeout - kein Finger erkannt")
+        return None
+    
+    def wait_for_lift(self, timeout=5.0):
+        """Wartet, bis kein Finger mehr aufliegt"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            frame = self.read_frame()
+            if frame and len(frame) > 1 and self.scorer(frame) < LIFT_QUALITY:
+                return True
         return False
     
     def capture_fingerprint(self):
@@ -118,43 +143,29 @@ class GoodixSimpleLogin:
         # Initialisierung
         print("🔧 Initialisiere Sensor...")
         self.simple_command(0x10)  # INITIALIZE
-        time.sleep(0.5)
         
         # Scan starten
         print("🚀 Starte Scan...")
         self.simple_command(0x20)  # START_SCAN
-        time.sleep(0.5)
         
-        # Warte auf Finger
-        if self.wait_for_finger():
-            # Image lesen (vereinfacht)
-            print("📸 Lese Fingerabdruck-Daten...")
-            response = self.simple_command(0x30)  # READ_IMAGE
-            
-            if response and len(response) > 10:
-                print("✅ Fingerabdruck erfasst!")
-                return response
-            else:
-                print("✅ Fingerabdruck-Scan abgeschlossen (vereinfacht)")
-                # Generiere dummy-Daten basierend auf Zeit
-                dummy_data = f"fingerprint_{time.time()}_{len(response) if response else 0}".encode()
-                return dummy_data
-        else:
-            print("❌ Finger-Erfassung fehlgeschlagen")
-            return None
-    
-    def generate_template(self, scan_data):
-        """Generiert Template aus Scan-Daten"""
+        # Frames lesen, bis einer die Qualitätsschwelle erreicht
+        scan_data = self.wait_for_finger()
         if scan_data:
-            template_hash = hashlib.sha256(scan_data).hexdigest()
-            return {
-                'template': template_hash,
-                'timestamp': time.time(),
-                'quality': 'good',
-                'size': len(scan_data)
-            }
+            print("✅ Fingerabdruck erfasst!")
+            return scan_data
+        
+        print("❌ Finger-Erfassung fehlgeschlagen")
         return None
     
+    def generate_template(self, scan_data):
+        """Generiert Template aus Scan-Daten (Binärformat als Base64-Text)"""
+        if not scan_data:
+            return None
+        features = self.extractor.extract_frame(scan_data)
+        # Unbekanntes Frame-Format: nur Metadaten samt Bildqualität
+        quality = round(self.scorer(scan_data), 3) if features is None else 0.0
+        return template_to_text(encode_template(features, time.time(), len(scan_data), quality))
+    
     def enroll_user(self, username=None):
         """Registriert Fingerabdruck"""
         if not username:
@@ -175,7 +186,8 @@ class GoodixSimpleLogin:
                 template = self.generate_template(scan_data)
                 if template:
                     templates.append(template)
-                    print(f"   ✅ Template {i+1} erstellt (Hash: {template['template'][:16]}...)")
+                    header = template_header(template_from_text(template))
+                    print(f"   ✅ Template {i+1} erstellt ({header.count} Minutien)")
                 else:
                     print(f"   ❌ Template-Erstellung fehlgeschlagen")
                     return False
@@ -184,15 +196,15 @@ class GoodixSimpleLogin:
                 return False
             
             if i < 2:
-                print("   ⏳ 2 Sekunden Pause...")
-                time.sleep(2)
+                print("   ✋ Finger abheben...")
+                self.wait_for_lift()
         
         # Speichere Templates
         self.enrolled_users[username] = {
             'templates': templates,
             'enrolled_at': time.time()
         }
-        self.save_enrolled_users()
+        self.save_enrolled_users(username)
         
         print(f"\n🎉 Fingerabdruck für {username} erfolgreich registriert!")
         print(f"📁 Gespeichert: {self.enrolled_users_file}")
@@ -219,16 +231,21 @@ class GoodixSimpleLogin:
         if scan_data:
             test_template = self.generate_template(scan_data)
             if test_template:
-                stored_templates = self.enrolled_users[username]['templates']
+                features = load_template(test_template)
+                gallery = self.store.templates(username)
+                if features is None or not gallery:
+                    print("❌ Keine Minutien zum Vergleichen - Finger neu registrieren")
+                    return False
                 
                 print("🔍 Vergleiche Templates...")
-                for i, stored_template in enumerate(stored_templates):
-                    if test_template['template'] == stored_template['template']:
-                        print(f"✅ Template-Match gefunden! (Template {i+1})")
-                        print(f"🎉 LOGIN ERFOLGREICH! Willkommen zurück, {username}!")
-                        return True
+                result = self.matcher.verify(prepare(features), gallery)
+                if result.accepted:
+                    print(f"✅ Template-Match gefunden! (Template {result.index+1}, "
+                          f"Score {result.score:.2f})")
+                    print(f"🎉 LOGIN ERFOLGREICH! Willkommen zurück, {username}!")
+                    return True
                 
-                print("❌ Kein Template-Match gefunden")
+                print(f"❌ Kein Template-Match gefunden (Score {result.score:.2f})")
                 print("💡 Versuche es erneut oder registriere den Finger neu")
                 return False
         
@@ -236,22 +253,13 @@ class GoodixSimpleLogin:
         return False
     
     def load_enrolled_users(self):
-        """Lädt Benutzer-Daten"""
-        try:
-            if os.path.exists(self.enrolled_users_file):
-                with open(self.enrolled_users_file, 'r') as f:
-                    return json.load(f)
-            return {}
-        except Exception as e:
-            logger.error(f"Fehler beim Laden: {e}")
-            return {}
+        """Lädt Benutzer-Daten neu von der Platte"""
+        return self.store.load()
     
-    def save_enrolled_users(self):
-        """Speichert Benutzer-Daten"""
+    def save_enrolled_users(self, changed_user=None):
+        """Speichert Benutzer-Daten (Rechte 0600)"""
         try:
-            with open(self.enrolled_users_file, 'w') as f:
-                json.dump(self.enrolled_users, f, indent=2)
-            os.chmod(self.enrolled_users_file, 0o600)
+            self.store.save(changed_user)
         except Exception as e:
             logger.error(f"Fehler beim Speichern: {e}")
     
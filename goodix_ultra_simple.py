@@ -1,23 +1,40 @@
 #!/usr/bin/env python3
 """
 Ultra-Simple Goodix Login - Funktioniert auch ohne echte Finger-Detection
+
+ENTER löst den Scan aus: es wird der beste Frame innerhalb von SCAN_TIMEOUT
+genommen, auch wenn keiner die Qualitätsschwelle erreicht. Die Templates
+enthalten die Minutien des Frames im Binärformat (biometrics.template) und
+liegen in der gemeinsamen Enrollment-Datei. Angemeldet wird, wenn der
+Matcher-Score eines Templates MinutiaeMatcher.threshold erreicht.
 """
 
 import sys
 import os
-import json
-import hashlib
 import time
-import usb.core
-import usb.util
 from pathlib import Path
 
+from drivers.goodix_prototype_driver import GoodixFingerprintDriver
+from biometrics.matcher import MinutiaeMatcher, prepare
+from biometrics.template import (encode_template, template_to_text, template_from_text,
+                                 template_header, load_template)
+from biometrics.store import EnrollmentStore
+
+# Obergrenze für einen Scan (Sekunden); er endet beim ersten guten Frame
+SCAN_TIMEOUT = 3.0
+
 class GoodixUltraSimple:
     def __init__(self):
-        self.device = None
+        self.driver = GoodixFingerprintDriver()
+        self.matcher = MinutiaeMatcher()
         self.enrolled_users_file = os.path.expanduser("~/.config/goodix/enrolled_users.json")
         self.ensure_config_dir()
-        self.enrolled_users = self.load_enrolled_users()
+        # Geteilt mit den anderen Front-Ends im Prozess, Templates dekodiert im Cache
+        self.store = EnrollmentStore.shared(self.enrolled_users_file)
+    
+    @property
+    def enrolled_users(self):
+        return self.store.users
     
     def ensure_config_dir(self):
         """Erstelle Konfigurationsverzeichnis"""
@@ -26,100 +43,41 @@ class GoodixUltraSimple:
     
     def connect(self):
         """Verbinde mit Goodix-Device"""
-        try:
-            print("🔌 Suche Goodix-Device...")
-            self.device = usb.core.find(idVendor=0x27c6, idProduct=0x55a2)
-            
-            if self.device is None:
-                print("❌ Goodix-Device nicht gefunden!")
-                return False
-            
-            print("✅ Goodix-Device gefunden!")
-            
-            # Einfache USB-Setup
-            try:
-                if self.device.is_kernel_driver_active(0):
-                    self.device.detach_kernel_driver(0)
-                self.device.set_configuration()
-                usb.util.claim_interface(self.device, 0)
-                print("✅ USB bereit!")
-            except Exception as e:
-                print(f"⚠️ USB-Setup: {e} (wird ignoriert)")
-            
-            return True
-            
-        except Exception as e:
-            print(f"❌ Verbindungsfehler: {e}")
+        print("🔌 Suche Goodix-Device...")
+        if not self.driver.connect():
+            print("❌ Goodix-Device nicht gefunden!")
             return False
-    
-    def hardware_test(self):
-        """Einfacher Hardware-Test"""
-        try:
-            # Teste verschiedene Kommandos
-            test_commands = [0x01, 0x02, 0x10, 0x20, 0x21, 0x30]
-            
-            for cmd in test_commands:
-                try:
-                    # Kommando senden
-                    self.device.write(0x01, [cmd], 500)
-                    time.sleep(0.1)
-                    
-                    # Response versuchen
-                    try:
-                        response = self.device.read(0x82, 512, 500)
-                        if len(response) > 0:
-                            print(f"✅ Kommando 0x{cmd:02x} Response: {len(response)} bytes")
-                            return response
-                    except:
-                        pass
-                        
-                except Exception as e:
-                    pass
-            
-            print("⚠️ Keine Hardware-Response, aber Device erreichbar")
-            return b'hardware_accessible'
-            
-        except Exception as e:
-            print(f"❌ Hardware-Test fehlgeschlagen: {e}")
-            return None
-    
-    def simulate_fingerprint_scan(self, scan_number):
-        """Simuliert einen Fingerabdruck-Scan"""
-        print(f"📱 Simuliere Fingerabdruck-Scan {scan_number}...")
-        
-        # Hardware-Test für echte Daten
-        hw_response = self.hardware_test()
         
-        # Erstelle KONSISTENTE Scan-Daten für denselben User
-        timestamp = time.time()
-        user = os.getenv('USER', 'unknown')
+        print("✅ Goodix-Device gefunden!")
+        if not self.driver.initialize():
+            print("❌ Sensor-Initialisierung fehlgeschlagen")
+            return False
         
-        # Für Authentifizierung: Verwende ähnliche Basis-Daten wie beim Enrollment
-        if scan_number == 99:  # Auth-Scan
-            # Verwende ähnliche Daten wie bei Scan 1 für bessere Matching-Chance
-            scan_data = f"goodix_scan_{user}_1_{int(timestamp/100)*100}".encode()
-        else:
-            # Normale Enrollment-Scans
-            scan_data = f"goodix_scan_{user}_{scan_number}_{timestamp}".encode()
+        print("✅ Sensor bereit!")
+        return True
+    
+    def scan_fingerprint(self, scan_number):
+        """Liest einen Frame (ohne auf einen erkannten Finger zu warten)"""
+        print(f"📱 Fingerabdruck-Scan {scan_number}...")
         
-        if hw_response:
-            # Füge Hardware-Daten hinzu
-            scan_data += hw_response[:100] if len(hw_response) > 100 else hw_response
+        capture = self.driver.capture(timeout=SCAN_TIMEOUT)
+        if capture is None:
+            print("❌ Keine Bilddaten vom Sensor")
+            return None
         
-        print(f"✅ Scan-Daten generiert: {len(scan_data)} bytes")
-        return scan_data
+        if not capture.accepted:
+            print(f"⚠️ Kein Finger erkannt - verwende besten Frame (Qualität {capture.quality:.2f})")
+        print(f"✅ Scan-Daten gelesen: {len(capture.data)} bytes")
+        return capture.data
     
     def generate_template(self, scan_data):
-        """Generiert Template"""
-        if scan_data:
-            template_hash = hashlib.sha256(scan_data).hexdigest()
-            return {
-                'template': template_hash,
-                'timestamp': time.time(),
-                'quality': 'simulated',
-                'size': len(scan_data)
-            }
-        return None
+        """Generiert Template (Minutien des Frames, Binärformat als Base64-Text)"""
+        if not scan_data:
+            return None
+        features = self.driver.extract_features(scan_data)
+        if features is None:
+            return None
+        return template_to_text(encode_template(features, time.time(), len(scan_data)))
     
     def enroll_user(self, username=None):
         """Registriert Fingerabdruck (vereinfacht)"""
@@ -132,23 +90,23 @@ class GoodixUltraSimple:
         if not self.connect():
             return False
         
-        print("\n👆 SIMULATION: Drücke ENTER für jeden 'Fingerabdruck-Scan'")
-        print("   (3 Scans werden simuliert)")
+        print("\n👆 Finger auflegen und ENTER drücken")
+        print("   (3 Scans)")
         
         templates = []
         for i in range(3):
             print(f"\n📱 Scan {i+1}/3:")
             input("   👆 Drücke ENTER für Scan...")
             
-            # Simuliere Scan
-            scan_data = self.simulate_fingerprint_scan(i+1)
+            scan_data = self.scan_fingerprint(i+1)
             
             if scan_data:
                 template = self.generate_template(scan_data)
                 if template:
                     templates.append(template)
                     print(f"   ✅ Template {i+1} erstellt!")
-                    print(f"   🔑 Hash: {template['template'][:16]}...")
+                    header = template_header(template_from_text(template))
+                    print(f"   🔑 {header.count} Minutien (Qualität {header.quality:.2f})")
                 else:
                     print(f"   ❌ Template-Erstellung fehlgeschlagen")
                     return False
@@ -160,9 +118,9 @@ class GoodixUltraSimple:
         self.enrolled_users[username] = {
             'templates': templates,
             'enrolled_at': time.time(),
-            'method': 'simulated'
+            'method': 'minutiae'
         }
-        self.save_enrolled_users()
+        self.save_enrolled_users(username)
         
         print(f"\n🎉 Fingerabdruck für {username} erfolgreich registriert!")
         print(f"📁 Gespeichert: {self.enrolled_users_file}")
@@ -185,74 +143,44 @@ class GoodixUltraSimple:
         if not self.connect():
             return False
         
-        print("\n👆 SIMULATION: Drücke ENTER für Authentifizierung")
+        print("\n👆 Finger auflegen und ENTER drücken")
         input("   👆 Drücke ENTER...")
         
         print("📱 Authentifizierungs-Scan:")
-        scan_data = self.simulate_fingerprint_scan(99)  # Auth-Scan
+        scan_data = self.scan_fingerprint(1)
         
         if scan_data:
             test_template = self.generate_template(scan_data)
             if test_template:
-                stored_templates = self.enrolled_users[username]['templates']
+                gallery = self.store.templates(username)
+                if not gallery:
+                    print("❌ Keine Minutien-Templates - Finger neu registrieren")
+                    return False
                 
                 print("🔍 Vergleiche Templates...")
+                result = self.matcher.verify(prepare(load_template(test_template)), gallery)
+                if result.accepted:
+                    print(f"✅ Template-Match gefunden! (Template {result.index+1}, "
+                          f"Score {result.score:.2f} >= {self.matcher.threshold:.2f})")
+                    print(f"🎉 LOGIN ERFOLGREICH! Willkommen zurück, {username}!")
+                    return True
                 
-                # Template-Basis für Vergleich extrahieren
-                test_base = test_template['template'][:32]
-                
-                # Erweiterte Matching-Strategien
-                for i, stored_template in enumerate(stored_templates):
-                    stored_base = stored_template['template'][:32]
-                    
-                    print(f"   🔎 Prüfe Template {i+1}...")
-                    
-                    # Strategie 1: Exakte Übereinstimmung
-                    if test_template['template'] == stored_template['template']:
-                        print(f"✅ Exakter Template-Match gefunden! (Template {i+1})")
-                        print(f"🎉 LOGIN ERFOLGREICH! Willkommen zurück, {username}!")
-                        return True
-                    
-                    # Strategie 2: Ähnlichkeits-basiertes Matching
-                    if (test_base[:16] == stored_base[:16] or  # Erste 16 Zeichen
-                        test_base[:8] == stored_base[:8] or   # Erste 8 Zeichen
-                        test_base[8:16] == stored_base[8:16]): # Zeichen 8-16
-                        print(f"✅ Ähnlichkeits-Match gefunden! (Template {i+1})")
-                        print(f"🎉 LOGIN ERFOLGREICH! Willkommen zurück, {username}!")
-                        return True
-                    
-                    # Strategie 3: User-basiertes Matching (für Simulation)
-                    if username in test_template['template'] and username in stored_template['template']:
-                        print(f"✅ User-basierter Match gefunden! (Template {i+1})")
-                        print(f"🎉 LOGIN ERFOLGREICH! Willkommen zurück, {username}!")
-                        return True
-                
-                # Wenn kein Match gefunden
-                print("❌ Kein Template-Match gefunden")
-                print("💡 Bei Simulation: Templates ändern sich bei jedem Scan")
-                print("💡 Echte Hardware würde konsistentere Ergebnisse liefern")
+                print(f"❌ Kein Template-Match gefunden (Score {result.score:.2f}, "
+                      f"Schwelle {self.matcher.threshold:.2f})")
+                print("💡 Finger mittig auflegen und erneut versuchen")
                 return False
         
         print("❌ Authentifizierung fehlgeschlagen")
         return False
     
     def load_enrolled_users(self):
-        """Lädt Benutzer-Daten"""
-        try:
-            if os.path.exists(self.enrolled_users_file):
-                with open(self.enrolled_users_file, 'r') as f:
-                    return json.load(f)
-            return {}
-        except Exception as e:
-            print(f"Fehler beim Laden: {e}")
-            return {}
+        """Lädt Benutzer-Daten neu von der Platte"""
+        return self.store.load()
     
-    def save_enrolled_users(self):
-        """Speichert Benutzer-Daten"""
+    def save_enrolled_users(self, changed_user=None):
+        """Speichert Benutzer-Daten (atomar, Rechte 0600)"""
         try:
-            with open(self.enrolled_users_file, 'w') as f:
-                json.dump(self.enrolled_users, f, indent=2)
-            os.chmod(self.enrolled_users_file, 0o600)
+            self.store.save(changed_user)
             print(f"📁 Daten gespeichert: {self.enrolled_users_file}")
         except Exception as e:
             print(f"Fehler beim Speichern: {e}")
@@ -282,16 +210,13 @@ class GoodixUltraSimple:
         print("=" * 25)
         
         if self.connect():
-            print("✅ Device: Goodix 27C6:55A2")
+            info = self.driver.get_device_info()
+            print(f"✅ Device: Goodix {info['vendor_id']:04X}:{info['product_id']:04X}")
             print("✅ Status: Verbunden")
-            
-            # Hardware-Test
-            hw_response = self.hardware_test()
-            if hw_response:
-                print(f"✅ Hardware-Response: {len(hw_response)} bytes")
-                print(f"🔑 Sample: {hw_response[:50]}...")
-            else:
-                print("⚠️ Keine Hardware-Response")
+            for key in ('status', 'firmware_raw', 'device_info_raw'):
+                if info.get(key):
+                    print(f"🔑 {key}: {info[key]}")
+            self.driver.disconnect()
         else:
             print("❌ Device nicht erreichbar")
 
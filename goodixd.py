@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Goodix Sensor Daemon (goodixd)
+Hält den Sensor dauerhaft verbunden und initialisiert und beantwortet
+Enroll-/Verify-/Identify-Anfragen über einen lokalen Unix-Socket
+
+Protokoll: eine JSON-Anfrage pro Zeile, z.B. {"op": "verify", "user": "alice"},
+Antwort ebenfalls als eine JSON-Zeile mit "ok" und "elapsed_ms".
+Alle Clients und Scans laufen auf einem asyncio-Event-Loop.
+"""
+
+import sys
+import os
+import pwd
+import json
+import time
+import socket
+import struct
+import signal
+import asyncio
+import logging
+from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+
+from goodix_login import GoodixLoginManager, ENROLL_MIN_QUALITY
+from goodix_client import default_socket_path
+from drivers.goodix_async_driver import AsyncGoodixDriver
+from drivers.goodix_capture import DEFAULT_MIN_QUALITY
+from drivers.goodix_hotplug import GoodixHotplugMonitor
+
+logger = logging.getLogger('goodixd')
+
+# Anfragen, die nicht-privilegierte Clients nur für sich selbst stellen dürfen
+USER_SCOPED_OPS = ('enroll', 'verify', 'remove')
+
+# Anfragen nur für root und den Besitzer des Daemons (Benutzerliste, Statistik, Neuladen)
+ADMIN_OPS = ('list', 'stats', 'reload')
+
+# Obergrenze für Scans pro Enrollment-Anfrage - jeder Scan hält den Sensor
+MAX_ENROLL_SCANS = 5
+
+
+class GoodixDaemon:
+    """Besitzt Treiber und Enrollment-Galerie für die gesamte Laufzeit"""
+
+    def __init__(self, socket_path: Optional[str] = None, scan_timeout: float = 15.0):
+        self.socket_path = socket_path or default_socket_path()
+        self.scan_timeout = scan_timeout
+        self.manager = GoodixLoginManager()
+        self.driver = AsyncGoodixDriver(self.manager.driver)
+        # Stellt die Session nach Suspend/Resume oder USB-Reset im Hintergrund wieder her
+        self.hotplug = GoodixHotplugMonitor(self.manager.driver)
+
+        # Nur ein Scan gleichzeitig - der Sensor ist exklusiv
+        self._sensor_lock = asyncio.Lock()
+        # Template-Erzeugung, Matching und Store-Änderungen laufen nacheinander
+        # in einem Thread - der Event-Loop bedient derweil die anderen Clients
+        self._matcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix='goodix-match')
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def ensure_sensor(self) -> bool:
+        """Verbindet und initialisiert den Sensor, falls nötig"""
+        if self.hotplug.reconnecting:
+            # Wiederherstellung läuft bereits - nicht parallel verbinden
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self.hotplug.wait_ready, self.scan_timeout)
+
+        if self.driver.is_connected and self.driver.is_initialized:
+            return True
+
+        logger.info("🔌 Verbinde Sensor...")
+        if not self.driver.is_connected and not await self.driver.connect():
+            logger.error("❌ Sensor-Verbindung fehlgeschlagen")
+            return False
+        if not await self.driver.initialize():
+            logger.error("❌ Sensor-Initialisierung fehlgeschlagen")
+            return False
+        logger.info("✅ Sensor bereit")
+        return True
+
+    async def capture(self, timeout: Optional[float] = None,
+                      min_quality: float = DEFAULT_MIN_QUALITY,
+                      require_quality: bool = False) -> Optional[bytes]:
+        """
+        Qualitätsgesteuerter Scan (höchstens scan_timeout): der erste Frame
+        mit min_quality, sonst der beste bis zum Timeout - mit
+        require_quality dann keiner (Enrollment)
+        """
+        timeout = min(timeout or self.scan_timeout, self.scan_timeout)
+        async with self._sensor_lock:
+            if not await self.ensure_sensor():
+                return None
+
+            loop = asyncio.get_running_loop()
+            result = await self.driver.capture_quality(loop.time() + timeout, min_quality)
+            if result is None or (require_quality and not result.accepted):
+                return None
+            if not result.accepted:
+                logger.info(f"⚠️ Bildqualität gering ({result.quality:.2f}) - vergleiche trotzdem")
+            return result.data
+
+    async def _run(self, func, *args):
+        """Führt CPU-Arbeit bzw. Store-Zugriffe im Matcher-Thread aus"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._matcher, func, *args)
+
+    def _request_timeout(self, request: dict) -> Optional[float]:
+        """Scan-Timeout des Clients in (0, scan_timeout]; None = ungültig"""
+        timeout = request.get('timeout')
+        if timeout is None:
+            return self.scan_timeout
+        if isinstance(timeout, bool) or not isinstance(timeout, (int, float)):
+            return None
+        if not 0 < timeout <= self.scan_timeout:
+            return None
+        return float(timeout)
+
+    def _timeout_error(self) -> dict:
+        return {'ok': False, 'error': f'timeout muss in (0, {self.scan_timeout:g}] Sekunden liegen'}
+
+    # ------------------------------------------------------------------
+    # Anfragen
+    # ------------------------------------------------------------------
+
+    async def handle_request(self, request: dict, peer_uid: Optional[int] = None) -> dict:
+        start = time.perf_counter()
+        op = request.get('op')
+        handler = getattr(self, f'op_{op}', None) if isinstance(op, str) else None
+
+        if handler is None:
+            response = {'ok': False, 'error': f'unbekannte Operation: {op}'}
+        else:
+            denied = self._check_permission(op, request, peer_uid)
+            if denied:
+                response = {'ok': False, 'error': denied}
+            else:
+                try:
+                    response = await handler(request)
+                except Exception as e:
+                    logger.error(f"❌ Fehler bei '{op}': {e}")
+                    response = {'ok': False, 'error': str(e)}
+
+        response['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 2)
+        return response
+
+    @staticmethod
+    def _check_permission(op: str, request: dict, peer_uid: Optional[int]) -> Optional[str]:
+        """
+        Nicht-privilegierte Clients dürfen nur ihren eigenen Benutzer
+        bearbeiten und keine Verwaltungs-Anfragen stellen
+        """
+        if peer_uid is None or peer_uid in (0, os.getuid()):
+            return None
+        if op in ADMIN_OPS:
+            return f"keine Berechtigung für '{op}'"
+        if op not in USER_SCOPED_OPS:
+            return None
+        try:
+            peer_user = pwd.getpwuid(peer_uid).pw_name
+        except KeyError:
+            return 'unbekannter Client-Benutzer'
+        if request.get('user', peer_user) != peer_user:
+            return f"keine Berechtigung für Benutzer '{request.get('user')}'"
+        request['user'] = peer_user
+        return None
+
+    async def op_ping(self, request: dict) -> dict:
+        return {'ok': True, 'connected': self.driver.is_connected,
+                'initialized': self.driver.is_initialized,
+                'reconnects': self.hotplug.reconnects,
+                'users': len(self.manager.enrolled_users)}
+
+    async def op_stats(self, request: dict) -> dict:
+        """Gelernte Latenz-Perzentile, Timeouts und Versuche pro Kommando"""
+        return {'ok': True, 'commands': self.manager.driver.get_policy_stats()}
+
+    async def op_list(self, request: dict) -> dict:
+        users = {name: {'enrolled_at': data.get('enrolled_at'),
+                        'templates': len(data.get('templates', []))}
+                 for name, data in self.manager.enrolled_users.items()}
+        return {'ok': True, 'users': users}
+
+    async def op_reload(self, request: dict) -> dict:
+        await self._run(self.manager.load_enrollment_data)
+        return {'ok': True, 'users': len(self.manager.enrolled_users)}
+
+    async def op_enroll(self, request: dict) -> dict:
+        username = request.get('user')
+        if not username:
+            return {'ok': False, 'error': 'Benutzername fehlt'}
+
+        scans = request.get('scans', 3)
+        if isinstance(scans, bool) or not isinstance(scans, int) or not 1 <= scans <= MAX_ENROLL_SCANS:
+            return {'ok': False, 'error': f'scans muss zwischen 1 und {MAX_ENROLL_SCANS} liegen'}
+        timeout = self._request_timeout(request)
+        if timeout is None:
+            return self._timeout_error()
+
+        templates = []
+        for scan_num in range(scans):
+            scan_data = await self.capture(timeout, ENROLL_MIN_QUALITY, require_quality=True)
+            if not scan_data:
+                return {'ok': False, 'error': f'Scan {scan_num + 1} fehlgeschlagen '
+                                             f'(Timeout oder Bildqualität zu gering)'}
+            template = await self._run(self.manager.generate_fingerprint_template, scan_data)
+            if not template:
+                return {'ok': False, 'error': f'Template {scan_num + 1} fehlgeschlagen'}
+            templates.append(template)
+
+        await self._run(self._store_enrollment, username, templates)
+        return {'ok': True, 'user': username, 'templates': len(templates)}
+
+    def _store_enrollment(self, username: str, templates: list):
+        self.manager.enrolled_users[username] = {
+            'templates': templates,
+            'enrolled_at': time.time(),
+            'scan_count': len(templates)
+        }
+        self.manager.save_enrollment_data(username)
+
+    async def op_verify(self, request: dict) -> dict:
+        username = request.get('user')
+        if username not in self.manager.enrolled_users:
+            return {'ok': False, 'error': f"kein Fingerabdruck für '{username}' registriert"}
+        timeout = self._request_timeout(request)
+        if timeout is None:
+            return self._timeout_error()
+
+        scan_data = await self.capture(timeout)
+        if not scan_data:
+            return {'ok': False, 'error': 'kein Finger erkannt'}
+
+        template = await self._run(self.manager.generate_fingerprint_template, scan_data)
+        matched = await self._run(self.manager.match_template, template, username)
+        return {'ok': matched, 'user': username, 'match': matched}
+
+    async def op_identify(self, request: dict) -> dict:
+        timeout = self._request_timeout(request)
+        if timeout is None:
+            return self._timeout_error()
+        scan_data = await self.capture(timeout)
+        if not scan_data:
+            return {'ok': False, 'error': 'kein Finger erkannt'}
+
+        template = await self._run(self.manager.generate_fingerprint_template, scan_data)
+        # Ein Batch-Vergleich über alle Benutzer statt verify() pro Benutzer
+        result = await self._run(self.manager.identify_template, template)
+        if result.label is None:
+            return {'ok': False, 'match': False, 'score': round(result.score, 3)}
+        return {'ok': True, 'match': True, 'user': result.label, 'score': round(result.score, 3)}
+
+    async def op_remove(self, request: dict) -> dict:
+        username = request.get('user')
+        if username not in self.manager.enrolled_users:
+            return {'ok': False, 'error': f"Benutzer '{username}' nicht gefunden"}
+        await self._run(self._remove_enrollment, username)
+        return {'ok': True, 'user': username}
+
+    def _remove_enrollment(self, username: str):
+        self.manager.enrolled_users.pop(username, None)
+        self.manager.save_enrollment_data(username)
+
+    # ------------------------------------------------------------------
+    # Server
+    # ------------------------------------------------------------------
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        peer_uid = _peer_uid(writer.get_extra_info('socket'))
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError('Anfrage muss ein JSON-Objekt sein')
+                except ValueError as e:
+                    response = {'ok': False, 'error': f'ungültige Anfrage: {e}'}
+                else:
+                    response = await self.handle_request(request, peer_uid)
+                writer.write(json.dumps(response).encode() + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve_forever(self):
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        os.makedirs(os.path.dirname(self.socket_path), exist_ok=True)
+
+        self._server = await asyncio.start_unix_server(self._handle_client, path=self.socket_path)
+        os.chmod(self.socket_path, 0o666 if os.geteuid() == 0 else 0o600)
+
+        # Sensor sofort vorbereiten - die erste Anfrage zahlt keine Init-Latenz
+        await self.ensure_sensor()
+        try:
+            self.hotplug.start()
+        except OSError as e:
+            logger.warning(f"⚠️ Hotplug-Monitor nicht verfügbar: {e}")
+
+        logger.info(f"🚀 goodixd lauscht auf {self.socket_path}")
+        try:
+            async with self._server:
+                await self._server.serve_forever()
+        finally:
+            await self.shutdown()
+
+    async def shutdown(self):
+        if self._server:
+            self._server.close()
+            self._server = None
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self.hotplug.stop()
+        # Laufende Vergleiche zu Ende führen, danach die Matcher-Worker beenden
+        self._matcher.shutdown(wait=True)
+        self.manager.close_match_pool()
+        await self.driver.disconnect()
+        logger.info("👋 goodixd beendet")
+
+
+def _peer_uid(connection: Optional[socket.socket]) -> Optional[int]:
+    """UID des Clients über SO_PEERCRED (Linux)"""
+    try:
+        creds = connection.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED,
+                                      struct.calcsize('3i'))
+        _, uid, _ = struct.unpack('3i', creds)
+        return uid
+    except (AttributeError, OSError):
+        return None
+
+
+async def run_daemon(socket_path: Optional[str] = None):
+    daemon = GoodixDaemon(socket_path)
+    task = asyncio.ensure_future(daemon.serve_forever())
+
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, task.cancel)
+
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+def main():
+    socket_path = sys.argv[1] if len(sys.argv) > 1 else None
+    asyncio.run(run_daemon(socket_path))
+
+
+if __name__ == "__main__":
+    main()
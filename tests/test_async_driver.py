@@ -0,0 +1,81 @@
+"""
+Regressionstests für AsyncGoodixDriver gegen den Simulator
+
+Ausführen: python -m pytest tests/ (oder python -m unittest discover tests)
+"""
+
+import os
+import sys
+import asyncio
+import tempfile
+import unittest
+
+# Caches (Kalibrierung, Identität) nicht im echten Home anlegen
+os.environ['HOME'] = tempfile.mkdtemp(prefix='goodix-test-')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from drivers.goodix_simulator import shared_transport
+from drivers.goodix_async_driver import AsyncGoodixDriver
+
+
+class SimulatorDriverTest(unittest.IsolatedAsyncioTestCase):
+    """Verbundener, initialisierter AsyncGoodixDriver am Simulator"""
+
+    async def asyncSetUp(self):
+        self.driver = AsyncGoodixDriver(transport=shared_transport())
+        self.assertTrue(await self.driver.connect())
+        self.assertTrue(await self.driver.initialize())
+
+    async def asyncTearDown(self):
+        await self.driver.disconnect()
+
+    async def capture(self, seconds: float):
+        loop = asyncio.get_running_loop()
+        return await self.driver.capture(deadline=loop.time() + seconds)
+
+
+class CancelledCaptureTest(SimulatorDriverTest):
+    async def test_capture_after_deadline(self):
+        """Eine abgebrochene Capture darf keine Antworten im IN-Endpoint zurücklassen"""
+        first = await self.capture(5.0)
+        self.assertIsNotNone(first)
+        size = len(first)
+
+        self.assertIsNone(await self.capture(0.001))
+        for _ in range(3):
+            image = await self.capture(5.0)
+            self.assertIsNotNone(image)
+            self.assertEqual(len(image), size)
+
+    async def test_cancel_at_every_stage(self):
+        """Abbruch beim Scan-Start, beim Pollen und mitten im Frame-Read"""
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        self.assertIsNotNone(await self.capture(5.0))
+        full = loop.time() - start
+
+        for step in range(1, 10):
+            await self.capture(full * step / 10)
+            image = await self.capture(5.0)
+            self.assertIsNotNone(image, f"Capture nach Abbruch bei {step}/10 fehlgeschlagen")
+
+
+class QualityCaptureTest(SimulatorDriverTest):
+    async def test_capture_quality_gates_frames(self):
+        """capture_quality bewertet Frames wie der synchrone Treiber"""
+        loop = asyncio.get_running_loop()
+        result = await self.driver.capture_quality(loop.time() + 5.0, min_quality=0.45)
+        self.assertIsNotNone(result)
+        self.assertTrue(result.accepted)
+        self.assertGreaterEqual(result.quality, 0.45)
+        self.assertEqual(result.quality, self.driver.driver.quality_scorer()(result.data))
+
+        # Unerreichbare Schwelle: bester Frame bis zur Deadline, nicht angenommen
+        result = await self.driver.capture_quality(loop.time() + 0.5, min_quality=1.1)
+        self.assertIsNotNone(result)
+        self.assertFalse(result.accepted)
+        self.assertGreater(result.frames, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+"""
+Regressionstests für den qualitätsgesteuerten Capture aus dem FrameRing
+
+Ausführen: python -m pytest tests/ (oder python -m unittest discover tests)
+"""
+
+import os
+import sys
+import threading
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from drivers.goodix_ring import FrameRing
+from drivers.goodix_capture import QualityGate, capture_from_ring
+
+
+class OverwritingRing(FrameRing):
+    """Der Producer überschreibt den Slot direkt nach jeder Gültigkeitsprüfung"""
+
+    def valid(self, frame) -> bool:
+        still_valid = super().valid(frame)
+        start = self._slot(frame.seq) * self.slot_size
+        self._view[start:start + len(frame.data)] = bytes(len(frame.data))
+        self._seqs[self._slot(frame.seq)] = -1
+        return still_valid
+
+
+class CaptureFromRingTest(unittest.TestCase):
+    def produce(self, ring: FrameRing, data: bytes):
+        seq, slot = ring.acquire()
+        slot[:len(data)] = data
+        ring.commit(seq, len(data))
+
+    def test_kept_frame_is_the_validated_copy(self):
+        """Ein nach der Prüfung überschriebener Slot darf den besten Frame nicht verändern"""
+        ring = OverwritingRing(slots=2, slot_size=1024)
+        data = np.random.default_rng(0).integers(0, 256, 1024, dtype=np.uint8).tobytes()
+        producer = threading.Timer(0.05, self.produce, (ring, data))
+        producer.start()
+        try:
+            result = capture_from_ring(ring, QualityGate(min_quality=0.0), timeout=2.0)
+        finally:
+            producer.join()
+
+        self.assertIsNotNone(result)
+        self.assertTrue(result.accepted)
+        self.assertEqual(result.data, data)
+
+    def test_frame_overwritten_during_copy_is_dropped(self):
+        """Schlägt die Prüfung nach dem Kopieren fehl, zählt der Frame nicht"""
+        ring = FrameRing(slots=2, slot_size=1024)
+        ring.valid = lambda frame: False
+        producer = threading.Timer(0.05, self.produce, (ring, bytes(range(256)) * 4))
+        producer.start()
+        try:
+            result = capture_from_ring(ring, QualityGate(min_quality=0.0), timeout=0.3)
+        finally:
+            producer.join()
+        self.assertIsNone(result)
+
+
+if __name__ == '__main__':
+    unittest.main()
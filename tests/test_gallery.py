@@ -0,0 +1,94 @@
+"""
+Tests für die Identifikations-Galerie (Speichern, Index-Fallback, Pool)
+
+Ausführen: python -m pytest tests/ (oder python -m unittest discover tests)
+"""
+
+import os
+import sys
+import stat
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from biometrics.minutiae import MINUTIA_DTYPE, FeatureSet
+from biometrics.matcher import prepare
+from biometrics.gallery import StackedGallery, INDEX_MIN_TEMPLATES
+from biometrics import pool
+
+
+def random_template(rng: np.random.Generator):
+    minutiae = np.zeros(30, dtype=MINUTIA_DTYPE)
+    minutiae['x'] = rng.uniform(0, 108, 30)
+    minutiae['y'] = rng.uniform(0, 88, 30)
+    minutiae['angle'] = rng.uniform(0, 2 * np.pi, 30)
+    minutiae['type'] = rng.integers(1, 3, 30)
+    minutiae['quality'] = 1.0
+    return prepare(FeatureSet(minutiae, 108, 88, 0.8, 6.5))
+
+
+class GallerySaveTest(unittest.TestCase):
+    def test_saved_gallery_is_private(self):
+        """Die Galerie enthält alle Minutien - nur für den Besitzer lesbar, unabhängig von der umask"""
+        rng = np.random.default_rng(0)
+        gallery = StackedGallery()
+        for number in range(4):
+            gallery.add(f'user{number}', random_template(rng))
+
+        old_umask = os.umask(0o022)
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'gallery.npz')
+                gallery.save(path, {'users': 4})
+                self.assertEqual(stat.S_IMODE(os.stat(path).st_mode), 0o600)
+                self.assertEqual(os.listdir(directory), ['gallery.npz'])
+
+                loaded = StackedGallery.load(path, {'users': 4})
+                self.assertIsNotNone(loaded)
+                self.assertEqual(loaded.labels, gallery.labels)
+        finally:
+            os.umask(old_umask)
+
+
+class IdentifyFallbackTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        rng = np.random.default_rng(1)
+        cls.templates = [random_template(rng) for _ in range(INDEX_MIN_TEMPLATES // 2)]
+        cls.impostor = random_template(rng)
+        cls.gallery = StackedGallery()
+        for number, template in enumerate(cls.templates):
+            cls.gallery.add(f'user{number}', template)
+            cls.gallery.add(f'user{number}', template)
+
+    def missing_index(self, label: str):
+        """Index-Shortlist, die den gesuchten Benutzer verfehlt"""
+        gallery = self.gallery
+        others = np.flatnonzero(np.array(gallery.labels[:len(gallery)]) != label)[:64]
+        return mock.patch.object(gallery.index, 'shortlist', lambda probe, size: others)
+
+    def test_index_miss_falls_back_to_remaining_users(self):
+        """Verfehlt der Index den Benutzer, findet ihn die Suche über die übrigen Benutzer"""
+        with self.missing_index('user7'):
+            self.assertFalse(self.gallery.identify(self.templates[7], full_scan=False).accepted)
+            result = self.gallery.identify(self.templates[7])
+        self.assertTrue(result.accepted)
+        self.assertEqual(result.label, 'user7')
+
+    def test_pool_decides_like_gallery(self):
+        """Mit und ohne Pool dieselbe Entscheidung, auch wenn der Pool die Restsuche verteilt"""
+        probes = [self.templates[3], self.templates[7], self.impostor]
+        with self.missing_index('user7'), mock.patch.object(pool, 'POOL_MIN_ROWS', 0), \
+                pool.MatcherPool(self.gallery, 2) as matcher_pool:
+            for probe in probes:
+                expected = self.gallery.identify(probe)
+                result = matcher_pool.identify(probe)
+                self.assertEqual((result.label, result.accepted), (expected.label, expected.accepted))
+
+
+if __name__ == '__main__':
+    unittest.main()